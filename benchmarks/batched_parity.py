@@ -0,0 +1,101 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: 核对 BatchedSoccerEnv 与 N 个 SoccerEnv 逐位一致。N 个 SoccerEnv 共用一个随机数生成器、按场地顺序依次 step，
+#            结束的场地在下一步重置并忽略动作（与批量环境的 next-step 自动重置相同）；每步逐位比较观测、结束标志、
+#            碰撞/进球/出界 info 和状态快照，任一配置不一致时以非零退出码结束。
+#            每个动作推进多个子步时批量环境按子步、场地的顺序抽取随机数，这类配置只用单个场地核对。
+# 用法: python benchmarks/batched_parity.py
+#       python benchmarks/batched_parity.py --steps 1000 --num-envs 8
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from envs.environment.soccer_env import SoccerEnv  # noqa: E402
+from envs.environment.batched_env import BatchedSoccerEnv, EVENTS  # noqa: E402
+
+# 核对的环境配置
+CONFIGS = (
+    {'num_players': 1, 'num_obstacles': 0},
+    {'num_players': 3, 'num_obstacles': 4},
+    {'num_players': 5, 'num_obstacles': 11},
+    {'num_players': 3, 'num_obstacles': 4, 'dt': 0.5},
+    {'num_players': 3, 'num_obstacles': 4, 'frame_skip': 3, 'substeps': 2},
+)
+
+
+def single_infos(info):
+    """
+    SoccerEnv 的 info 转为与批量环境相同的 (事件..., 进球, 球出界, 球员出界)
+    """
+    goal = {'left': -1, 'right': 1}.get(info.get('goal'), 0)
+    return tuple(bool(info.get(key)) for key in EVENTS) + (goal, bool(info.get('ball_out')),
+                                                           bool(info.get('player_out')))
+
+
+def run(config, num_envs, steps, seed):
+    """
+    同一组随机动作分别推进批量环境和 N 个 SoccerEnv，返回第一个不一致的步数（全部一致时返回 None）
+    """
+    if config.get('frame_skip', 1) * config.get('substeps', 1) > 1:
+        num_envs = 1
+    batched = BatchedSoccerEnv(num_envs, max_steps=steps // 2, **config)
+    envs = [SoccerEnv(max_steps=steps // 2, **config) for _ in range(num_envs)]
+    obs, _ = batched.reset(seed=seed)
+    expected = [env.reset(seed=seed)[0] for env in envs[:1]]
+    for env in envs[1:]:
+        env._np_random = envs[0].np_random
+        expected.append(env.reset()[0])
+    if not np.array_equal(obs, np.stack(expected)):
+        return 0
+
+    rng = np.random.default_rng(seed)
+    done = np.zeros(num_envs, dtype=bool)
+    for step in range(1, steps + 1):
+        actions = rng.uniform(-1, 1, size=batched.action_space.shape).astype(np.float32)
+        obs, _, terminated, truncated, infos = batched.step(actions)
+        for k, env in enumerate(envs):
+            if done[k]:
+                expected[k] = env.reset()[0]
+                result = (False, False) + (False,) * len(EVENTS) + (0, False, False)
+                done[k] = False
+            else:
+                expected[k], _, term, trunc, info = env.step(actions[k])
+                result = (term, trunc) + single_infos(info)
+                done[k] = term or trunc
+            got = (terminated[k], truncated[k]) + tuple(infos[key][k] for key in EVENTS + ('goal', 'ball_out',
+                                                                                          'player_out'))
+            if tuple(result) != tuple(got):
+                return step
+        states = batched.get_state()
+        if not (np.array_equal(obs, np.stack(expected)) and
+                all(np.array_equal(states[k], env.get_state()) for k, env in enumerate(envs))):
+            return step
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='核对批量环境与 N 个 SoccerEnv 逐位一致')
+    parser.add_argument('--steps', type=int, default=500, help='每个配置推进的步数（max_steps 取其一半，覆盖截断和重置）')
+    parser.add_argument('--num-envs', type=int, default=4, help='场地数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    failures = 0
+    for config in CONFIGS:
+        step = run(config, args.num_envs, args.steps, args.seed)
+        failures += step is not None
+        print('%s: %s' % (config, '一致' if step is None else '第 %d 步不一致' % step))
+    if failures:
+        print('%d 个配置不一致' % failures)
+        sys.exit(1)
+    print('全部一致')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: SoccerEnv 性能基准。测量 step、reset、render('rgb_array') 和 DefaultRewardWrapper.step 的
+#            每秒调用次数与单次延迟分位数，按球员数、障碍物数和球场尺寸扫描，结果写成 JSON；
+#            --compare 与保存的基线对比，吞吐下降超过容差时返回非零退出码；
+#            --ccd both 在同一配置下分别测量离散碰撞和球的连续碰撞检测，对比其开销。
+# 用法: python benchmarks/bench.py --output bench.json
+#       python benchmarks/bench.py --sweep scaling --compare bench.json --tolerance 0.15
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from envs.environment.soccer_env import SoccerEnv  # noqa: E402
+from envs.environment.reward_wrapper import DefaultRewardWrapper  # noqa: E402
+from envs.physics.backends import BACKENDS  # noqa: E402
+
+TARGETS = ('step', 'reset', 'render', 'wrapper_step')
+
+# 扫描网格: (球员数, 障碍物数, 球场尺寸)
+SWEEPS = {
+    'quick': {'players': [1, 3], 'obstacles': [0, 4], 'fields': [(800, 600)]},
+    'default': {'players': [1, 3, 5], 'obstacles': [0, 4, 11], 'fields': [(800, 600), (1600, 1200)]},
+    # 扩展到整队、障碍物密集的配置，用于画扩展曲线
+    'scaling': {'players': [1, 2, 5, 11, 22], 'obstacles': [0, 11, 22, 44], 'fields': [(800, 600), (1600, 1200)]},
+}
+
+
+def percentile_summary(latencies_ns):
+    """
+    由单次耗时（纳秒）计算每秒调用次数和延迟分位数（微秒）
+    """
+    lat = np.asarray(latencies_ns, dtype=np.float64) / 1000.0
+    return {
+        'calls': int(lat.size),
+        'steps_per_sec': float(lat.size / (lat.sum() / 1e6)),
+        'mean_us': float(lat.mean()),
+        'p50_us': float(np.percentile(lat, 50)),
+        'p90_us': float(np.percentile(lat, 90)),
+        'p99_us': float(np.percentile(lat, 99)),
+        'max_us': float(lat.max()),
+    }
+
+
+def time_calls(fn, count, warmup):
+    """
+    调用 fn count 次（先预热 warmup 次），返回每次的耗时（纳秒）
+    """
+    for _ in range(warmup):
+        fn()
+    clock = time.perf_counter_ns
+    latencies = np.empty(count, dtype=np.int64)
+    for k in range(count):
+        start = clock()
+        fn()
+        latencies[k] = clock() - start
+    return latencies
+
+
+def make_stepper(env, num_players, seed):
+    """
+    返回执行一步的函数: 动作序列预先生成，回合结束时在同一次调用中重置
+    """
+    actions = np.random.default_rng(seed).uniform(-1, 1, size=(1024, 3 * num_players)).astype(np.float32)
+    state = {'k': 0}
+
+    def step():
+        k = state['k']
+        state['k'] = (k + 1) % len(actions)
+        _, _, terminated, truncated, _ = env.step(actions[k])
+        if terminated or truncated:
+            env.reset()
+    return step
+
+
+def measure_target(target, num_players, num_obstacles, width, height, ccd, args):
+    """
+    在新建的环境上测量一个目标，返回每次调用的耗时（纳秒）
+    """
+    env = SoccerEnv(width=width, height=height, num_players=num_players, num_obstacles=num_obstacles, ccd=ccd,
+                    physics_backend=args.physics_backend, obstacle_behaviours=args.obstacle_behaviours)
+    env.reset(seed=args.seed)
+    if target == 'step':
+        latencies = time_calls(make_stepper(env, num_players, args.seed), args.steps, args.warmup)
+    elif target == 'wrapper_step':
+        wrapped = DefaultRewardWrapper(env)
+        latencies = time_calls(make_stepper(wrapped, num_players, args.seed), args.steps, args.warmup)
+    elif target == 'reset':
+        latencies = time_calls(env.reset, args.resets, min(args.warmup, args.resets))
+    else:
+        make_stepper(env, num_players, args.seed)()
+        latencies = time_calls(lambda: env.render('rgb_array'), args.renders, min(args.warmup, args.renders))
+    env.close()
+    return latencies
+
+
+def bench_config(num_players, num_obstacles, width, height, ccd, targets, args):
+    """
+    测量一种环境配置下的各目标，返回结果列表
+    """
+    results = []
+    config = {'num_players': num_players, 'num_obstacles': num_obstacles, 'width': width, 'height': height,
+              'ccd': ccd}
+    for target in targets:
+        # 重复测量，保留延迟中位数最小的一轮，减少机器负载波动的影响
+        rounds = [measure_target(target, num_players, num_obstacles, width, height, ccd, args)
+                  for _ in range(args.repeat)]
+        latencies = min(rounds, key=np.median)
+        result = dict(config, target=target)
+        result.update(percentile_summary(latencies))
+        results.append(result)
+        if not args.quiet:
+            print('%-13s P=%-3d O=%-3d %4dx%-4d%s %10.0f /s  p50 %8.1f us  p99 %8.1f us' % (
+                target, num_players, num_obstacles, width, height, ' ccd' if ccd else '    ',
+                result['steps_per_sec'], result['p50_us'], result['p99_us']))
+    return results
+
+
+def result_key(result):
+    return (result['target'], result['num_players'], result['num_obstacles'], result['width'], result['height'],
+            result.get('ccd', False))
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线对比，返回吞吐下降超过 tolerance（比例）的条目
+    吞吐按延迟中位数换算（1e6 / p50_us），比平均值更不容易受偶发抖动影响
+    """
+    reference = {result_key(r): r for r in baseline['results']}
+    regressions = []
+    print('\n与基线对比（容差 %.0f%%）:' % (tolerance * 100))
+    for result in results:
+        base = reference.get(result_key(result))
+        if base is None:
+            continue
+        ratio = base['p50_us'] / result['p50_us']
+        flag = ratio < 1.0 - tolerance
+        print('%s %-13s P=%-3d O=%-3d %4dx%-4d%s %10.0f -> %10.0f /s (%+.1f%%)' % (
+            '!!' if flag else '  ', result['target'], result['num_players'], result['num_obstacles'],
+            result['width'], result['height'], ' ccd' if result.get('ccd') else '    ',
+            1e6 / base['p50_us'], 1e6 / result['p50_us'],
+            (ratio - 1.0) * 100))
+        if flag:
+            regressions.append({'key': list(result_key(result)), 'baseline_p50_us': base['p50_us'],
+                                'current_p50_us': result['p50_us'], 'ratio': ratio})
+    return regressions
+
+
+def parse_list(text, cast=int):
+    return [cast(item) for item in text.split(',') if item]
+
+
+def parse_fields(text):
+    return [tuple(int(v) for v in item.split('x')) for item in text.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SoccerEnv 性能基准')
+    parser.add_argument('--sweep', choices=sorted(SWEEPS), default='default', help='预设的扫描网格')
+    parser.add_argument('--players', type=parse_list, help='覆盖球员数列表，如 1,3,11')
+    parser.add_argument('--obstacles', type=parse_list, help='覆盖障碍物数列表，如 0,4,22')
+    parser.add_argument('--fields', type=parse_fields, help='覆盖球场尺寸列表，如 800x600,1600x1200')
+    parser.add_argument('--targets', type=lambda s: parse_list(s, str), default=list(TARGETS),
+                        help='测量目标，可选 %s' % ','.join(TARGETS))
+    parser.add_argument('--ccd', choices=('off', 'on', 'both'), default='off',
+                        help='球的连续碰撞检测: off 离散检测，on 开启，both 两者都测')
+    parser.add_argument('--physics-backend', choices=BACKENDS, default='numpy', help='SoccerEnv 的物理后端')
+    parser.add_argument('--obstacle-behaviours', type=lambda s: parse_list(s, str),
+                        help='障碍物行为表（循环分配），如 keeper,zone,zone,mark；默认全部为 block')
+    parser.add_argument('--steps', type=int, default=2000, help='step / wrapper_step 的计时次数')
+    parser.add_argument('--resets', type=int, default=200)
+    parser.add_argument('--renders', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复测量的轮数，取中位数最小的一轮')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='结果写入的 JSON 文件')
+    parser.add_argument('--compare', help='基线 JSON 文件')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的吞吐下降比例')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error('未知的测量目标: %s' % sorted(unknown))
+    if 'render' in args.targets:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+    grid = SWEEPS[args.sweep]
+    players = args.players or grid['players']
+    obstacles = args.obstacles or grid['obstacles']
+    fields = args.fields or grid['fields']
+    ccd_modes = {'off': [False], 'on': [True], 'both': [False, True]}[args.ccd]
+
+    results = []
+    for num_players, num_obstacles, (width, height), ccd in itertools.product(players, obstacles, fields, ccd_modes):
+        results.extend(bench_config(num_players, num_obstacles, width, height, ccd, args.targets, args))
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        },
+        'results': results,
+    }
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report['regressions'] = compare(results, baseline, args.tolerance)
+        if report['regressions']:
+            print('失败: %d 项吞吐下降超过 %.0f%%' % (len(report['regressions']), args.tolerance * 100))
+            status = 1
+        else:
+            print('通过: 没有超过容差的性能下降')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print('结果已写入 %s' % args.output)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
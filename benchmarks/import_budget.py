@@ -0,0 +1,73 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: 检查 envs.environment.soccer_env 的冷启动导入时间是否在预算内，并确认没有加载 pygame。
+#            每次在全新的子进程中用 python -X importtime 测量，取中位数。
+# 用法: python benchmarks/import_budget.py --budget-ms 300 --repeat 5
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODULE = 'envs.environment.soccer_env'
+
+
+def measure_once(module):
+    """
+    在新进程中导入模块，返回 (累计导入时间 ms, 各模块自身耗时 {模块: us}, 是否加载了 pygame)
+    """
+    code = "import sys, %s; print('pygame' in sys.modules)" % module
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    self_times = {}
+    total_us = None
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)', line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        self_times[name] = int(self_us)
+        if name == module:
+            total_us = int(cumulative_us)
+    return total_us / 1000.0, self_times, result.stdout.strip() == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SoccerEnv 导入时间预算检查')
+    parser.add_argument('--module', default=MODULE)
+    parser.add_argument('--budget-ms', type=float, default=300.0, help='累计导入时间预算（毫秒）')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='列出自身耗时最多的模块数')
+    args = parser.parse_args()
+
+    totals = []
+    loaded_pygame = False
+    self_times = {}
+    for _ in range(args.repeat):
+        total_ms, self_times, pygame_loaded = measure_once(args.module)
+        totals.append(total_ms)
+        loaded_pygame |= pygame_loaded
+
+    median = statistics.median(totals)
+    print('%s 导入时间: 中位数 %.1f ms（%s）' % (args.module, median, ', '.join('%.1f' % t for t in totals)))
+    print('自身耗时最多的模块:')
+    for name, us in sorted(self_times.items(), key=lambda item: -item[1])[:args.top]:
+        print('  %8.1f ms  %s' % (us / 1000.0, name))
+
+    ok = True
+    if loaded_pygame:
+        print('失败: 导入时加载了 pygame')
+        ok = False
+    if median > args.budget_ms:
+        print('失败: 超出预算 %.1f ms' % args.budget_ms)
+        ok = False
+    if ok:
+        print('通过: 预算 %.1f ms' % args.budget_ms)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: 核对 keeper 行为的障碍物能挡住射门。球从右边线前 START_DISTANCE 像素处沿直线射向右侧球门，
+#            门将应当先碰到球（ball_hit_obstacle）且整个过程不判进球；任一射门进球或没碰到门将时以非零退出码结束。
+#            离散碰撞检测下球心一个 tick 就越过门将一半厚度时会穿过门将，高速射门在 ccd=True 下核对。
+# 用法: python benchmarks/keeper_save.py
+#       python benchmarks/keeper_save.py --offsets=-20,0,20
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from envs.environment.soccer_env import SoccerEnv  # noqa: E402
+
+# 射门起点与球场右边线的距离；球每个 tick 按摩擦减速，起点太远时球到不了球门
+START_DISTANCE = 300.0
+
+# 核对的射门: (速度（像素/秒）, 是否开启连续碰撞检测)
+SHOTS = ((300.0, False), (300.0, True), (600.0, True), (900.0, True))
+
+
+def shoot(speed, offset, ccd=False, max_steps=200):
+    """
+    从 (width - START_DISTANCE, height / 2 + offset) 以 speed 向右射门，返回 (是否碰到门将, 进球结果或 None)
+    """
+    env = SoccerEnv(num_players=1, num_obstacles=1, obstacle_behaviours=['keeper'], ccd=ccd)
+    env.reset(seed=0)
+    # 球员退到左侧，不挡射门路线
+    env.players[0].x, env.players[0].y = 60.0, 60.0
+    env.ball.x, env.ball.y = env.width - START_DISTANCE, env.height / 2 + offset
+    env.ball.vx, env.ball.vy = speed, 0.0
+    env.pose.mark_stale()
+    action = np.zeros(env.action_space.shape, dtype=np.float32)
+    touched = False
+    for _ in range(max_steps):
+        _, _, terminated, truncated, info = env.step(action)
+        touched |= bool(info.get('ball_hit_obstacle'))
+        if 'goal' in info or terminated or truncated:
+            return touched, info.get('goal')
+    return touched, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='核对 keeper 能挡住射门')
+    parser.add_argument('--offsets', default='0', help='射门高度相对球场中线的偏移，逗号分隔（门将开局在中线上）')
+    args = parser.parse_args()
+
+    failures = 0
+    for speed, ccd in SHOTS:
+        for offset in [float(v) for v in args.offsets.split(',')]:
+            touched, goal = shoot(speed, offset, ccd)
+            ok = touched and goal is None
+            failures += not ok
+            print('speed=%g ccd=%s offset=%+g: 碰到门将=%s 进球=%s%s' % (
+                speed, ccd, offset, touched, goal, '' if ok else '  失败'))
+    if failures:
+        print('%d 次射门没有被挡住' % failures)
+        sys.exit(1)
+    print('全部挡住')
+
+
+if __name__ == '__main__':
+    main()
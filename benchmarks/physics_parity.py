@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: 核对物理后端的一致性。同一组种子和随机动作下，让参考后端（numpy）与待测后端的 SoccerEnv 同步推进，
+#            每一步逐位比较实体表、观测和 info，报告第一次出现差异的位置；全部一致时退出码为 0。
+#            numba 未安装时用解释执行的内核（KernelBackend）核对内核逻辑，并给出提示。
+# 用法: python benchmarks/physics_parity.py
+#       python benchmarks/physics_parity.py --backend numba --steps 2000 --seeds 0,1,2,3
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from envs.environment.soccer_env import SoccerEnv  # noqa: E402
+from envs.entities.table import EntityTable  # noqa: E402
+from envs.physics.backends import KernelBackend, NumpyBackend, make_backend  # noqa: E402
+
+# 核对的环境配置: 球员数、障碍物数和时间步长相关参数
+CONFIGS = (
+    {'num_players': 1, 'num_obstacles': 0},
+    {'num_players': 3, 'num_obstacles': 4},
+    {'num_players': 5, 'num_obstacles': 11},
+    {'num_players': 3, 'num_obstacles': 4, 'frame_skip': 3, 'substeps': 2},
+    {'num_players': 3, 'num_obstacles': 4, 'dt': 0.5, 'ccd': True},
+)
+
+
+def resolve_backend(name):
+    """
+    创建待测后端；numba 不可用时改为解释执行的内核
+    """
+    backend = make_backend('auto' if name == 'numba' else name)
+    if name == 'numba' and isinstance(backend, NumpyBackend):
+        print('numba 未安装: 改为以解释执行的内核（KernelBackend）核对内核逻辑')
+        backend = KernelBackend()
+    return backend
+
+
+def first_difference(reference, candidate):
+    """
+    逐位比较两个实体表，返回第一个不同的 (列名, 实体编号, 参考值, 待测值)，一致时返回 None
+    """
+    a = reference.data[:, :reference.size]
+    b = candidate.data[:, :candidate.size]
+    differ = a.view(np.uint32) != b.view(np.uint32) if a.dtype == np.float32 else a != b
+    if not differ.any():
+        return None
+    column, entity = np.argwhere(differ)[0]
+    return EntityTable.COLUMNS[column], int(entity), float(a[column, entity]), float(b[column, entity])
+
+
+def run_pair(config, backend, seed, steps):
+    """
+    同步推进两个环境，返回 (第一次差异的描述或 None, 参考后端耗时, 待测后端耗时)
+    """
+    reference = SoccerEnv(physics_backend='numpy', **config)
+    candidate = SoccerEnv(physics_backend=backend, **config)
+    reference.reset(seed=seed)
+    candidate.reset(seed=seed)
+    num_actions = reference.action_space.shape[0]
+    actions = np.random.default_rng(seed).uniform(-1, 1, size=(steps, num_actions)).astype(np.float32)
+    elapsed = [0, 0]
+    try:
+        for k in range(steps):
+            results = []
+            for e, env in enumerate((reference, candidate)):
+                start = time.perf_counter_ns()
+                results.append(env.step(actions[k]))
+                elapsed[e] += time.perf_counter_ns() - start
+            (obs_a, reward_a, term_a, trunc_a, info_a), (obs_b, reward_b, term_b, trunc_b, info_b) = results
+            diff = first_difference(reference.entities, candidate.entities)
+            if diff is not None:
+                return 'step %d: %s[%d] %r != %r' % ((k,) + diff), elapsed
+            if obs_a.tobytes() != obs_b.tobytes():
+                return 'step %d: 观测不一致' % k, elapsed
+            if (reward_a, term_a, trunc_a, info_a) != (reward_b, term_b, trunc_b, info_b):
+                return 'step %d: info 不一致 %r != %r' % (k, info_a, info_b), elapsed
+            if term_a or trunc_a:
+                reference.reset()
+                candidate.reset()
+        return None, elapsed
+    finally:
+        reference.close()
+        candidate.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='物理后端一致性核对')
+    parser.add_argument('--backend', default='numba', help='待测后端（与 numpy 参考实现比较）')
+    parser.add_argument('--steps', type=int, default=500)
+    parser.add_argument('--seeds', type=lambda s: [int(v) for v in s.split(',') if v], default=[0, 1, 2])
+    args = parser.parse_args()
+
+    backend = resolve_backend(args.backend)
+    failures = 0
+    for config in CONFIGS:
+        label = ' '.join('%s=%s' % item for item in config.items())
+        for seed in args.seeds:
+            diff, (ref_ns, cand_ns) = run_pair(config, backend, seed, args.steps)
+            status = '一致' if diff is None else '不一致: ' + diff
+            print('%-60s seed=%-3d numpy %7.1f us/step  %s %7.1f us/step  %s' % (
+                label, seed, ref_ns / args.steps / 1e3, backend.name, cand_ns / args.steps / 1e3, status))
+            failures += diff is not None
+    if failures:
+        print('失败: %d 组轨迹不一致' % failures)
+        return 1
+    print('通过: 所有轨迹逐位一致')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
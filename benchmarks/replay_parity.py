@@ -0,0 +1,75 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: 核对动作日志回放与记录逐位一致。用 ActionLogRecorder 记录随机动作的回合（分别以 float32 和 float64
+#            动作调用 step），再用 ReplayPlayer 随机跳转到各个位置，逐位比较观测和状态快照；任一位置不一致时以非零退出码结束。
+# 用法: python benchmarks/replay_parity.py
+#       python benchmarks/replay_parity.py --steps 1000 --seeks 500 --keyframe-every 50
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from envs.environment.soccer_env import SoccerEnv  # noqa: E402
+from envs.environment.replay import ActionLogRecorder, ReplayPlayer  # noqa: E402
+
+# 核对的环境配置
+CONFIGS = (
+    {'num_players': 1, 'num_obstacles': 0},
+    {'num_players': 3, 'num_obstacles': 4},
+)
+
+
+def record(config, dtype, seed, steps, keyframe_every):
+    """
+    以 dtype 类型的随机动作记录一个回合，返回 (动作日志, 各位置的观测, 各位置的状态快照)
+    """
+    env = ActionLogRecorder(SoccerEnv(max_steps=steps, **config), keyframe_every=keyframe_every)
+    obs, _ = env.reset(seed=seed)
+    rng = np.random.default_rng(seed)
+    observations, states = [obs.copy()], [env.unwrapped.get_state().copy()]
+    while True:
+        action = rng.uniform(-1, 1, size=env.action_space.shape).astype(dtype)
+        obs, _, terminated, truncated, _ = env.step(action)
+        observations.append(obs.copy())
+        states.append(env.unwrapped.get_state().copy())
+        if terminated or truncated:
+            break
+    env.close()
+    return env.last_log, observations, states
+
+
+def main():
+    parser = argparse.ArgumentParser(description='核对动作日志回放与记录逐位一致')
+    parser.add_argument('--steps', type=int, default=500, help='每个回合的最大步数')
+    parser.add_argument('--seeks', type=int, default=200, help='每个回合随机跳转的次数')
+    parser.add_argument('--keyframe-every', type=int, default=50, help='关键帧间隔')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    failures = 0
+    for config in CONFIGS:
+        for dtype in (np.float32, np.float64):
+            log, observations, states = record(config, dtype, args.seed, args.steps, args.keyframe_every)
+            player = ReplayPlayer(log)
+            positions = np.random.default_rng(args.seed).integers(0, len(player), args.seeks).tolist()
+            mismatched = [step for step in positions + [0, len(player) - 1]
+                          if not (np.array_equal(player.seek(step), observations[step]) and
+                                  np.array_equal(player.env.unwrapped.get_state(), states[step]))]
+            player.close()
+            failures += bool(mismatched)
+            print('%s %s: %d 步, %d 个位置不一致%s' % (
+                config, np.dtype(dtype).name, len(log), len(mismatched),
+                '（例如 %s）' % mismatched[:5] if mismatched else ''))
+    if failures:
+        print('%d 组回放与记录不一致' % failures)
+        sys.exit(1)
+    print('全部一致')
+
+
+if __name__ == '__main__':
+    main()
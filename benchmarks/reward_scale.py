@@ -0,0 +1,90 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: 核对 DefaultRewardWrapper 的奖励尺度与 frame_skip 无关。同一组种子下，frame_skip=K 的环境每个动作执行一次，
+#            frame_skip=1 的环境把同一个动作重复 K 次，两者推进相同的物理 tick；把各种子整回合的奖励项累计值相加后比较，
+#            frame_skip=K 的累计值与 K 个单步之和的比值偏离 1 超过容差时报告并以非零退出码结束。
+#            塑形项在 frame_skip=K 时每 K 个 tick 取一次状态，比值只会近似为 1（vision 这类 0/1 项误差较大）；
+#            总奖励各项正负相抵，按与各项绝对值之和的相对误差判断。
+# 用法: python benchmarks/reward_scale.py
+#       python benchmarks/reward_scale.py --frame-skips 2,4,8 --seeds 0,1,2 --actions 200 --tolerance 0.1
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from envs.environment.soccer_env import SoccerEnv  # noqa: E402
+from envs.environment.reward_wrapper import DefaultRewardWrapper, PLAYER_TERMS, TEAM_TERMS  # noqa: E402
+
+# 核对的环境配置
+CONFIGS = (
+    {'num_players': 1, 'num_obstacles': 0},
+    {'num_players': 3, 'num_obstacles': 4},
+)
+
+# 累计值的绝对值小于该阈值的奖励项不参与比值判断（例如整回合都没有发生的进球、出界）
+MIN_MAGNITUDE = 1e-3
+
+
+def episode_returns(config, frame_skip, repeat, seed, num_actions):
+    """
+    推进一个回合，返回 {奖励项: 累计值}，"total" 为总奖励；每个动作在 env 中重复 repeat 次
+    """
+    env = DefaultRewardWrapper(SoccerEnv(frame_skip=frame_skip, max_steps=num_actions * repeat + 1, **config),
+                               return_breakdown=True)
+    env.reset(seed=seed)
+    actions = np.random.default_rng(seed).uniform(
+        -1, 1, size=(num_actions, env.action_space.shape[0])).astype(np.float32)
+    totals = dict.fromkeys(TEAM_TERMS + PLAYER_TERMS + ('total',), 0.0)
+    for action in actions:
+        for _ in range(repeat):
+            _, reward, terminated, truncated, info = env.step(action)
+            for name, value in info['reward_terms'].items():
+                totals[name] += value
+            totals['total'] += reward
+            if terminated or truncated:
+                return totals
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='核对奖励尺度与 frame_skip 无关')
+    parser.add_argument('--frame-skips', default='2,4', help='待核对的 frame_skip，逗号分隔')
+    parser.add_argument('--seeds', default='0,1,2', help='随机种子，逗号分隔')
+    parser.add_argument('--actions', type=int, default=200, help='每个回合的动作数')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='比值允许偏离 1 的幅度')
+    args = parser.parse_args()
+
+    seeds = [int(s) for s in args.seeds.split(',')]
+    failures = 0
+    for config in CONFIGS:
+        for frame_skip in [int(k) for k in args.frame_skips.split(',')]:
+            single, skipped = {}, {}
+            for seed in seeds:
+                for totals, returns in ((single, episode_returns(config, 1, frame_skip, seed, args.actions)),
+                                        (skipped, episode_returns(config, frame_skip, 1, seed, args.actions))):
+                    for name, value in returns.items():
+                        totals[name] = totals.get(name, 0.0) + value
+            ratios = {name: skipped[name] / single[name] for name in TEAM_TERMS + PLAYER_TERMS
+                      if abs(single[name]) >= MIN_MAGNITUDE}
+            bad = sorted(name for name, ratio in ratios.items() if abs(ratio - 1.0) > args.tolerance)
+            magnitude = sum(abs(single[name]) for name in TEAM_TERMS + PLAYER_TERMS)
+            total_error = abs(skipped['total'] - single['total']) / max(magnitude, MIN_MAGNITUDE)
+            if total_error > args.tolerance:
+                bad.append('total')
+            failures += bool(bad)
+            print('%s frame_skip=%d: %s total_error=%.3f%s' % (
+                config, frame_skip, ' '.join('%s=%.3f' % (name, ratio) for name, ratio in ratios.items()),
+                total_error, '  超出容差: %s' % bad if bad else ''))
+    if failures:
+        print('%d 组核对的奖励尺度与单步不一致' % failures)
+        sys.exit(1)
+    print('全部一致（容差 %.0f%%）' % (args.tolerance * 100))
+
+
+if __name__ == '__main__':
+    main()
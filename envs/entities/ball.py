@@ -1,8 +1,3 @@
-import sys
-import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-
-import pygame
 from envs.entities.base import Entity
 
 # 分类: 实体类模块
@@ -12,8 +7,10 @@ class Ball(Entity):
     """
     足球类
     """
-    def __init__(self, x, y, radius=10):
-        super().__init__(x, y, radius * 2, radius * 2, (255, 0, 0))  # 红色球
+    __slots__ = ('radius', 'mass', 'friction')
+
+    def __init__(self, x, y, radius=10, table=None):
+        super().__init__(x, y, radius * 2, radius * 2, (255, 0, 0), table)  # 红色球
         self.radius = radius
         self.mass = 50.0
         self.friction = 0.88  # 摩擦系数
@@ -23,18 +20,13 @@ class Ball(Entity):
         更新球的位置，考虑摩擦力
         """
         super().update(dt)
-        # 应用摩擦力
-        self.vx *= self.friction
-        self.vy *= self.friction
-
-        # 如果速度很小，停止移动
-        if abs(self.vx) < 0.1:
-            self.vx = 0
-        if abs(self.vy) < 0.1:
-            self.vy = 0
+        # 应用摩擦力，如果速度很小，停止移动
+        self.table.apply_friction(slice(self.id, self.id + 1), self.friction)
 
-    def draw(self, screen):
+    def draw(self, screen, scale=1.0):
         """
-        绘制足球
+        绘制足球，scale 为渲染缩放比例
         """
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.radius)
+        import pygame  # 只有渲染时才加载 pygame
+        pygame.draw.circle(screen, self.color, (int(self.x * scale), int(self.y * scale)),
+                           max(1, int(self.radius * scale)))
@@ -1,34 +1,44 @@
-import sys
-import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-
-import pygame
 import numpy as np
+from envs.entities.table import EntityTable, Column
+
 
 class Entity:
     """
     基础实体类
+    状态保存在实体表（EntityTable）的一行中，实体对象只是该行的视图；
+    不传 table 时为实体单独创建一张表
     """
-    def __init__(self, x, y, width, height, color):
+    __slots__ = ('table', 'id', 'color')
+
+    x = Column('x')
+    y = Column('y')
+    vx = Column('vx')
+    vy = Column('vy')
+    angle = Column('angle')
+    angular_velocity = Column('angular_velocity')
+    prev_vx = Column('prev_vx')
+    prev_vy = Column('prev_vy')
+    prev_angle = Column('prev_angle')
+    width = Column('width')
+    height = Column('height')
+
+    def __init__(self, x, y, width, height, color, table=None):
+        if table is None:
+            table = EntityTable(1)
+        self.table = table
+        self.id = table.allocate()
         self.x = x
         self.y = y
         self.width = width
         self.height = height
         self.color = color
-        self.vx = 0
-        self.vy = 0
-        self.angle = 0
-        self.angular_velocity = 0
 
     def update(self, dt):
         """
         更新实体位置
         """
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-        self.angle += self.angular_velocity * dt
-        # 保持角度在0-360之间
-        self.angle = self.angle % 360
+        # 角度在积分时保持在0-360之间
+        self.table.integrate(dt, slice(self.id, self.id + 1))
 
     def draw(self, screen):
         """
@@ -1,9 +1,6 @@
-import sys
-import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-import pygame
 import numpy as np
 from envs.entities.base import Entity
+from envs.entities.table import Column
 
 # 分类: 实体类模块
 # 描述: 定义障碍物类（Obstacle），继承自基础实体类（Entity）。
@@ -12,8 +9,14 @@ class Obstacle(Entity):
     """
     障碍物类
     """
-    def __init__(self, x, y, width=30, height=30):
-        super().__init__(x, y, width, height, (150, 75, 0))  # 棕色障碍物
+    __slots__ = ()
+
+    target_x = Column('target_x')
+    target_y = Column('target_y')
+    speed = Column('speed')
+
+    def __init__(self, x, y, width=30, height=30, table=None):
+        super().__init__(x, y, width, height, (150, 75, 0), table)  # 棕色障碍物
         self.target_x = x
         self.target_y = y
         self.speed = 20.0
@@ -35,19 +38,13 @@ class Obstacle(Entity):
         """
         更新障碍物位置
         """
-        dx = self.target_x - self.x
-        dy = self.target_y - self.y
-        length = np.sqrt(dx ** 2 + dy ** 2)
-        if length > 5:
-            dx = dx / length * self.speed * dt
-            dy = dy / length * self.speed * dt
-            self.x += dx
-            self.y += dy
+        self.table.steer(dt, slice(self.id, self.id + 1))
 
-    def draw(self, screen):
+    def draw(self, screen, scale=1.0):
         """
-        绘制障碍物
+        绘制障碍物，scale 为渲染缩放比例
         """
-        rect = pygame.Rect(int(self.x - self.width / 2), int(self.y - self.height / 2),
-                           self.width, self.height)
+        import pygame  # 只有渲染时才加载 pygame
+        rect = pygame.Rect(int((self.x - self.width / 2) * scale), int((self.y - self.height / 2) * scale),
+                           max(1, int(self.width * scale)), max(1, int(self.height * scale)))
         pygame.draw.rect(screen, self.color, rect)
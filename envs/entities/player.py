@@ -1,32 +1,34 @@
 # 分类: 实体类模块
 # 描述: 定义球员类（Player），继承自基础实体类（Entity）。
 
-import pygame
 import numpy as np
-import sys
-import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from envs.entities.base import Entity
 from envs.entities.base import distance
+from envs.entities.table import FlagColumn
 
 class Player(Entity):
     """
     球员类
     """
-    def __init__(self, x, y, width=20, height=20):
-        super().__init__(x, y, width, height, (0, 0, 255))  # 蓝色方块
+    __slots__ = ('mass', 'max_speed', 'perception_range', 'max_kick')
+
+    can_see_ball = FlagColumn('can_see_ball')
+
+    def __init__(self, x, y, width=20, height=20, table=None):
+        super().__init__(x, y, width, height, (0, 0, 255), table)  # 蓝色方块
         self.mass = 5.0
         self.max_speed = 100.0
         self.perception_range = 150.0  # 球员感知范围
         self.can_see_ball = False
         self.max_kick = 500  # 最大踢球力度
 
-    def can_perceive_ball(self, ball):
+    def can_perceive_ball(self, ball, heading=None):
         """
-        检查球员是否能感知到球
+        检查球员是否能感知到球，heading 为位姿缓存中的朝向 (cos, sin)
         """
-        direction_x = np.cos(np.radians(self.angle))
-        direction_y = np.sin(np.radians(self.angle))
+        if heading is None:
+            heading = np.cos(np.radians(self.angle)), np.sin(np.radians(self.angle))
+        direction_x, direction_y = heading
         to_ball_x = ball.x - self.x
         to_ball_y = ball.y - self.y
         dist = distance((self.x, self.y), (ball.x, ball.y))
@@ -37,19 +39,23 @@ class Player(Entity):
         self.can_see_ball = False
         return False
 
-    def draw(self, screen):
+    def draw(self, screen, scale=1.0, heading=None):
         """
-        绘制球员
+        绘制球员，scale 为渲染缩放比例，heading 为位姿缓存中的朝向 (cos, sin)
         """
-        rect = pygame.Rect(int(self.x - self.width / 2), int(self.y - self.height / 2),
-                           self.width, self.height)
+        import pygame  # 只有渲染时才加载 pygame
+        x, y = self.x * scale, self.y * scale
+        rect = pygame.Rect(int((self.x - self.width / 2) * scale), int((self.y - self.height / 2) * scale),
+                           max(1, int(self.width * scale)), max(1, int(self.height * scale)))
         pygame.draw.rect(screen, self.color, rect)
-        direction_x = np.cos(np.radians(self.angle)) * 20
-        direction_y = np.sin(np.radians(self.angle)) * 20
+        if heading is None:
+            heading = np.cos(np.radians(self.angle)), np.sin(np.radians(self.angle))
+        direction_x = heading[0] * 20 * scale
+        direction_y = heading[1] * 20 * scale
         pygame.draw.line(screen, (255, 255, 255),
-                         (int(self.x), int(self.y)),
-                         (int(self.x + direction_x), int(self.y + direction_y)), 2)
+                         (int(x), int(y)),
+                         (int(x + direction_x), int(y + direction_y)), max(1, int(2 * scale)))
         if self.can_see_ball:
             pygame.draw.circle(screen, (0, 255, 0, 50),
-                               (int(self.x), int(self.y)),
-                               int(self.perception_range), 1)
+                               (int(x), int(y)),
+                               max(1, int(self.perception_range * scale)), 1)
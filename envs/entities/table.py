@@ -0,0 +1,129 @@
+# 分类: 实体类模块
+# 描述: 定义实体表（EntityTable），以结构数组（SoA）形式连续存放所有实体的状态，
+#       每一列为 float32 数组，按实体编号索引；Player/Ball/Obstacle 只是表中某一行的视图。
+
+import numpy as np
+
+
+class EntityTable:
+    """
+    实体状态表
+    data 的形状为 (列数, 容量)，每一行是一个状态列，例如 table.x[id] 即实体 id 的 x 坐标
+    """
+    # 前7列的顺序与球员观测一致，观测可以直接按连续切片读取
+    COLUMNS = (
+        'x', 'y', 'angle', 'vx', 'vy', 'angular_velocity', 'can_see_ball',
+        'prev_vx', 'prev_vy', 'prev_angle',
+        'width', 'height', 'target_x', 'target_y', 'speed',
+    )
+    INDEX = {name: i for i, name in enumerate(COLUMNS)}
+
+    def __init__(self, capacity=8, dtype=np.float32):
+        self.dtype = np.dtype(dtype)
+        self.data = np.zeros((len(self.COLUMNS), max(int(capacity), 1)), dtype=self.dtype)
+        self.size = 0
+
+    @property
+    def capacity(self):
+        return self.data.shape[1]
+
+    def allocate(self):
+        """
+        分配一个新实体行，返回实体编号；容量不足时按倍数扩容
+        """
+        if self.size == self.capacity:
+            grown = np.zeros((len(self.COLUMNS), self.capacity * 2), dtype=self.dtype)
+            grown[:, :self.size] = self.data[:, :self.size]
+            self.data = grown
+        entity_id = self.size
+        self.data[:, entity_id] = 0
+        self.size += 1
+        return entity_id
+
+    def clear(self):
+        """
+        清空所有实体（保留已分配的内存）
+        """
+        self.size = 0
+
+    def column(self, name):
+        """
+        返回某一列已分配部分的视图
+        """
+        return self.data[self.INDEX[name], :self.size]
+
+    def __getattr__(self, name):
+        # table.x / table.vx 等直接返回列视图
+        index = EntityTable.INDEX.get(name)
+        if index is None:
+            raise AttributeError(name)
+        return self.data[index, :self.size]
+
+    # ------------------------------ 批量更新 ------------------------------ #
+    def integrate(self, dt, rows):
+        """
+        对 rows 中的实体做一次显式欧拉积分，角度保持在 0-360 之间
+        """
+        d = self.data
+        # x, y, angle 三列与 vx, vy, angular_velocity 三列各自相邻且顺序对应，三列一次积分
+        x, vx, a = self.INDEX['x'], self.INDEX['vx'], self.INDEX['angle']
+        d[x:x + 3, rows] += d[vx:vx + 3, rows] * dt
+        d[a, rows] %= 360
+
+    def apply_friction(self, rows, friction, stop_speed=0.1):
+        """
+        对 rows 中的实体施加摩擦，速度很小时停止
+        """
+        d = self.data
+        # vx, vy 两列相邻，一次计算
+        vx = self.INDEX['vx']
+        v = d[vx:vx + 2, rows] * friction
+        v[np.abs(v) < stop_speed] = 0
+        d[vx:vx + 2, rows] = v
+
+    def steer(self, dt, rows, arrive_radius=5):
+        """
+        rows 中的实体以各自的 speed 向 (target_x, target_y) 匀速移动，距离小于 arrive_radius 时停下
+        """
+        d = self.data
+        x, y = self.INDEX['x'], self.INDEX['y']
+        dx = d[self.INDEX['target_x'], rows] - d[x, rows]
+        dy = d[self.INDEX['target_y'], rows] - d[y, rows]
+        length = np.sqrt(dx ** 2 + dy ** 2)
+        moving = length > arrive_radius
+        if not np.any(moving):
+            return
+        speed = d[self.INDEX['speed'], rows]
+        safe = np.where(moving, length, 1)
+        d[x, rows] += np.where(moving, dx / safe * speed * dt, 0)
+        d[y, rows] += np.where(moving, dy / safe * speed * dt, 0)
+
+
+class Column:
+    """
+    把实体属性映射到实体表中的一列
+    """
+    __slots__ = ('index',)
+
+    def __init__(self, name):
+        self.index = EntityTable.INDEX[name]
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return float(obj.table.data[self.index, obj.id])
+
+    def __set__(self, obj, value):
+        obj.table.data[self.index, obj.id] = value
+
+
+class FlagColumn(Column):
+    """
+    以 0/1 浮点数存放的布尔列
+    """
+    __slots__ = ()
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return bool(obj.table.data[self.index, obj.id])
@@ -0,0 +1,429 @@
+# 分类: 环境模块
+# 描述: 定义批量足球环境（BatchedSoccerEnv），用 (N, …) 数组同时推进 N 场比赛，
+#       每个阶段对所有场地只做一次数组运算，结果与 N 个独立的 SoccerEnv 一致。
+#       N 个场地的实体首尾相接存放在一张 EntityTable 中（场地 k 占第 k*R 到 k*R+R-1 行，R 为每个场地的实体数），
+#       开局布局、实体尺寸和速度等参数取自同配置的 SoccerEnv，积分、摩擦和障碍物移动直接调用 EntityTable 的批量方法，
+#       物理规则常数与 SoccerEnv 共用（envs.physics.backends / utils）。
+#       状态与 EntityTable 一样以 float32 存放，标量计算处先升为 float64 再写回，保证逐位一致。
+
+import numpy as np
+from gymnasium.vector import VectorEnv
+from gymnasium.vector.utils import batch_space
+from envs.physics.collision import collide_rects, collide_rects_circle
+from envs.physics.backends import ARRIVE_RADIUS, BOUNDARY_MARGIN, RESTITUTION, STOP_SPEED, TARGET_OFFSET
+from envs.physics.utils import GOAL_DEPTH, GOAL_HEIGHT
+from envs.entities.table import EntityTable
+from envs.environment import snapshot
+from envs.environment.soccer_env import SoccerEnv
+
+try:
+    from gymnasium.vector import AutoresetMode
+    _NEXT_STEP = AutoresetMode.NEXT_STEP
+except ImportError:  # gymnasium < 1.1
+    _NEXT_STEP = "NextStep"
+
+_X, _Y, _A, _VX, _VY, _W, _SEE = (EntityTable.INDEX[name] for name in
+                                  ('x', 'y', 'angle', 'vx', 'vy', 'angular_velocity', 'can_see_ball'))
+_WIDTH, _HEIGHT = EntityTable.INDEX['width'], EntityTable.INDEX['height']
+_TX, _TY = EntityTable.INDEX['target_x'], EntityTable.INDEX['target_y']
+
+# 每步 info 中的碰撞事件，与 SoccerEnv 的 info 键相同
+EVENTS = ('collision_obstacle', 'collision_teammate', 'ball_touch', 'ball_hit_obstacle')
+
+
+def _f64(a):
+    """
+    float32 状态升为 float64，对应 SoccerEnv 中实体属性读出为 Python float
+    """
+    return a.astype(np.float64)
+
+
+def _heading(angle):
+    """
+    角度（float32，度）对应的朝向 (cos, sin)，与位姿缓存的计算相同
+    """
+    angle_rad = np.radians(_f64(angle))
+    return np.cos(angle_rad), np.sin(angle_rad)
+
+
+def _bounce_ball(mask, bx, by, bvx, bvy, x, y, hw, hh, c, s, vx, vy, radius):
+    """
+    批量处理球与矩形的碰撞响应（与 handle_collision 使用位姿缓存时一致），只作用于 mask 为真的场地
+    (c, s) 为矩形的朝向
+    """
+    # 球心转到矩形的局部坐标，取矩形上的最近点再转回世界坐标（PoseCache.to_local / to_world）
+    dx, dy = bx - x, by - y
+    local_x, local_y = dx * c + dy * s, dy * c - dx * s
+    nearest_x = np.clip(local_x, -hw, hw)
+    nearest_y = np.clip(local_y, -hh, hh)
+    world_x = nearest_x * c - nearest_y * s + x
+    world_y = nearest_x * s + nearest_y * c + y
+    nx = bx - world_x
+    ny = by - world_y
+    norm = np.hypot(nx, ny)
+    zero = norm == 0
+    safe = np.where(zero, 1.0, norm)
+    nx = np.where(zero, 1.0, nx / safe)
+    ny = np.where(zero, 0.0, ny / safe)
+    v_dot_n = (bvx - vx) * nx + (bvy - vy) * ny
+    bounce = mask & (v_dot_n < 0)
+    impulse = -(1 + RESTITUTION) * v_dot_n
+    bvx = np.where(bounce, bvx + impulse * nx, bvx)
+    bvy = np.where(bounce, bvy + impulse * ny, bvy)
+    overlap = radius - norm
+    push = mask & (overlap > 0)
+    bx = np.where(push, bx + nx * overlap, bx)
+    by = np.where(push, by + ny * overlap, by)
+    return bx, by, bvx, bvy
+
+
+class BatchedSoccerEnv(VectorEnv):
+    """
+    批量足球环境
+    所有场地的实体状态保存在一张实体表中，tables 是它形状为 (列数, 场地数, 每个场地的实体数) 的视图；
+    动作解析、积分、摩擦、进球判定、边界检查和观测构建均一次作用于全部场地。
+    支持 SoccerEnv 的 dt、frame_skip、substeps（进球或球出界的场地在同一动作剩余的子步中不再推进）；
+    ccd、障碍物行为表、开局库和 numpy 以外的物理后端不支持，传入时报错。
+    球员与障碍物相撞时每次碰撞取一个随机数，按场地、球员、障碍物的顺序从共享的生成器中抽取，
+    与 N 个共用同一个生成器、按场地顺序依次 step 的 SoccerEnv 相同。
+    采用 next-step 自动重置：结束的场地在下一次 step 时重置并忽略其动作。
+    """
+    metadata = {'render_modes': [], 'autoreset_mode': _NEXT_STEP}
+
+    def __init__(self, num_envs, width=800, height=600, num_players=1, num_obstacles=0, max_steps=10000,
+                 dt=0.1, frame_skip=1, substeps=1, ccd=False, obstacle_behaviours=None, scenario_bank=None,
+                 physics_backend='numpy'):
+        unsupported = [name for name, value, default in (
+            ('ccd', ccd, False), ('obstacle_behaviours', obstacle_behaviours, None),
+            ('scenario_bank', scenario_bank, None), ('physics_backend', physics_backend, 'numpy'))
+            if value != default]
+        if unsupported:
+            raise ValueError("BatchedSoccerEnv 不支持以下选项: %s" % ', '.join(unsupported))
+
+        # 单场地的空间、开局布局和实体参数取自同配置的 SoccerEnv
+        template = SoccerEnv(width=width, height=height, num_players=num_players, num_obstacles=num_obstacles,
+                             max_steps=max_steps, dt=dt, frame_skip=frame_skip, substeps=substeps)
+        template.reset()
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.num_players = num_players
+        self.num_obstacles = num_obstacles
+        self.max_steps = max_steps
+        self.action_num = template.action_num
+        self.dt = template.dt
+        self.frame_skip = template.frame_skip
+        self.substeps = template.substeps
+        self.right_goal = template.right_goal
+        self.ball_radius = template.ball.radius
+        self.ball_friction = template.ball.friction
+        self._max_speed = template._max_speed
+        self._perception_range = template._perception_range
+        self._player_obs_scale = template._player_obs_scale
+        self._position_scale = template._position_scale
+        self._layout = template.entities.data[:, :template.entities.size].copy()
+        template.close()
+
+        self.single_action_space = template.action_space
+        self.single_observation_space = template.observation_space
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+
+        # 实体表: 每个场地依次为球、球员、障碍物
+        n, p, o = num_envs, num_players, num_obstacles
+        r = 1 + p + o
+        self.table = EntityTable(n * r)
+        self.table.size = n * r
+        self.tables = self.table.data.reshape(len(EntityTable.COLUMNS), n, r)
+        self._players = slice(1, 1 + p)
+        self._obstacles = slice(1 + p, r)
+        self._boxes = slice(1, r)
+        # 各场地的球、球和球员、障碍物在整张表中的行号，供 EntityTable 的批量方法使用
+        first = np.arange(n)[:, None] * r
+        self._ball_rows = first[:, 0]
+        self._moving_rows = (first + np.arange(1 + p)).ravel()
+        self._obstacle_rows = (first + np.arange(1 + p, r)).ravel()
+        # 球员与矩形的候选配对: 只检测编号更大的矩形（与 SoccerEnv 的配对相同）
+        self._pair_mask = np.triu(np.ones((p, p + o), dtype=bool), k=1)
+
+        # 计数器
+        self.current_step = np.zeros(n, dtype=np.int64)
+        self.steps_without_ball = np.zeros(n, dtype=np.int64)
+        self._autoreset = np.zeros(n, dtype=bool)
+        # set_state 恢复随机数生成器时复用的状态字典
+        self._rng_state = None
+
+        self._obs = np.zeros((n,) + self.single_observation_space.shape, dtype=np.float32)
+
+    # ------------------------------ 重置 ------------------------------ #
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        self._autoreset[:] = False
+        return self._get_observation(), {}
+
+    def _reset_envs(self, mask):
+        """
+        把 mask 选中的场地恢复到初始布局（与 SoccerEnv.reset 相同）
+        """
+        self.tables[:, mask] = self._layout[:, None, :]
+        self.current_step[mask] = 0
+        self.steps_without_ball[mask] = 0
+
+    # ------------------------------ 状态快照 ------------------------------ #
+    @property
+    def state_size(self):
+        return snapshot.state_size(self.num_players, self.num_obstacles)
+
+    def _state_tables(self, states):
+        """
+        快照中各场地实体表部分的视图 (N, 列数, 行数)
+        """
+        table = snapshot.table_slice(self.num_players, self.num_obstacles)
+        return states[:, table].reshape(self.num_envs, len(EntityTable.COLUMNS), -1)
+
+    def get_state(self, out=None):
+        """
+        返回 (N, state_size) 的快照数组，每行布局与 SoccerEnv.get_state 相同
+        批量环境不运行奖励包装器，prev_* 列保持开局布局中的值（与未包装的 SoccerEnv 相同）；
+        各行的随机数状态均为共享生成器的状态
+        """
+        if out is None:
+            out = np.empty((self.num_envs, self.state_size))
+        out[:, 0] = self.current_step
+        out[:, 1] = self.steps_without_ball
+        self._state_tables(out)[...] = self.tables.transpose(1, 0, 2)
+        end = snapshot.table_slice(self.num_players, self.num_obstacles).stop
+        snapshot.pack_rng_state(self.np_random, out[0, end:])
+        out[1:, end:] = out[0, end:]
+        return out
+
+    def set_state(self, states):
+        """
+        把快照载入各场地并返回观测；states 为 (N, state_size)，或单个快照 (state_size,)，
+        后者载入到所有场地，用于从同一状态展开大量分支。共享生成器恢复为第一个快照中的随机数状态
+        """
+        states = np.asarray(states, dtype=np.float64)
+        if states.shape[-1] != self.state_size:
+            raise ValueError("快照长度不匹配: %d != %d" % (states.shape[-1], self.state_size))
+        states = np.broadcast_to(states, (self.num_envs, self.state_size))
+        self.current_step[...] = states[:, 0]
+        self.steps_without_ball[...] = states[:, 1]
+        self.tables[...] = self._state_tables(states).transpose(1, 0, 2)
+        end = snapshot.table_slice(self.num_players, self.num_obstacles).stop
+        self._rng_state = snapshot.unpack_rng_state(self.np_random, states[0, end:], self._rng_state)
+        self._autoreset[:] = False
+        return self._get_observation()
+
+    # ------------------------------ 步进 ------------------------------ #
+    def step(self, actions):
+        n = self.num_envs
+        rewards = np.zeros(n)
+        terminated = np.zeros(n, dtype=bool)
+        truncated = np.zeros(n, dtype=bool)
+
+        # 上一步结束的场地先重置，本步动作忽略
+        resetting = self._autoreset.copy()
+        if resetting.any():
+            self._reset_envs(resetting)
+
+        self.current_step[~resetting] += 1
+        # 达到最大步数的场地直接截断，不推进物理
+        truncated[:] = ~resetting & (self.current_step >= self.max_steps)
+        live = ~resetting & ~truncated
+
+        # 同一个动作推进 frame_skip * substeps 个子步；碰撞、出界事件在各子步间累积，
+        # 进球或球出界的场地不再推进
+        actions = np.asarray(actions).reshape(n, self.num_players, self.action_num)
+        dt = self.dt / self.substeps
+        friction = self.ball_friction if self.substeps == 1 else self.ball_friction ** (1.0 / self.substeps)
+        events = {key: np.zeros(n, dtype=bool) for key in EVENTS}
+        goal = np.zeros(n, dtype=np.int8)
+        ball_out = np.zeros(n, dtype=bool)
+        player_out = np.zeros(n, dtype=bool)
+        for _ in range(self.frame_skip * self.substeps):
+            if not live.any():
+                break
+            saved = None if live.all() else self.tables.copy()
+            self._apply_actions(actions)
+            self._perceive_ball()
+            self._steer_obstacles()
+            self._integrate(dt, friction)
+            substep_events = self._handle_collisions(live)
+            substep_goal = self._check_goal()
+            substep_ball_out, substep_player_out = self._check_boundaries()
+
+            # 不再推进的场地恢复原状态
+            if saved is not None:
+                self.tables[:, ~live] = saved[:, ~live]
+            for key, value in substep_events.items():
+                events[key] |= value & live
+            goal = np.where(live, substep_goal, goal)
+            ball_out |= substep_ball_out & live
+            player_out |= substep_player_out & live
+            live &= (substep_goal == 0) & ~substep_ball_out
+        terminated[:] = (goal != 0) | ball_out
+
+        infos = {}
+        for key, value in events.items():
+            self._put_info(infos, key, value)
+        self._put_info(infos, "goal", goal)
+        self._put_info(infos, "ball_out", ball_out)
+        self._put_info(infos, "player_out", player_out)
+
+        self._autoreset = terminated | truncated
+        return self._get_observation(), rewards, terminated, truncated, infos
+
+    def _put_info(self, infos, key, value):
+        infos[key] = value
+        infos["_" + key] = np.ones(self.num_envs, dtype=bool)
+
+    def _apply_actions(self, actions):
+        """
+        动作解析: [前后速度, 左右速度, 自转速度] -> 世界坐标速度
+        """
+        d, players = self.tables, self._players
+        c, s = _heading(d[_A, :, players])
+        forward_speed = actions[..., 0] * self._max_speed
+        lateral_speed = actions[..., 1] * self._max_speed
+        d[_VX, :, players] = c * forward_speed - s * lateral_speed
+        d[_VY, :, players] = s * forward_speed + c * lateral_speed
+        d[_W, :, players] = actions[..., 2] * 180
+
+    def _perceive_ball(self):
+        d, players = self.tables, self._players
+        direction_x, direction_y = _heading(d[_A, :, players])
+        to_ball_x = _f64(d[_X, :, 0:1]) - d[_X, :, players]
+        to_ball_y = _f64(d[_Y, :, 0:1]) - d[_Y, :, players]
+        dist = np.sqrt(to_ball_x * to_ball_x + to_ball_y * to_ball_y)
+        dot_product = direction_x * to_ball_x + direction_y * to_ball_y
+        d[_SEE, :, players] = (dot_product > 0) & (dist < self._perception_range)
+
+    def _steer_obstacles(self):
+        """
+        障碍物目标点: 球到右侧球门连线上、球前方 TARGET_OFFSET 处（与 NumpyBackend.set_obstacle_targets 相同）
+        """
+        if not self.num_obstacles:
+            return
+        d = self.tables
+        bx, by = _f64(d[_X, :, 0]), _f64(d[_Y, :, 0])
+        to_goal_x = self.right_goal[0] - bx
+        to_goal_y = self.right_goal[1] - by
+        length = np.sqrt(to_goal_x ** 2 + to_goal_y ** 2)
+        safe = np.where(length > 0, length, 1.0)
+        to_goal_x = np.where(length > 0, to_goal_x / safe, to_goal_x)
+        to_goal_y = np.where(length > 0, to_goal_y / safe, to_goal_y)
+        d[_TX, :, self._obstacles] = (bx + to_goal_x * TARGET_OFFSET)[:, None]
+        d[_TY, :, self._obstacles] = (by + to_goal_y * TARGET_OFFSET)[:, None]
+
+    def _integrate(self, dt, friction):
+        """
+        球和球员积分，球施加摩擦，障碍物向目标点移动（与 NumpyBackend.advance 相同的 EntityTable 方法）
+        """
+        self.table.integrate(dt, self._moving_rows)
+        self.table.apply_friction(self._ball_rows, friction, STOP_SPEED)
+        if self.num_obstacles:
+            self.table.steer(dt, self._obstacle_rows, ARRIVE_RADIUS)
+
+    def _handle_collisions(self, live):
+        """
+        碰撞检测与响应（与 SoccerEnv._handle_collisions 相同），live 为本子步推进的场地，只有这些场地抽取随机数
+        """
+        p = self.num_players
+        d, players = self.tables, self._players
+        events = {}
+
+        # 球员和障碍物统一作为矩形处理: (N, 矩形数)，编号 < num_players 的是球员
+        x, y = _f64(d[_X, :, self._boxes]), _f64(d[_Y, :, self._boxes])
+        hw, hh = _f64(d[_WIDTH, :, self._boxes]) / 2, _f64(d[_HEIGHT, :, self._boxes]) / 2
+        c, s = _heading(d[_A, :, self._boxes])
+        boxes = (x, y, hw, hh, None)
+
+        # 球员与编号更大的矩形: (N, P, 矩形数)
+        hit, _, _ = collide_rects(*(None if b is None else b[:, :p, None] for b in boxes),
+                                  *(None if b is None else b[:, None, :] for b in boxes), with_contact=False,
+                                  heading1=(c[:, :p, None], s[:, :p, None]), heading2=(c[:, None, :], s[:, None, :]))
+        hit &= self._pair_mask
+
+        # 球员与障碍物: 每次碰撞取一个随机数，按场地、球员、障碍物的顺序抽取
+        hit_obstacle = hit[:, :, p:] & live[:, None, None]
+        events["collision_obstacle"] = hit_obstacle.any(axis=(1, 2))
+        if hit_obstacle.any():
+            factor = np.zeros(hit_obstacle.shape)
+            factor[hit_obstacle] = np.where(self.np_random.random(np.count_nonzero(hit_obstacle)) < 0.5, 0.5, -0.05)
+            for k in range(self.num_obstacles):
+                mask = hit_obstacle[:, :, k]
+                for column in (_VX, _VY):
+                    v = d[column, :, players]
+                    v[...] = np.where(mask, _f64(v) * factor[:, :, k], v)
+
+        # 球员与球员: 与编号更大的球员相撞时停下
+        stopped = hit[:, :, :p].any(axis=2)
+        d[_VX, :, players][stopped] = 0
+        d[_VY, :, players][stopped] = 0
+        events["collision_teammate"] = stopped.any(axis=1)
+
+        # 球与球员、障碍物: 球的位置会被依次修正，按实体顺序处理
+        vx, vy = _f64(d[_VX, :, self._boxes]), _f64(d[_VY, :, self._boxes])
+        events["ball_touch"] = np.zeros(self.num_envs, dtype=bool)
+        events["ball_hit_obstacle"] = np.zeros(self.num_envs, dtype=bool)
+        for k in range(p + self.num_obstacles):
+            bx, by = _f64(d[_X, :, 0]), _f64(d[_Y, :, 0])
+            hit, _, _ = collide_rects_circle(x[:, k], y[:, k], hw[:, k], hh[:, k], None, bx, by, self.ball_radius,
+                                             with_contact=False, heading=(c[:, k], s[:, k]))
+            result = _bounce_ball(hit, bx, by, _f64(d[_VX, :, 0]), _f64(d[_VY, :, 0]),
+                                  x[:, k], y[:, k], hw[:, k], hh[:, k], c[:, k], s[:, k],
+                                  vx[:, k], vy[:, k], self.ball_radius)
+            for column, value in zip((_X, _Y, _VX, _VY), result):
+                d[column, :, 0] = value
+            events["ball_touch" if k < p else "ball_hit_obstacle"] |= hit
+        return events
+
+    def _check_goal(self):
+        """
+        进球判定（与 is_goal(ball, width - GOAL_DEPTH + radius, height) 一致）
+        返回 1: 右队进球（左侧球门），-1: 左队进球（右侧球门），0: 没有进球
+        """
+        goal_y = (self.height - GOAL_HEIGHT) // 2
+        d, radius = self.tables, self.ball_radius
+        bx, by = _f64(d[_X, :, 0]), _f64(d[_Y, :, 0])
+        in_mouth = (goal_y <= by) & (by <= goal_y + GOAL_HEIGHT)
+        left = (bx - radius <= 0) & in_mouth
+        right = (bx + radius >= self.width - GOAL_DEPTH + radius) & in_mouth
+        return np.where(left, 1, np.where(right, -1, 0)).astype(np.int8)
+
+    def _check_boundaries(self):
+        """
+        球是否出界、是否有球员超出边界 BOUNDARY_MARGIN（与 NumpyBackend.boundaries 相同）
+        """
+        d, radius, players = self.tables, self.ball_radius, self._players
+        bx, by = _f64(d[_X, :, 0]), _f64(d[_Y, :, 0])
+        ball_out = ((bx - radius < 0) |
+                    (bx + radius > self.width) |
+                    (by - radius < 0) |
+                    (by + radius > self.height))
+        px, py = _f64(d[_X, :, players]), _f64(d[_Y, :, players])
+        half_w, half_h = _f64(d[_WIDTH, :, players]) / 2, _f64(d[_HEIGHT, :, players]) / 2
+        player_out = ((px - half_w < -BOUNDARY_MARGIN) |
+                      (px + half_w > self.width + BOUNDARY_MARGIN) |
+                      (py - half_h < -BOUNDARY_MARGIN) |
+                      (py + half_h > self.height + BOUNDARY_MARGIN)).any(axis=1)
+        return ball_out, player_out
+
+    def _get_observation(self):
+        """
+        构建 (N, obs_dim) 观测，布局和归一化尺度与 SoccerEnv._get_observation 相同
+        """
+        n, p, o = self.num_envs, self.num_players, self.num_obstacles
+        d, obs = self.tables, self._obs
+        # 球员: [x, y, angle, vx, vy, angular_velocity, can_see_ball]
+        np.divide(d[0:7, :, self._players].transpose(1, 2, 0), self._player_obs_scale,
+                  out=obs[:, :7 * p].reshape(n, p, 7))
+        # 球: [x, y, vx, vy]
+        ball = 7 * p
+        np.divide(d[_X:_Y + 1, :, 0].T, self._position_scale, out=obs[:, ball:ball + 2])
+        np.divide(d[_VX:_VY + 1, :, 0].T, 300.0, out=obs[:, ball + 2:ball + 4])
+        # 障碍物: [x, y]
+        np.divide(d[_X:_Y + 1, :, self._obstacles].transpose(1, 2, 0), self._position_scale,
+                  out=obs[:, ball + 4:].reshape(n, o, 2))
+        return obs.copy()
@@ -0,0 +1,166 @@
+# 分类: 环境模块
+# 描述: 定义障碍物行为表（ObstacleBehaviours）。每个障碍物从一张小表中选一种行为:
+#       block（站在球到球门连线上、距球 50 像素处，原有规则）、mark（盯人: 站在被盯球员的球门一侧）、
+#       zone（区域防守: 在自己的防守线上随球横向移动，不离开所负责的区段）、keeper（门将: 在球门线前随球移动）。
+#       同一种行为的障碍物按下标数组分组，每个 tick 每组只做几次数组运算，与障碍物数量无关；
+#       移动仍由物理后端的 advance 按各障碍物的 speed 向目标点批量推进。
+
+import numpy as np
+
+from envs.entities.table import EntityTable
+from envs.physics.utils import GOAL_DEPTH, GOAL_HEIGHT
+
+BEHAVIOURS = ('block', 'mark', 'zone', 'keeper')
+
+# 各行为的默认参数: 移动速度（像素/秒），以及 mark 与被盯球员的距离、keeper 身前与进球判定线（width - GOAL_DEPTH）的距离
+BEHAVIOUR_SPEED = {'block': 20.0, 'mark': 60.0, 'zone': 40.0, 'keeper': 60.0}
+BLOCK_OFFSET = 50.0
+MARK_DISTANCE = 30.0
+KEEPER_DEPTH = 25.0
+ZONE_LINE_SIZE = 5       # 自动布置时每条防守线的人数（人多时加宽）
+ZONE_MAX_LINES = 4       # 自动布置时防守线的最多条数，超出的人数平均加到各条线上
+ZONE_FIRST_LINE = 150.0  # 第一条防守线与球门线的距离
+
+_X, _Y, _W = EntityTable.INDEX['x'], EntityTable.INDEX['y'], EntityTable.INDEX['width']
+_TX, _TY, _SPEED = EntityTable.INDEX['target_x'], EntityTable.INDEX['target_y'], EntityTable.INDEX['speed']
+
+
+def parse_spec(spec, num_obstacles):
+    """
+    把行为描述展开为每个障碍物一项的字典列表
+    spec: 行为名、行为名或字典（{"kind": ..., 以及 player / x / y / reach / distance / speed 等参数}）的序列；
+    序列短于障碍物数时循环使用，例如 ["keeper", "zone", "zone", "mark"]
+    """
+    if isinstance(spec, str):
+        spec = [spec]
+    entries = [{'kind': entry} if isinstance(entry, str) else dict(entry) for entry in spec]
+    if not entries:
+        raise ValueError("障碍物行为表为空")
+    for entry in entries:
+        if entry.get('kind') not in BEHAVIOURS:
+            raise ValueError("未知的障碍物行为: %r（可选 %s）" % (entry.get('kind'), ', '.join(BEHAVIOURS)))
+    return [entries[k % len(entries)] for k in range(num_obstacles)]
+
+
+class ObstacleBehaviours:
+    """
+    按行为分组的障碍物控制器
+    spec 见 parse_spec；未给出的参数自动确定: mark 依次盯防各球员，zone 在防守半场自动排成几条防守线，
+    keeper 守右侧球门（与 block 防守的球门相同），站在进球判定线之前；开局时每个障碍物放在自己行为的锚点上（见 place）
+    table 为环境的实体表，用于读取障碍物的尺寸
+    """
+    def __init__(self, spec, width, height, num_players, obstacle_rows, table):
+        entries = parse_spec(spec, obstacle_rows.stop - obstacle_rows.start)
+        rows = np.arange(obstacle_rows.start, obstacle_rows.stop)
+        self.entries = entries
+        self.width, self.height = width, height
+        self._rows = rows
+        self.kinds = np.array([BEHAVIOURS.index(entry['kind']) for entry in entries], dtype=np.int8)
+        self.speed = np.array([entry.get('speed', BEHAVIOUR_SPEED[entry['kind']]) for entry in entries],
+                              dtype=np.float32)
+
+        def group(kind):
+            index = [k for k, entry in enumerate(entries) if entry['kind'] == kind]
+            return index, rows[index]
+
+        index, self._block_rows = group('block')
+
+        index, self._mark_rows = group('mark')
+        if index and num_players < 1:
+            raise ValueError("mark 行为需要至少一名球员")
+        # 被盯球员在实体表中的行号（球员从第1行开始）
+        self._mark_players = np.array([1 + entries[k].get('player', n % max(num_players, 1)) % max(num_players, 1)
+                                       for n, k in enumerate(index)], dtype=np.intp)
+        self._mark_distance = np.array([entries[k].get('distance', MARK_DISTANCE) for k in index], dtype=np.float32)
+
+        # zone 和 keeper 都是固定 x、y 随球并限制在 [low, high] 内，合成一组计算
+        index, zone_rows = group('zone')
+        x, y, reach = self._zone_layout(len(index), width, height)
+        zone_x = [entries[k].get('x', x[n]) for n, k in enumerate(index)]
+        zone_y = np.array([entries[k].get('y', y[n]) for n, k in enumerate(index)])
+        zone_reach = np.array([entries[k].get('reach', reach[n]) for n, k in enumerate(index)])
+
+        index, keeper_rows = group('keeper')
+        goal_y = (height - GOAL_HEIGHT) // 2
+        # 球心越过 width - GOAL_DEPTH 即判定进球，门将的整个身体都要在这条线之前
+        half_width = table.data[_W, keeper_rows] / 2
+        keeper_x = [width - GOAL_DEPTH - entries[k].get('distance', KEEPER_DEPTH) - float(half_width[n])
+                    for n, k in enumerate(index)]
+
+        self._line_rows = np.concatenate([zone_rows, keeper_rows])
+        self._line_x = np.array(zone_x + keeper_x, dtype=np.float32)
+        self._line_low = np.concatenate([zone_y - zone_reach,
+                                         np.full(len(index), goal_y + KEEPER_DEPTH)]).astype(np.float32)
+        self._line_high = np.concatenate([zone_y + zone_reach,
+                                          np.full(len(index), goal_y + GOAL_HEIGHT - KEEPER_DEPTH)]).astype(np.float32)
+
+    @staticmethod
+    def _zone_layout(count, width, height):
+        """
+        自动布置 count 个区域防守者: 每条线 ZONE_LINE_SIZE 人，从右侧球门前向中线排列，最多 ZONE_MAX_LINES 条
+        （人多时每条线加宽，防守线之间保持间距）；每人负责本条线上等分的一段
+        """
+        x, y, reach = np.zeros(count), np.zeros(count), np.zeros(count)
+        line_size = max(ZONE_LINE_SIZE, -(-count // ZONE_MAX_LINES))
+        lines = -(-count // line_size)
+        spacing = min(80.0, (width / 2 - ZONE_FIRST_LINE) / max(lines, 1))
+        for n in range(count):
+            line, slot = divmod(n, line_size)
+            size = min(line_size, count - line * line_size)
+            x[n] = width - ZONE_FIRST_LINE - line * spacing
+            y[n] = (slot + 0.5) * height / size
+            reach[n] = height / (2 * size)
+        return x, y, reach
+
+    def place(self, table, ball_x, ball_y, goal_x, goal_y):
+        """
+        把每个障碍物放到自己行为的锚点上: 球和球员在开局位置时该行为的目标点
+        （zone 为防守线上的位置，keeper 为球门前，mark 为被盯球员身前，block 为球与球门连线上）
+        锚点在球场外时抛出 ValueError
+        """
+        self.set_targets(table, ball_x, ball_y, goal_x, goal_y)
+        d = table.data
+        rows = self._rows
+        d[_X, rows] = d[_TX, rows]
+        d[_Y, rows] = d[_TY, rows]
+        x, y = d[_X, rows], d[_Y, rows]
+        outside = np.flatnonzero((x < 0) | (x > self.width) | (y < 0) | (y > self.height))
+        if len(outside):
+            k = outside[0]
+            raise ValueError("第 %d 个障碍物（%s）的开局位置 (%.1f, %.1f) 在球场外" % (
+                k, self.entries[k]['kind'], x[k], y[k]))
+
+    def apply_speeds(self, table, obstacle_rows):
+        """
+        把各障碍物的移动速度写入实体表
+        """
+        table.data[_SPEED, obstacle_rows] = self.speed
+
+    def set_targets(self, table, ball_x, ball_y, goal_x, goal_y):
+        """
+        计算所有障碍物的目标点，每种行为一组数组运算
+        """
+        d = table.data
+        if len(self._block_rows):
+            to_goal_x = goal_x - ball_x
+            to_goal_y = goal_y - ball_y
+            length = np.sqrt(to_goal_x ** 2 + to_goal_y ** 2)
+            if length > 0:
+                to_goal_x /= length
+                to_goal_y /= length
+            d[_TX, self._block_rows] = ball_x + to_goal_x * BLOCK_OFFSET
+            d[_TY, self._block_rows] = ball_y + to_goal_y * BLOCK_OFFSET
+
+        if len(self._mark_rows):
+            # 站在被盯球员与球门之间、距球员 distance 处
+            px = d[_X, self._mark_players]
+            py = d[_Y, self._mark_players]
+            dx = goal_x - px
+            dy = goal_y - py
+            scale = self._mark_distance / np.maximum(np.sqrt(dx * dx + dy * dy), 1e-6)
+            d[_TX, self._mark_rows] = px + dx * scale
+            d[_TY, self._mark_rows] = py + dy * scale
+
+        if len(self._line_rows):
+            d[_TX, self._line_rows] = self._line_x
+            d[_TY, self._line_rows] = np.minimum(np.maximum(ball_y, self._line_low), self._line_high)
@@ -0,0 +1,95 @@
+# 分类: 环境模块
+# 描述: 定义多智能体控制器（MultiAgentController）和几种批量策略。控制器从环境观测中为每个受控球员
+#       取出单人视角的观测（自己的 7 个状态 + 球 + 障碍物，与 num_players=1 时的观测布局相同），
+#       把所有受控球员（以及向量环境中所有场地）的观测叠成一个批次，只做一次策略前向，
+#       再把动作直接写入控制器持有的动作缓冲区。推理次数与球员数无关，只有批大小随之增长。
+
+import numpy as np
+
+PLAYER_OBS = 7   # 每个球员的观测长度
+ACTION_DIM = 3   # 每个球员的动作长度
+
+
+class RandomPolicy:
+    """
+    均匀随机动作，一次为整个批次采样
+    """
+    def __init__(self, seed=None, low=-1.0, high=1.0):
+        self.rng = np.random.default_rng(seed)
+        self.low, self.high = low, high
+
+    def __call__(self, obs):
+        return self.rng.uniform(self.low, self.high, size=(len(obs), ACTION_DIM)).astype(np.float32)
+
+
+class SB3Policy:
+    """
+    包装 stable-baselines3 模型（或任何有 predict(obs, deterministic) 方法的对象），对整个批次调用一次 predict
+    """
+    def __init__(self, model, deterministic=True):
+        self.model = model
+        self.deterministic = deterministic
+
+    @classmethod
+    def load(cls, path, algorithm='PPO', deterministic=True, **kwargs):
+        """
+        从文件加载模型，例如 SB3Policy.load("soccer_ppo_model.zip")；需要安装 stable-baselines3
+        """
+        import stable_baselines3
+        model = getattr(stable_baselines3, algorithm).load(path, **kwargs)
+        return cls(model, deterministic)
+
+    def __call__(self, obs):
+        actions, _ = self.model.predict(obs, deterministic=self.deterministic)
+        return actions
+
+
+class MultiAgentController:
+    """
+    多智能体控制器
+    env: SoccerEnv（可带包装器）或其向量环境（BatchedSoccerEnv、SharedMemoryVecEnv）；
+    policy: 输入 (批大小, 单人观测长度) 的观测，输出 (批大小, 3) 的动作；
+    agents: 受控球员编号，默认全部。未受控球员的动作位置保持不变，可由调用方（例如键盘）写入。
+    act(obs) 返回控制器持有的动作缓冲区 actions，可以直接传给 env.step
+    """
+    def __init__(self, env, policy, agents=None):
+        # 球员数、障碍物数由单个环境的动作、观测空间推出，对单个环境和各种向量环境都适用
+        self.num_envs = getattr(env, 'num_envs', None)
+        action_space = env.single_action_space if self.num_envs is not None else env.action_space
+        obs_space = env.single_observation_space if self.num_envs is not None else env.observation_space
+        self.num_players = action_space.shape[0] // ACTION_DIM
+        self.num_obstacles = (obs_space.shape[0] - PLAYER_OBS * self.num_players - 4) // 2
+        self.policy = policy
+        self.agents = np.arange(self.num_players) if agents is None else np.asarray(list(agents), dtype=np.intp)
+
+        # 单人观测在完整观测中的下标: 该球员的 7 个状态，然后是球和障碍物
+        shared = np.arange(PLAYER_OBS * self.num_players, PLAYER_OBS * self.num_players + 4 + 2 * self.num_obstacles)
+        own = PLAYER_OBS * self.agents[:, None] + np.arange(PLAYER_OBS)
+        self._index = np.concatenate([own, np.broadcast_to(shared, (len(self.agents), len(shared)))], axis=1)
+        self.agent_obs_dim = self._index.shape[1]
+
+        batch = () if self.num_envs is None else (self.num_envs,)
+        self.actions = np.zeros(batch + (ACTION_DIM * self.num_players,), dtype=np.float32)
+        self._agent_obs = np.empty(batch + self._index.shape, dtype=np.float32)
+
+    @property
+    def batch_size(self):
+        return len(self.agents) * (self.num_envs or 1)
+
+    def agent_observations(self, obs):
+        """
+        把完整观测 (观测长度,) 或 (场地数, 观测长度) 展开为单人观测，形状为 (批大小, 单人观测长度)
+        """
+        np.take(np.asarray(obs, dtype=np.float32), self._index, axis=-1, out=self._agent_obs)
+        return self._agent_obs.reshape(-1, self.agent_obs_dim)
+
+    def act(self, obs):
+        """
+        一次前向为所有受控球员计算动作，写入 actions 中对应的位置并返回 actions
+        """
+        if len(self.agents) == 0:
+            return self.actions
+        batch_actions = np.asarray(self.policy(self.agent_observations(obs)), dtype=np.float32)
+        per_player = self.actions.reshape(self.actions.shape[:-1] + (self.num_players, ACTION_DIM))
+        per_player[..., self.agents, :] = batch_actions.reshape(per_player.shape[:-2] + (len(self.agents), ACTION_DIM))
+        return self.actions
@@ -0,0 +1,425 @@
+# 分类: 环境模块
+# 描述: 定义本机环境服务（EnvServer）和客户端（RemoteVecEnv）。服务端用 asyncio 在 Unix 域套接字或回环 TCP 上
+#       托管一池 SoccerEnv（默认带 DefaultRewardWrapper），每个客户端连接时申请若干个环境；
+#       各客户端的 reset / step 请求先排队，批处理任务把同一时刻排队的请求合并成一次向量化推进
+#       （环境池为 SharedMemoryVecEnv 时所有工作进程并行推进），推进期间到达的请求合并进下一批。
+#       动作、观测等都以 float32 等原始字节传输，不做 pickle；只有握手用 JSON 描述空间。
+#       客户端的接口与 gymnasium VectorEnv 相同（same-step 自动重置），多个训练、评估进程可以共用一个环境池。
+
+import asyncio
+import json
+import os
+import socket
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+from gymnasium import spaces
+from gymnasium.vector import VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from envs.environment.recorder import EVENTS, EVENT_BITS, event_mask
+from envs.environment.shm_vec_env import (_SAME_STEP, SharedMemoryVecEnv, _reset_options, _scenarios,
+                                          make_soccer_env)
+
+# 消息头: (操作码或状态, 负载字节数)
+HEADER = struct.Struct('<II')
+OP_HELLO, OP_RESET, OP_STEP, OP_CLOSE = 1, 2, 3, 4
+STATUS_OK, STATUS_ERROR = 0, 1
+
+
+def parse_address(address):
+    """
+    "unix:/tmp/soccer.sock" -> ('unix', 路径)；"tcp:127.0.0.1:5555" 或 "127.0.0.1:5555" -> ('tcp', (主机, 端口))
+    """
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    if address.startswith('tcp:'):
+        address = address[len('tcp:'):]
+    host, _, port = address.rpartition(':')
+    return 'tcp', (host or '127.0.0.1', int(port))
+
+
+def step_layout(num_envs, obs_dim):
+    """
+    step 响应的负载布局: [(名称, 形状, 类型)]，依次连续存放；final_obs 只在结束的行上有意义
+    """
+    return [
+        ('obs', (num_envs, obs_dim), np.float32),
+        ('rewards', (num_envs,), np.float32),
+        ('final_obs', (num_envs, obs_dim), np.float32),
+        ('events', (num_envs,), np.uint16),
+        ('terminated', (num_envs,), np.bool_),
+        ('truncated', (num_envs,), np.bool_),
+    ]
+
+
+def _layout_size(layout):
+    return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in layout)
+
+
+def _box_to_json(space):
+    return {'low': space.low.tolist(), 'high': space.high.tolist(), 'dtype': np.dtype(space.dtype).str}
+
+
+def _box_from_json(data):
+    dtype = np.dtype(data['dtype'])
+    return spaces.Box(low=np.array(data['low'], dtype=dtype), high=np.array(data['high'], dtype=dtype), dtype=dtype)
+
+
+class LocalPool:
+    """
+    进程内环境池: 在服务端的推进线程中依次推进各环境（num_workers=0 时使用）
+    接口与 SharedMemoryVecEnv 的 reset_rows / step_rows 相同；环境需开启 autoreset
+    """
+    def __init__(self, env_fn, num_envs):
+        self.envs = [env_fn() for _ in range(num_envs)]
+        self.num_envs = num_envs
+        self.single_observation_space = self.envs[0].observation_space
+        self.single_action_space = self.envs[0].action_space
+
+    def reset_rows(self, rows, seeds, scenarios=None):
+        if scenarios is None:
+            scenarios = np.full(len(rows), -1)
+        return np.stack([self.envs[row].reset(seed=None if seed < 0 else int(seed),
+                                              options=_reset_options(scenario))[0]
+                         for row, seed, scenario in zip(rows, seeds, scenarios)]).astype(np.float32, copy=False)
+
+    def step_rows(self, rows, actions):
+        n, obs_dim = len(rows), self.single_observation_space.shape[0]
+        obs = np.empty((n, obs_dim), dtype=np.float32)
+        final_obs = np.zeros((n, obs_dim), dtype=np.float32)
+        rewards = np.empty(n)
+        terminated = np.empty(n, dtype=bool)
+        truncated = np.empty(n, dtype=bool)
+        events = np.empty(n, dtype=np.uint16)
+        for k, row in enumerate(rows):
+            env = self.envs[row]
+            obs[k], rewards[k], terminated[k], truncated[k], info = env.step(actions[k])
+            events[k] = event_mask(info)
+            if 'final_obs' in info:
+                final_obs[k] = info['final_obs']
+            elif terminated[k] or truncated[k]:
+                final_obs[k] = obs[k]
+                obs[k] = env.reset()[0]
+        return obs, rewards, terminated, truncated, final_obs, events
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+
+class _Request:
+    __slots__ = ('op', 'rows', 'data', 'future')
+
+    def __init__(self, op, rows, data, future):
+        self.op, self.rows, self.data, self.future = op, rows, data, future
+
+
+class EnvServer:
+    """
+    asyncio 环境服务
+    env_fn: 创建单个环境的可 pickle 函数，环境需开启 autoreset（默认 make_soccer_env(autoreset=True)）；
+    num_envs: 池中环境总数，各客户端连接时从中申请；num_workers: 0 在服务进程内推进，
+    大于 0 时用 SharedMemoryVecEnv 的工作进程并行推进；
+    coalesce_window: 收到第一个请求后再等待的秒数，让更多客户端的请求进入同一批（0 表示只合并已到达的请求）
+    客户端断开时丢弃其仍在排队的请求，其环境在正在推进的批次结束后才归还；HELLO 申请到的环境先重置再交给客户端
+    """
+    def __init__(self, env_fn=None, num_envs=16, num_workers=0, coalesce_window=0.0, **env_kwargs):
+        if env_fn is None:
+            env_kwargs.setdefault('autoreset', True)
+            env_fn = partial(make_soccer_env, **env_kwargs)
+        if num_workers > 0:
+            self.pool = SharedMemoryVecEnv(env_fn, num_envs, num_workers=num_workers)
+        else:
+            self.pool = LocalPool(env_fn, num_envs)
+        self.num_envs = num_envs
+        self.obs_dim = int(np.prod(self.pool.single_observation_space.shape))
+        self.act_dim = int(np.prod(self.pool.single_action_space.shape))
+        self.coalesce_window = coalesce_window
+        self._free = list(range(num_envs))
+        # 已断开、但仍有请求在推进中的连接的环境，推进结束后再归还
+        self._retired = []
+        self._pending = []
+        self._in_flight = []
+        self._wakeup = None
+        # 推进在单独的线程中进行，期间事件循环继续接收请求
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._server = None
+        self._batcher = None
+        self.stats = {'batches': 0, 'requests': 0, 'env_steps': 0}
+
+    # ------------------------------ 服务 ------------------------------ #
+    async def start(self, address):
+        """
+        开始监听 address（见 parse_address）
+        """
+        self._wakeup = asyncio.Event()
+        self._batcher = asyncio.ensure_future(self._batch_loop())
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            if os.path.exists(target):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._handle_client, path=target)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host=target[0], port=target[1])
+        return self._server
+
+    async def serve_forever(self, address):
+        await self.start(address)
+        async with self._server:
+            await self._server.serve_forever()
+
+    def run(self, address):
+        """
+        阻塞运行服务，直到被中断
+        """
+        try:
+            asyncio.run(self.serve_forever(address))
+        finally:
+            self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+
+    # ------------------------------ 连接 ------------------------------ #
+    async def _handle_client(self, reader, writer):
+        rows = []
+        sock = writer.get_extra_info('socket')
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                try:
+                    op, size = HEADER.unpack(await reader.readexactly(HEADER.size))
+                    payload = await reader.readexactly(size)
+                except asyncio.IncompleteReadError:
+                    break
+                if op == OP_CLOSE:
+                    writer.write(HEADER.pack(STATUS_OK, 0))
+                    await writer.drain()
+                    break
+                try:
+                    response = await self._dispatch(op, payload, rows)
+                except Exception as exc:
+                    message = ('%s: %s' % (type(exc).__name__, exc)).encode()
+                    writer.write(HEADER.pack(STATUS_ERROR, len(message)) + message)
+                else:
+                    writer.write(HEADER.pack(STATUS_OK, len(response)) + response)
+                await writer.drain()
+        finally:
+            # 断开时丢弃仍在排队的请求；本批推进中用到这些环境时等推进结束再归还
+            self._pending = [request for request in self._pending if request.rows is not rows]
+            self._retired.append(rows)
+            self._release_retired()
+            writer.close()
+
+    def _release_retired(self):
+        """
+        把不再被推进中的请求使用的已断开连接的环境放回空闲列表
+        """
+        busy = []
+        for rows in self._retired:
+            if any(request.rows is rows for request in self._in_flight):
+                busy.append(rows)
+            else:
+                self._free.extend(rows)
+        self._retired = busy
+
+    async def _dispatch(self, op, payload, rows):
+        if op == OP_HELLO:
+            if rows:
+                raise ValueError("该连接已申请过环境")
+            request = json.loads(payload.decode())
+            count = int(request.get('num_envs', 1))
+            if not 0 < count <= len(self._free):
+                raise ValueError("申请 %d 个环境，池中只剩 %d 个" % (count, len(self._free)))
+            rows.extend(self._free[:count])
+            del self._free[:count]
+            # 申请到的环境可能刚被其他客户端用过，先重置
+            await self._submit(OP_RESET, rows, np.full(2 * count, -1, dtype=np.int64))
+            hello = {'num_envs': count, 'observation_space': _box_to_json(self.pool.single_observation_space),
+                     'action_space': _box_to_json(self.pool.single_action_space), 'events': list(EVENTS)}
+            return json.dumps(hello).encode()
+        if not rows:
+            raise ValueError("需要先发送 HELLO 申请环境")
+        if op == OP_RESET:
+            # 各环境的种子和开局编号
+            data = np.frombuffer(payload, dtype=np.int64)
+            expected = 2 * len(rows)
+        elif op == OP_STEP:
+            data = np.frombuffer(payload, dtype=np.float32)
+            expected = len(rows) * self.act_dim
+        else:
+            raise ValueError("未知的操作码 %d" % op)
+        if data.size != expected:
+            raise ValueError("负载长度 %d 与 %d 不符" % (data.size, expected))
+        return await self._submit(op, rows, data)
+
+    async def _submit(self, op, rows, data):
+        """
+        请求排队等待下一批推进，返回响应字节
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_Request(op, rows, data, future))
+        self._wakeup.set()
+        return await future
+
+    # ------------------------------ 合并推进 ------------------------------ #
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            if self.coalesce_window > 0:
+                await asyncio.sleep(self.coalesce_window)
+            requests, self._pending = self._pending, []
+            self._in_flight = requests
+            self._wakeup.clear()
+            for op in (OP_RESET, OP_STEP):
+                batch = [r for r in requests if r.op == op]
+                if not batch:
+                    continue
+                try:
+                    results = await loop.run_in_executor(self._executor, self._run_batch, op, batch)
+                except Exception as exc:
+                    for request in batch:
+                        if not request.future.done():
+                            request.future.set_exception(exc)
+                    continue
+                for request, result in zip(batch, results):
+                    if not request.future.done():
+                        request.future.set_result(result)
+            self._in_flight = []
+            if self._retired:
+                self._release_retired()
+
+    def _run_batch(self, op, batch):
+        """
+        在推进线程中执行一批请求: 所有请求的环境合成一次 reset_rows / step_rows，再按请求拆分为响应字节
+        """
+        rows = np.concatenate([r.rows for r in batch])
+        sizes = [len(r.rows) for r in batch]
+        self.stats['batches'] += 1
+        self.stats['requests'] += len(batch)
+        if op == OP_RESET:
+            seeds, scenarios = np.concatenate([r.data.reshape(2, -1) for r in batch], axis=1)
+            obs = self.pool.reset_rows(rows, seeds, scenarios)
+            return [part.astype(np.float32, copy=False).tobytes() for part in np.split(obs, np.cumsum(sizes)[:-1])]
+        actions = np.concatenate([r.data for r in batch]).reshape(len(rows), self.act_dim)
+        obs, rewards, terminated, truncated, final_obs, events = self.pool.step_rows(rows, actions)
+        self.stats['env_steps'] += len(rows)
+        columns = (obs.astype(np.float32, copy=False), rewards.astype(np.float32), final_obs.astype(np.float32),
+                   events.astype(np.uint16, copy=False), terminated.astype(np.bool_), truncated.astype(np.bool_))
+        responses = []
+        start = 0
+        for size in sizes:
+            stop = start + size
+            responses.append(b''.join(column[start:stop].tobytes() for column in columns))
+            start = stop
+        return responses
+
+
+class RemoteVecEnv(VectorEnv):
+    """
+    EnvServer 的客户端，接口与 gymnasium VectorEnv 相同
+    连接 address 并申请 num_envs 个环境；采用 same-step 自动重置，结束的环境返回新回合的初始观测，
+    结束时的观测放在 infos["final_obs"]；infos 中还有各事件（goal_left、ball_out 等）的布尔数组；
+    reset 的 options 只支持 "scenario"，与 SharedMemoryVecEnv 相同
+    """
+    metadata = {'render_modes': [], 'autoreset_mode': _SAME_STEP}
+
+    def __init__(self, address, num_envs=1, timeout=60.0):
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock.settimeout(timeout)
+        self._sock.connect(target)
+        self._recv_buffer = bytearray(4096)
+        self.closed = False
+
+        hello = json.loads(bytes(self._request(OP_HELLO, json.dumps({'num_envs': num_envs}).encode())).decode())
+        self.num_envs = hello['num_envs']
+        self.single_observation_space = _box_from_json(hello['observation_space'])
+        self.single_action_space = _box_from_json(hello['action_space'])
+        self.observation_space = batch_space(self.single_observation_space, self.num_envs)
+        self.action_space = batch_space(self.single_action_space, self.num_envs)
+        self.events = tuple(hello['events'])
+
+        obs_dim = int(np.prod(self.single_observation_space.shape))
+        self._act_dim = int(np.prod(self.single_action_space.shape))
+        self._step_layout = step_layout(self.num_envs, obs_dim)
+        self._recv_buffer = bytearray(max(_layout_size(self._step_layout), len(self._recv_buffer)))
+
+    def _request(self, op, payload):
+        """
+        发送一个请求并返回响应负载（接收缓冲区上的 memoryview，下一次请求前有效）
+        """
+        self._sock.sendall(HEADER.pack(op, len(payload)) + payload)
+        status, size = HEADER.unpack(self._recv_exact(HEADER.size))
+        data = self._recv_exact(size)
+        if status != STATUS_OK:
+            raise RuntimeError("EnvServer 返回错误: " + bytes(data).decode(errors='replace'))
+        return data
+
+    def _recv_exact(self, size):
+        if size > len(self._recv_buffer):
+            self._recv_buffer = bytearray(size)
+        view = memoryview(self._recv_buffer)[:size]
+        received = 0
+        while received < size:
+            count = self._sock.recv_into(view[received:], size - received)
+            if count == 0:
+                raise ConnectionError("EnvServer 已断开")
+            received += count
+        return view
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        scenarios = _scenarios(options, self.num_envs)
+        if seed is None:
+            seeds = np.full(self.num_envs, -1, dtype=np.int64)
+        elif isinstance(seed, int):
+            seeds = seed + np.arange(self.num_envs, dtype=np.int64)
+        else:
+            seeds = np.array([-1 if s is None else s for s in seed], dtype=np.int64)
+        data = self._request(OP_RESET, seeds.tobytes() + scenarios.tobytes())
+        return np.frombuffer(data, dtype=np.float32).reshape(self.observation_space.shape).copy(), {}
+
+    def step(self, actions):
+        actions = np.ascontiguousarray(actions, dtype=np.float32).reshape(self.num_envs, self._act_dim)
+        data = self._request(OP_STEP, actions.tobytes())
+        out, offset = {}, 0
+        for name, shape, dtype in self._step_layout:
+            count = int(np.prod(shape))
+            out[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape).copy()
+            offset += count * np.dtype(dtype).itemsize
+
+        terminated, truncated = out['terminated'], out['truncated']
+        infos = {}
+        events = out['events']
+        for name in self.events:
+            infos[name] = (events & EVENT_BITS[name]) != 0
+            infos['_' + name] = np.ones(self.num_envs, dtype=bool)
+        done = terminated | truncated
+        if done.any():
+            final_obs = np.full(self.num_envs, None, dtype=object)
+            for row in np.flatnonzero(done):
+                final_obs[row] = out['final_obs'][row]
+            infos['final_obs'] = final_obs
+            infos['_final_obs'] = done
+        return out['obs'], out['rewards'], terminated, truncated, infos
+
+    def close_extras(self, **kwargs):
+        if getattr(self, '_sock', None) is None:
+            return
+        try:
+            self._request(OP_CLOSE, b'')
+        except (OSError, RuntimeError):
+            pass
+        self._sock.close()
+        self._sock = None
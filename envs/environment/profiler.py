@@ -0,0 +1,94 @@
+# 分类: 环境模块
+# 描述: 定义按阶段计时的步进分析器（StepProfiler）。启用后把环境各阶段方法替换为计时版本，
+#       用单调时钟累计耗时和调用次数；未启用时环境上没有任何计时代码。
+#       汇总结果是普通字典，可以跨向量环境的多个工作进程直接相加（merge_profiles）。
+
+import time
+from collections import defaultdict
+
+
+class StepProfiler:
+    """
+    阶段耗时累加器
+    report_every 不为 None 时，环境每隔 report_every 步把汇总放入 info["profile"] 并清零；
+    outer_tick 为 True 时由外层包装器在整步（包括奖励项）结束后调用 tick，环境自身不再调用
+    """
+    def __init__(self, report_every=None):
+        self.report_every = report_every
+        self.outer_tick = False
+        self.totals = defaultdict(int)  # 纳秒
+        self.calls = defaultdict(int)
+        self.steps = 0
+
+    def wrap(self, name, fn):
+        """
+        返回对 fn 计时的函数，耗时累计到阶段 name
+        """
+        totals, calls, clock = self.totals, self.calls, time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            start = clock()
+            result = fn(*args, **kwargs)
+            totals[name] += clock() - start
+            calls[name] += 1
+            return result
+        timed.__wrapped__ = fn
+        return timed
+
+    def tick(self):
+        """
+        记录完成一步；到达汇报周期时返回汇总并清零，否则返回 None
+        """
+        self.steps += 1
+        if self.report_every and self.steps >= self.report_every:
+            summary = self.summary()
+            self.reset()
+            return summary
+        return None
+
+    def summary(self):
+        """
+        当前汇总: {阶段: {'calls': 调用次数, 'total_s': 累计秒数}}，另有 'steps' 表示步数
+        """
+        summary = {name: {'calls': self.calls[name], 'total_s': total / 1e9}
+                   for name, total in self.totals.items()}
+        summary['steps'] = self.steps
+        return summary
+
+    def reset(self):
+        self.totals.clear()
+        self.calls.clear()
+        self.steps = 0
+
+
+def merge_profiles(summaries):
+    """
+    合并多个汇总（例如各个环境或工作进程的 get_profile() 结果）
+    """
+    merged = {'steps': 0}
+    for summary in summaries:
+        for name, value in summary.items():
+            if name == 'steps':
+                merged['steps'] += value
+                continue
+            entry = merged.setdefault(name, {'calls': 0, 'total_s': 0.0})
+            entry['calls'] += value['calls']
+            entry['total_s'] += value['total_s']
+    return merged
+
+
+def format_profile(summary):
+    """
+    把汇总格式化为文本表格: 调用次数、累计毫秒、平均微秒、占整步的比例
+    """
+    phases = sorted((name for name in summary if name != 'steps'),
+                    key=lambda name: -summary[name]['total_s'])
+    step_total = summary['step']['total_s'] if 'step' in summary else None
+    lines = ['%-26s %10s %12s %10s %7s' % ('phase', 'calls', 'total ms', 'mean us', 'share')]
+    for name in phases:
+        entry = summary[name]
+        mean_us = entry['total_s'] / entry['calls'] * 1e6 if entry['calls'] else 0.0
+        share = '%6.1f%%' % (entry['total_s'] / step_total * 100) if step_total else '-'
+        lines.append('%-26s %10d %12.2f %10.2f %7s' % (name, entry['calls'], entry['total_s'] * 1e3, mean_us, share))
+    lines.append('steps: %d' % summary.get('steps', 0))
+    return '\n'.join(lines)
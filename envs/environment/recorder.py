@@ -0,0 +1,333 @@
+# 分类: 环境模块
+# 描述: 定义轨迹记录包装器（TrajectoryRecorder）和读取器（TrajectoryDataset）。
+#       记录器把每一步的观测、动作、奖励、结束标志和事件位掩码逐行写入预先分配好的分块 .npy 文件
+#       （每列一个文件，例如 obs_00000.npy），写满一块再开下一块，内存占用与记录长度无关；
+#       回合边界和每个回合的结束观测同样按回合逐行写入分块的索引文件（episodes_00000.npy、final_obs_00000.npy），
+#       flush 只刷新已写入的块并更新 meta.json，代价与记录长度无关。读取器以内存映射方式打开各块，
+#       可以在多 GB 的数据上随机采样而不把数据读进内存。
+
+import json
+import os
+
+import gymnasium as gym
+import numpy as np
+
+# 事件位: info 中的事件 -> 位掩码中的一位
+EVENTS = ('goal_left', 'goal_right', 'ball_out', 'player_out',
+          'ball_touch', 'ball_hit_obstacle', 'collision_obstacle', 'collision_teammate')
+EVENT_BITS = {name: 1 << k for k, name in enumerate(EVENTS)}
+
+EPISODE_DTYPE = np.dtype([('start', np.int64), ('length', np.int64), ('seed', np.int64),
+                          ('terminated', np.bool_), ('truncated', np.bool_), ('return', np.float64)])
+
+META_FILE = 'meta.json'
+# 回合索引的分块名（与每步记录的列使用同样的分块文件命名）
+EPISODES_COLUMN = 'episodes'
+FINAL_OBS_COLUMN = 'final_obs'
+
+
+def event_mask(info):
+    """
+    把 step 返回的 info 编码为事件位掩码
+    """
+    mask = 0
+    goal = info.get('goal')
+    if goal is not None:
+        mask |= EVENT_BITS['goal_' + goal]
+    for name in EVENTS[2:]:
+        if info.get(name):
+            mask |= EVENT_BITS[name]
+    return mask
+
+
+def _chunk_path(directory, column, index):
+    return os.path.join(directory, '%s_%05d.npy' % (column, index))
+
+
+def _open_chunk_file(directory, column, index, rows, shape, dtype):
+    """
+    创建（预先分配）一个分块文件并以内存映射方式打开
+    """
+    return np.lib.format.open_memmap(_chunk_path(directory, column, index), mode='w+',
+                                     dtype=dtype, shape=(rows,) + tuple(shape))
+
+
+def _gather_rows(chunks, chunk_size, index):
+    """
+    从分块数组列表中按全局行号取出各行，只读取用到的行
+    """
+    out = np.empty(index.shape + chunks[0].shape[1:], dtype=chunks[0].dtype)
+    chunk_ids, rows = np.divmod(index, chunk_size)
+    for k in np.unique(chunk_ids):
+        mask = chunk_ids == k
+        out[mask] = chunks[k][rows[mask]]
+    return out
+
+
+def _column_specs(obs_shape, action_shape):
+    """
+    每步记录的列: {名称: (每行形状, 类型)}；obs 为执行该步动作之前的观测，
+    动作之后的观测由同一回合的下一行或回合索引中的结束观测给出
+    """
+    return {
+        'obs': (tuple(obs_shape), np.float32),
+        'action': (tuple(action_shape), np.float32),
+        'reward': ((), np.float32),
+        'terminated': ((), np.bool_),
+        'truncated': ((), np.bool_),
+        'events': ((), np.uint16),
+    }
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    """
+    轨迹记录包装器，可包在 SoccerEnv 或 DefaultRewardWrapper 外层（记录的奖励是被包装环境返回的奖励）
+    directory: 输出目录；chunk_size: 每个分块的行数，分块在打开时按该行数预先分配；
+    episode_chunk_size: 回合索引每个分块的回合数
+    记录在 close() 时写出 meta.json；长时间运行中可以调用 flush() 让已记录的部分立即可读
+    """
+    def __init__(self, env, directory, chunk_size=65536, episode_chunk_size=4096):
+        super().__init__(env)
+        self.directory = directory
+        self.chunk_size = int(chunk_size)
+        self.episode_chunk_size = int(episode_chunk_size)
+        os.makedirs(directory, exist_ok=True)
+        self._specs = _column_specs(env.observation_space.shape, env.action_space.shape)
+
+        self.num_steps = 0
+        self._chunk_index = -1
+        self._chunk = None
+        self.num_episodes = 0
+        self._episode_chunk_index = -1
+        self._episode_chunk = None
+        self._episode = None
+        # 上一步观测的私有副本: 环境可能把观测写进调用方提供的同一个缓冲区（set_observation_buffer），
+        # 直接保存引用会在下一步被覆盖
+        self._last_obs = np.zeros(self._specs['obs'][0], dtype=np.float32)
+
+    # ------------------------------ 记录 ------------------------------ #
+    def reset(self, *, seed=None, options=None):
+        obs, info = self.env.reset(seed=seed, options=options)
+        if self._episode is not None and self._episode['length'] > 0:
+            # 回合未结束就被重置: 两个结束标志都为 False
+            self._finish_episode(self._last_obs, False, False)
+        self._start_episode(obs, seed)
+        return obs, info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        row = self.num_steps % self.chunk_size
+        if row == 0:
+            self._open_chunk(self.num_steps // self.chunk_size)
+        chunk = self._chunk
+        chunk['obs'][row] = self._last_obs
+        chunk['action'][row] = np.reshape(action, self._specs['action'][0])
+        chunk['reward'][row] = reward
+        chunk['terminated'][row] = terminated
+        chunk['truncated'][row] = truncated
+        chunk['events'][row] = event_mask(info)
+        self.num_steps += 1
+        np.copyto(self._last_obs, obs)
+
+        if self._episode is not None:
+            self._episode['length'] += 1
+            self._episode['return'] += float(reward)
+            if terminated or truncated:
+                self._finish_episode(info['final_obs'] if 'final_obs' in info else obs, terminated, truncated)
+        if 'final_obs' in info:
+            # 环境已在 step 内自动重置: obs 是新回合的初始观测
+            self._start_episode(obs, None)
+        return obs, reward, terminated, truncated, info
+
+    def _start_episode(self, obs, seed):
+        self._episode = {'start': self.num_steps, 'length': 0, 'seed': -1 if seed is None else seed, 'return': 0.0}
+        np.copyto(self._last_obs, obs)
+
+    def _open_chunk(self, index):
+        """
+        关闭当前分块，打开（预先分配）第 index 块
+        """
+        self._close_chunk()
+        self._chunk_index = index
+        self._chunk = {
+            column: _open_chunk_file(self.directory, column, index, self.chunk_size, shape, dtype)
+            for column, (shape, dtype) in self._specs.items()
+        }
+
+    def _close_chunk(self):
+        if self._chunk is None:
+            return
+        for array in self._chunk.values():
+            array.flush()
+        self._chunk = None
+
+    def _open_episode_chunk(self, index):
+        """
+        关闭当前的回合索引分块，打开（预先分配）第 index 块
+        """
+        self._close_episode_chunk()
+        self._episode_chunk_index = index
+        self._episode_chunk = {
+            EPISODES_COLUMN: _open_chunk_file(self.directory, EPISODES_COLUMN, index,
+                                              self.episode_chunk_size, (), EPISODE_DTYPE),
+            FINAL_OBS_COLUMN: _open_chunk_file(self.directory, FINAL_OBS_COLUMN, index,
+                                               self.episode_chunk_size, self._specs['obs'][0], np.float32),
+        }
+
+    def _close_episode_chunk(self):
+        if self._episode_chunk is None:
+            return
+        for array in self._episode_chunk.values():
+            array.flush()
+        self._episode_chunk = None
+
+    def _finish_episode(self, final_obs, terminated, truncated):
+        row = self.num_episodes % self.episode_chunk_size
+        if row == 0:
+            self._open_episode_chunk(self.num_episodes // self.episode_chunk_size)
+        episode = self._episode
+        self._episode_chunk[EPISODES_COLUMN][row] = (episode['start'], episode['length'], episode['seed'],
+                                                     terminated, truncated, episode['return'])
+        self._episode_chunk[FINAL_OBS_COLUMN][row] = final_obs
+        self.num_episodes += 1
+        self._episode = None
+
+    def flush(self):
+        """
+        把已写入的数据和回合索引刷到磁盘并更新 meta.json，此后 TrajectoryDataset 即可读取
+        （各块已在写入时就位，这里只刷新当前块，不重写已有数据）
+        """
+        for chunk in (self._chunk, self._episode_chunk):
+            if chunk is not None:
+                for array in chunk.values():
+                    array.flush()
+        # 读取方只看 meta.json 中记录的行数，先刷数据再替换 meta.json，不会读到写了一半的行
+        meta = {
+            'num_steps': self.num_steps,
+            'chunk_size': self.chunk_size,
+            'num_chunks': self._chunk_index + 1,
+            'num_episodes': self.num_episodes,
+            'episode_chunk_size': self.episode_chunk_size,
+            'num_episode_chunks': self._episode_chunk_index + 1,
+            'columns': {column: {'shape': list(shape), 'dtype': np.dtype(dtype).str}
+                        for column, (shape, dtype) in self._specs.items()},
+            'events': list(EVENTS),
+        }
+        path = os.path.join(self.directory, META_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        if self._chunk is not None or self.num_episodes or self.num_steps:
+            self.flush()
+        self._close_chunk()
+        self._close_episode_chunk()
+        super().close()
+
+
+class TrajectoryDataset:
+    """
+    记录结果的只读视图: 各分块以内存映射方式打开，按全局步号随机访问
+    记录过程中 flush 之后即可打开；尚未结束的回合中的步可以按步号读取，但不参与采样，也没有 next_obs
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.num_steps = self.meta['num_steps']
+        self.chunk_size = self.meta['chunk_size']
+        self.columns = tuple(self.meta['columns'])
+        self._chunks = {column: [np.load(_chunk_path(directory, column, k), mmap_mode='r')
+                                 for k in range(self.meta['num_chunks'])]
+                        for column in self.columns}
+        # 回合索引很小，读进内存；结束观测保持内存映射，按回合编号取用
+        self.num_episodes = self.meta['num_episodes']
+        self.episode_chunk_size = self.meta['episode_chunk_size']
+        episode_chunks = range(self.meta['num_episode_chunks'])
+        episodes = [np.load(_chunk_path(directory, EPISODES_COLUMN, k), mmap_mode='r') for k in episode_chunks]
+        self.episodes = (np.concatenate(episodes)[:self.num_episodes] if episodes
+                         else np.zeros(0, dtype=EPISODE_DTYPE))
+        self._final_obs = [np.load(_chunk_path(directory, FINAL_OBS_COLUMN, k), mmap_mode='r')
+                           for k in episode_chunks]
+        self.obs_shape = tuple(self.meta['columns']['obs']['shape'])
+        # 各回合的结束位置（不含）
+        self._episode_ends = self.episodes['start'] + self.episodes['length']
+
+    def __len__(self):
+        return self.num_steps
+
+    def gather(self, column, steps):
+        """
+        按全局步号（整数数组）取出某一列，只读取用到的行
+        """
+        steps = np.asarray(steps, dtype=np.int64)
+        if steps.size and (steps.min() < 0 or steps.max() >= self.num_steps):
+            raise IndexError("步号超出范围 [0, %d)" % self.num_steps)
+        return _gather_rows(self._chunks[column], self.chunk_size, steps)
+
+    def final_obs(self, episodes):
+        """
+        按回合编号（整数数组）取出各回合的结束观测
+        """
+        episodes = np.asarray(episodes, dtype=np.int64)
+        if episodes.size and (episodes.min() < 0 or episodes.max() >= self.num_episodes):
+            raise IndexError("回合编号超出范围 [0, %d)" % self.num_episodes)
+        return _gather_rows(self._final_obs, self.episode_chunk_size, episodes)
+
+    def episode_of(self, steps):
+        """
+        各步所在的回合编号（不属于任何已索引回合的步为 -1）
+        """
+        steps = np.asarray(steps, dtype=np.int64)
+        index = np.searchsorted(self.episodes['start'], steps, side='right') - 1
+        valid = (index >= 0) & (steps < self._episode_ends[np.maximum(index, 0)])
+        return np.where(valid, index, -1)
+
+    def next_obs(self, steps):
+        """
+        各步执行动作之后的观测: 回合内取下一步的 obs，回合最后一步取索引中的结束观测
+        """
+        steps = np.asarray(steps, dtype=np.int64)
+        episode = self.episode_of(steps)
+        if np.any(episode < 0):
+            raise IndexError("next_obs 只对已写入索引的回合有定义")
+        last = steps == self._episode_ends[episode] - 1
+        out = np.empty((steps.size,) + self.obs_shape, dtype=np.float32)
+        if np.any(~last):
+            out[~last] = self.gather('obs', steps[~last] + 1)
+        if np.any(last):
+            out[last] = self.final_obs(episode[last])
+        return out
+
+    def sample(self, batch_size, rng=None):
+        """
+        从已索引的回合中均匀随机采样 batch_size 个转移，返回各列以及 next_obs
+        """
+        rng = np.random.default_rng(rng)
+        lengths = self.episodes['length']
+        if lengths.sum() == 0:
+            raise ValueError("没有已结束的回合可供采样")
+        # 先按步数比例选回合，再在回合内均匀选步，等价于在所有已索引的步中均匀采样
+        episode = rng.choice(len(lengths), size=batch_size, p=lengths / lengths.sum())
+        steps = self.episodes['start'][episode] + (rng.random(batch_size) * lengths[episode]).astype(np.int64)
+        batch = {column: self.gather(column, steps) for column in self.columns}
+        batch['next_obs'] = self.next_obs(steps)
+        batch['step'] = steps
+        return batch
+
+    def episode(self, index):
+        """
+        第 index 个回合的全部数据（各列连续数组）
+        """
+        start, length = int(self.episodes['start'][index]), int(self.episodes['length'][index])
+        steps = np.arange(start, start + length)
+        data = {column: self.gather(column, steps) for column in self.columns}
+        data['final_obs'] = self.final_obs(index)
+        return data
+
+    def has_event(self, events, name):
+        """
+        events 列中是否包含事件 name
+        """
+        return (np.asarray(events) & EVENT_BITS[name]) != 0
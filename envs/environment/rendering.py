@@ -0,0 +1,63 @@
+# 分类: 环境模块
+# 描述: 定义场景渲染器（SceneRenderer）。球场只预渲染一次，每帧先贴球场图层再绘制实体；
+#       离屏模式画在普通 Surface 上，不需要显示设备，可按比例缩小分辨率。
+
+import numpy as np
+import pygame
+
+from envs.physics.utils import draw_field
+
+
+class SceneRenderer:
+    """
+    场景渲染器
+    surface 为 None 时使用离屏 Surface（无需显示设备），否则画在给定的 Surface（例如窗口）上
+    scale 为渲染分辨率相对球场尺寸的比例，用于低分辨率录像
+    """
+    def __init__(self, width, height, scale=1.0, surface=None):
+        self.width = width
+        self.height = height
+        self.scale = float(scale)
+        self.size = (max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale))))
+        self.surface = surface if surface is not None else pygame.Surface(self.size)
+        self.pitch = self._build_pitch()
+
+    def _build_pitch(self):
+        """
+        预渲染静态球场图层（边线、中圈、球门区、草坪纹理）
+        """
+        pitch = pygame.Surface((self.width, self.height))
+        draw_field(pitch, self.width, self.height)
+        if self.size != (self.width, self.height):
+            pitch = pygame.transform.smoothscale(pitch, self.size)
+        return pitch
+
+    def draw(self, env):
+        """
+        绘制一帧: 贴球场图层，再依次绘制球、障碍物和球员
+        """
+        surface = self.surface
+        surface.blit(self.pitch, (0, 0))
+        env.ball.draw(surface, self.scale)
+        for obstacle in env.obstacles:
+            obstacle.draw(surface, self.scale)
+        # 球员朝向取自环境的位姿缓存
+        pose = getattr(env, 'pose', None)
+        for player in env.players:
+            heading = pose.heading(player.id) if pose is not None else None
+            player.draw(surface, self.scale, heading)
+        return surface
+
+    def rgb_array(self, out=None):
+        """
+        返回当前帧的 HxWx3 图像（可写的连续 uint8 数组）
+        像素由 Surface 直接 blit 到数组上（只拷贝一次）；给出 out 时写入 out（形状 HxWx3、C 连续的 uint8）并返回，
+        录像等逐帧取图的场合可以复用同一块缓冲区
+        """
+        shape = (self.size[1], self.size[0], 3)
+        if out is None:
+            out = np.empty(shape, dtype=np.uint8)
+        elif out.shape != shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+            raise ValueError("out 应为形状 %s、C 连续的 uint8 数组" % (shape,))
+        pygame.image.frombuffer(out, self.size, 'RGB').blit(self.surface, (0, 0))
+        return out
@@ -0,0 +1,211 @@
+# 分类: 环境模块
+# 描述: 定义基于动作日志的确定性回放。记录时只保存环境配置、种子、初始状态快照和动作序列，
+#       并每隔 keyframe_every 步保存一个关键帧（SoccerEnv.get_state 快照）；回放时跳到任意一步只需
+#       恢复之前最近的关键帧再向前模拟不超过 keyframe_every 步，耗时与回合长度无关。
+#       只有真正显示的帧才渲染。
+
+import json
+import os
+
+import gymnasium as gym
+import numpy as np
+
+# 重建环境所需的 SoccerEnv 构造参数
+CONFIG_KEYS = ('width', 'height', 'num_players', 'num_obstacles', 'max_steps', 'broad_phase',
+               'dt', 'frame_skip', 'substeps', 'ccd', 'ccd_iterations', 'obstacle_behaviours')
+
+
+def env_config(env):
+    """
+    读取 SoccerEnv 的构造参数，用于回放时重建同样的环境
+    """
+    base = env.unwrapped
+    return {key: getattr(base, key) for key in CONFIG_KEYS}
+
+
+class ActionLog:
+    """
+    一个回合的动作日志
+    第 k 个位置表示执行了前 k 个动作之后的状态；关键帧 (keyframe_steps[i], keyframes[i]) 是该位置的状态快照，
+    位置 0 的关键帧即初始状态
+    """
+    def __init__(self, config, seed, initial_state, keyframe_every=100, actions=None,
+                 keyframe_steps=None, keyframes=None):
+        self.config = dict(config)
+        self.seed = seed
+        self.keyframe_every = int(keyframe_every)
+        self._actions = list(actions) if actions is not None else []
+        if keyframes is None:
+            keyframe_steps, keyframes = [0], [np.array(initial_state, dtype=np.float64)]
+        self._keyframe_steps = list(keyframe_steps)
+        self._keyframes = list(keyframes)
+
+    def __len__(self):
+        return len(self._actions)
+
+    @property
+    def initial_state(self):
+        return self._keyframes[0]
+
+    @property
+    def actions(self):
+        return np.asarray(self._actions, dtype=np.float32)
+
+    def append(self, action):
+        self._actions.append(np.array(action, dtype=np.float32).ravel())
+
+    def add_keyframe(self, step, state):
+        self._keyframe_steps.append(int(step))
+        self._keyframes.append(np.array(state, dtype=np.float64))
+
+    def nearest_keyframe(self, step):
+        """
+        位置 step 之前（含）最近的关键帧: (关键帧位置, 状态快照)
+        """
+        i = int(np.searchsorted(self._keyframe_steps, step, side='right')) - 1
+        return self._keyframe_steps[i], self._keyframes[i]
+
+    def save(self, path):
+        """
+        压缩保存为 .npz（只含数值数组和 JSON 文本，加载时不需要 pickle）
+        """
+        num_actions = len(self._actions[0]) if self._actions else 0
+        np.savez_compressed(
+            path,
+            config=np.array(json.dumps(self.config)),
+            seed=np.array(-1 if self.seed is None else self.seed, dtype=np.int64),
+            keyframe_every=np.array(self.keyframe_every, dtype=np.int64),
+            actions=self.actions.reshape(len(self._actions), num_actions),
+            keyframe_steps=np.array(self._keyframe_steps, dtype=np.int64),
+            keyframes=np.stack(self._keyframes),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            seed = int(data['seed'])
+            keyframes = data['keyframes']
+            return cls(json.loads(str(data['config'])), None if seed < 0 else seed, keyframes[0],
+                       int(data['keyframe_every']), actions=data['actions'],
+                       keyframe_steps=data['keyframe_steps'].tolist(), keyframes=list(keyframes))
+
+
+class ActionLogRecorder(gym.Wrapper):
+    """
+    动作日志记录包装器，直接包在 SoccerEnv 或 DefaultRewardWrapper 外层（记录的动作要原样传到 SoccerEnv）
+    动作先转换为 float32 再传给 env 并写入日志，回放时执行的动作与记录时逐位相同（与调用方传入的类型无关）
+    每次 reset 开始一个新日志；directory 不为 None 时每个回合结束（或被重置）时保存为 episode_00000.npz 等
+    """
+    def __init__(self, env, keyframe_every=100, directory=None):
+        super().__init__(env)
+        self.keyframe_every = int(keyframe_every)
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.log = None        # 当前回合的日志
+        self.last_log = None   # 上一个结束的回合的日志
+        self.num_saved = 0
+
+    def reset(self, *, seed=None, options=None):
+        self._finish()
+        obs, info = self.env.reset(seed=seed, options=options)
+        self._start(seed)
+        return obs, info
+
+    def step(self, action):
+        action = np.asarray(action, dtype=np.float32)
+        result = self.env.step(action)
+        log = self.log
+        autoreset = 'final_obs' in result[4]
+        if log is not None:
+            log.append(action)
+            # 自动重置后环境已处于新回合，结束位置不再保存关键帧（回放时从上一个关键帧模拟过去）
+            if len(log) % self.keyframe_every == 0 and not autoreset:
+                log.add_keyframe(len(log), self.env.unwrapped.get_state())
+            if result[2] or result[3]:
+                self._finish()
+        if autoreset:
+            # 环境已在 step 内自动重置: 当前状态即新回合的初始状态
+            self._start(None)
+        return result
+
+    def _start(self, seed):
+        base = self.env.unwrapped
+        self.log = ActionLog(env_config(base), seed, base.get_state(), self.keyframe_every)
+
+    def _finish(self):
+        if self.log is None or len(self.log) == 0:
+            return
+        if self.directory is not None:
+            self.log.save(os.path.join(self.directory, 'episode_%05d.npz' % self.num_saved))
+            self.num_saved += 1
+        self.last_log = self.log
+        self.log = None
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class ReplayPlayer:
+    """
+    动作日志回放器
+    seek(step) 跳到第 step 个位置: 从当前位置继续模拟更近时直接前进，否则恢复最近的关键帧再前进，
+    每次最多模拟 keyframe_every 步；frame / frames 只渲染要显示的帧
+    默认在裸 SoccerEnv 上回放，动力学和观测与记录时逐位相同；实体表中的 prev_vx / prev_vy / prev_angle
+    由奖励包装器维护，需要同时复现奖励时传入与记录时同样包装的 env
+    """
+    def __init__(self, log, env=None, render_scale=1.0):
+        if isinstance(log, (str, os.PathLike)):
+            log = ActionLog.load(log)
+        self.log = log
+        if env is None:
+            from envs.environment.soccer_env import SoccerEnv
+            env = SoccerEnv(render_scale=render_scale, **log.config)
+        self.env = env
+        self._actions = log.actions
+        self.position = None
+        self.observation = None
+        # 恢复关键帧时观测写入的缓冲区（之后还要前进时不必再复制）
+        self._keyframe_obs = np.zeros(self.env.unwrapped.observation_space.shape, dtype=np.float32)
+
+    def __len__(self):
+        """
+        可以跳转的位置数（动作数 + 1）
+        """
+        return len(self._actions) + 1
+
+    def seek(self, step):
+        """
+        跳到第 step 个位置（执行了前 step 个动作之后），返回该位置的观测
+        """
+        if not 0 <= step < len(self):
+            raise IndexError("位置 %d 超出范围 [0, %d)" % (step, len(self)))
+        keyframe_step, state = self.log.nearest_keyframe(step)
+        if self.position is None or not keyframe_step <= self.position <= step:
+            self.observation = self.env.unwrapped.set_state(state, out=self._keyframe_obs)
+            self.position = keyframe_step
+        while self.position < step:
+            self.observation = self.env.step(self._actions[self.position])[0]
+            self.position += 1
+        if self.observation is self._keyframe_obs:
+            self.observation = self._keyframe_obs.copy()
+        return self.observation
+
+    def frame(self, step, mode='rgb_array'):
+        """
+        渲染第 step 个位置的画面
+        """
+        self.seek(step)
+        return self.env.unwrapped.render(mode)
+
+    def frames(self, start=0, stop=None, stride=1, mode='rgb_array'):
+        """
+        依次产生 (位置, 画面)；只渲染 start:stop:stride 中的位置，中间的位置只模拟不渲染
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        for step in range(start, stop, stride):
+            yield step, self.frame(step, mode)
+
+    def close(self):
+        self.env.close()
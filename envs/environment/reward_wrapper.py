@@ -1,13 +1,49 @@
+import math
+
 import gymnasium as gym
 import numpy as np
 
+# 团队奖励项（标量）与球员奖励项（每个球员一个值）
+TEAM_TERMS = ('boundary', 'goal', 'ball_movement', 'time')
+PLAYER_TERMS = ('vision', 'to_ball', 'smooth_movement')
+
+
+class _FloatOps:
+    """
+    球员奖励公式逐个球员计算时使用的运算（Python float），与 numpy 的同名函数一一对应
+    """
+    sqrt = staticmethod(math.sqrt)
+    arctan2 = staticmethod(math.atan2)
+    cos = staticmethod(math.cos)
+    minimum = staticmethod(min)
+
+    @staticmethod
+    def where(condition, x, y):
+        return x if condition else y
+
+
 class DefaultRewardWrapper(gym.Wrapper):
-    def __init__(self, env):
+    """
+    默认奖励包装器
+    奖励由若干数组化的奖励项组成，每步只读取一次 env 的结果（进球、出界、碰撞）和实体表，
+    所有球员同时计算；terms 指定启用的奖励项，未启用的奖励项不做任何计算。
+    每个球员奖励项只有一份公式（_vision_reward 等），运算取自传入的 ops: 球员数不超过 scalar_threshold 时
+    逐个球员以 Python float 和 _FloatOps 计算（小数组上 NumPy 调用的固定开销远大于计算本身），否则对数组以 numpy 一次计算。
+    env 使用 frame_skip 时，进球、出界事件在各子步间累积；时间惩罚和按状态给出的塑形项（ball_movement、vision、to_ball、
+    smooth_movement 中的速度项）按动作结束时的状态计算一次再乘以本步的 tick 数，使每回合的奖励尺度与 frame_skip 无关；
+    smooth_movement 中的加速度、转角项衡量两次动作之间的变化量，本身已覆盖整个动作，不再乘 tick 数。
+    这只是近似: 动作结束时的状态被当作动作内每个 tick 的状态，动作中途状态变化较大时
+    （尤其是中途进球或出界、只推进了部分 tick 的一步）与逐 tick 累计的结果有偏差；tick 数取本步实际推进的数目，
+    达到 max_steps 截断的一步不推进物理，tick 数为 0。
+    return_breakdown 为 True 时在 info 中返回各奖励项（reward_terms）和每个球员的奖励（agent_rewards）。
+    """
+    def __init__(self, env, terms=None, return_breakdown=False):
         super().__init__(env)
         self.action_num = getattr(env, "action_num", None)
         self.num_players = getattr(env, "num_players", None)
         self.reward = 0.0
         self.done = False
+        self.return_breakdown = return_breakdown
 
         # ----------------- 奖励参数 -----------------
         self.goal_reward = 10
@@ -18,6 +54,55 @@ class DefaultRewardWrapper(gym.Wrapper):
         self.own_player_penalty = -20.0
         self.no_ball_penalty = -0.1
 
+        # ----------------- 奖励项 -----------------
+        if terms is None:
+            terms = TEAM_TERMS + PLAYER_TERMS
+        unknown = set(terms) - set(TEAM_TERMS + PLAYER_TERMS)
+        if unknown:
+            raise ValueError("未知的奖励项: %s" % sorted(unknown))
+        self.scalar_threshold = 16
+        self.scalar = self.env.unwrapped.num_players <= self.scalar_threshold
+        self.team_terms = [(name, getattr(self, "_term_" + name)) for name in TEAM_TERMS if name in terms]
+        self.player_terms = [(name, getattr(self, "_term_" + name)) for name in PLAYER_TERMS if name in terms]
+        self._untimed_terms = None
+
+        # env 开启自动重置时，奖励要读取回合结束时的状态，因此由包装器在算完奖励后再重置
+        self._autoreset = getattr(env.unwrapped, "autoreset", False)
+        if self._autoreset:
+            env.unwrapped.defer_autoreset = True
+
+    def enable_profiling(self, report_every=None):
+        """
+        启用性能分析: 与底层 env 共用一个分析器，各奖励项的耗时记在 "reward.<名称>" 下；
+        步数计数和周期汇总改由包装器在奖励项算完之后进行，汇总中包含本步的奖励项耗时
+        """
+        profiler = self.env.unwrapped.enable_profiling(report_every)
+        if self._untimed_terms is None:
+            self._untimed_terms = (self.team_terms, self.player_terms)
+            self.team_terms = [(name, profiler.wrap("reward." + name, term)) for name, term in self.team_terms]
+            self.player_terms = [(name, profiler.wrap("reward." + name, term)) for name, term in self.player_terms]
+            profiler.outer_tick = True
+            self.step = self._profiled_step
+        return profiler
+
+    def disable_profiling(self):
+        if self._untimed_terms is not None:
+            self.team_terms, self.player_terms = self._untimed_terms
+            self._untimed_terms = None
+            del self.__dict__['step']
+        self.env.unwrapped.disable_profiling()
+
+    def get_profile(self):
+        return self.env.unwrapped.get_profile()
+
+    def _profiled_step(self, action):
+        obs, reward, terminated, truncated, info = type(self).step(self, action)
+        summary = self.env.unwrapped.profiler.tick()
+        if summary is not None:
+            info = dict(info)
+            info["profile"] = summary
+        return obs, reward, terminated, truncated, info
+
     def step(self, action):
         obs, terminated, truncated, info = None, False, False, {}
 
@@ -27,134 +112,146 @@ class DefaultRewardWrapper(gym.Wrapper):
         except Exception:
             obs, terminated, truncated, info = self.env.step(action)  # 兼容一些 env 旧接口
 
-        # 计算奖励
-        reward = 0.0
-        reward += self._calculate_boundary_reward()
-        reward += self._calculate_goal_reward()
-        reward += self._calculate_ball_movement_reward()
-        reward += self._calculate_player_vision_reward()
-        reward += self._reward_2the_ball()
-        reward += self._reward_smooth_movement()
-        reward += self.time_penalty  # 固定时间惩罚
+        # 计算奖励: 先读取一次本步的状态，再依次计算启用的奖励项
+        state = self._read_state()
+        team_rewards = {name: term(state) for name, term in self.team_terms}
+        player_rewards = {name: term(state) for name, term in self.player_terms}
 
+        team_total = sum(team_rewards.values())
+        if self.scalar:
+            agent_rewards = [sum(values) for values in zip(*player_rewards.values())] or [0.0] * self.num_players
+            player_total = sum(agent_rewards)
+        else:
+            agent_rewards = np.zeros(self.num_players)
+            for value in player_rewards.values():
+                agent_rewards += value
+            player_total = float(agent_rewards.sum())
+        reward = team_total + player_total
+        self.reward += reward - team_rewards.get('time', 0.0)
+
+        if self.return_breakdown:
+            terms = dict(team_rewards)
+            terms.update({name: float(np.sum(value)) for name, value in player_rewards.items()})
+            info = dict(info)
+            info["reward_terms"] = terms
+            # 每个球员的奖励 = 自己的球员奖励项 + 共享的团队奖励
+            info["agent_rewards"] = np.asarray(agent_rewards, dtype=np.float64) + team_total
+
+        if self._autoreset and (terminated or truncated):
+            obs, info = self.env.unwrapped.apply_autoreset(obs, info)
         return obs, reward, terminated, truncated, info
 
+    def _read_state(self):
+        """
+        从实体表一次性读出球员和球的状态（float64 数组；scalar 时为 Python float 列表），供各奖励项共用
+        """
+        env = self.env.unwrapped
+        rows = slice(1, 1 + env.num_players)
+        # 实体表前7列依次为 x, y, angle, vx, vy, angular_velocity, can_see_ball
+        columns = env.entities.data[0:7, rows]
+        if self.scalar:
+            x, y, angle, vx, vy, _, can_see_ball = columns.tolist()
+            ball_x, ball_y = env.entities.data[0:2, env.ball.id].tolist()
+        else:
+            x, y, angle, vx, vy, _, can_see_ball = columns.astype(np.float64)
+            ball_x, ball_y = env.ball.x, env.ball.y
+        return {
+            "env": env, "rows": rows,
+            "x": x, "y": y, "vx": vx, "vy": vy, "angle": angle,
+            "can_see_ball": can_see_ball,
+            "ball_x": ball_x, "ball_y": ball_y,
+            "ticks": env.last_ticks,
+        }
+
     # ------------------------------奖励函数------------------------------ #
-    def _calculate_boundary_reward(self):
-        # 保证 env._check_boundaries 总是返回三个值
-        if hasattr(self.env, "_check_boundaries"):
-            res = self.env._check_boundaries()
-            if isinstance(res, tuple) and len(res) == 3:
-                boundary_reward, game_reset, _ = res
-            else:
-                print("Warning: Unexpected return value from _check_boundaries:", res)
-                boundary_reward = 0.0
+    def _term_boundary(self, state):
+        # 球出界
+        return -5.0 if state["env"].last_ball_out else 0.0
+
+    def _term_goal(self, state):
+        goal = state["env"].last_goal
+        if goal == -1:
+            return float(self.goal_reward)
+        elif goal == 1:
+            return 10.0
+        return 0.0
+
+    def _term_ball_movement(self, state):
+        dx = state["ball_x"] - state["env"].width // 2
+        return dx * self.right_reward * state["ticks"]
+
+    def _term_time(self, state):
+        # 固定时间惩罚，按本步推进的物理 tick 数累计（frame_skip > 1 时一个动作跨多个 tick）
+        return self.time_penalty * state["ticks"]
+
+    def _term_vision(self, state):
+        reward = self.see_ball_reward * state["ticks"]
+        if self.scalar:
+            return [_vision_reward(_FloatOps, see, reward) for see in state["can_see_ball"]]
+        return _vision_reward(np, state["can_see_ball"], reward)
+
+    def _term_smooth_movement(self, state):
+        table = state["env"].entities
+        # 实体表中 prev_vx, prev_vy, prev_angle 三列相邻
+        start = table.INDEX['prev_vx']
+        prev = table.data[start:start + 3, state["rows"]]
+        ticks = state["ticks"]
+        if self.scalar:
+            rewards = [_smooth_movement_reward(_FloatOps, *values, ticks)
+                       for values in zip(state["vx"], state["vy"], state["angle"], *prev.tolist())]
         else:
-            boundary_reward = 0.0
-
-        self.reward += boundary_reward
-        return boundary_reward
-
-    def _calculate_goal_reward(self):
-        goal_reward = 0.0
-        if hasattr(self.env, "ball") and hasattr(self.env, "width") and hasattr(self.env, "height"):
-            try:
-                from envs.physics.utils import is_goal
-                goal = is_goal(self.env.ball, self.env.width - 50 + self.env.ball.radius, self.env.height)
-                if goal == -1:
-                    goal_reward += self.goal_reward
-                elif goal == 1:
-                    goal_reward += 10
-            except Exception:
-                goal_reward = 0.0
-        self.reward += goal_reward
-        return goal_reward
-
-    def _calculate_ball_movement_reward(self):
-        if not hasattr(self.env, "ball") or not hasattr(self.env, "width"):
-            return 0.0
-        dx = self.env.ball.x - self.env.width // 2
-        ball_movement_reward = dx * self.right_reward
-        self.reward += ball_movement_reward
-        return ball_movement_reward
-
-    def _calculate_player_vision_reward(self):
-        if not hasattr(self.env, "players"):
-            return 0.0
-        vision_reward = 0.0
-        for player in self.env.players:
-            if getattr(player, "can_see_ball", False):
-                vision_reward += self.see_ball_reward
-        self.reward += vision_reward
-        return vision_reward
-
-    def _reward_smooth_movement(self):
-        if not hasattr(self.env, "players"):
-            return 0.0
-
-        total_reward = 0.0
-        for player in self.env.players:
-            if not hasattr(player, 'prev_vx'):
-                player.prev_vx = getattr(player, 'vx', 0.0)
-                player.prev_vy = getattr(player, 'vy', 0.0)
-                player.prev_angle = getattr(player, 'angle', 0.0)
-                continue
-
-            dvx = getattr(player, 'vx', 0.0) - player.prev_vx
-            dvy = getattr(player, 'vy', 0.0) - player.prev_vy
-            accel = (dvx**2 + dvy**2)**0.5
-
-            angle_change = abs(getattr(player, 'angle', 0.0) - player.prev_angle)
-            angle_change = min(angle_change, 360 - angle_change)
-
-            speed = (getattr(player, 'vx', 0.0)**2 + getattr(player, 'vy', 0.0)**2)**0.5
-            angle_penalty = -0.1 * (angle_change / 10.0)
-            accel_penalty = -0.0005 * (accel / 10.0)
-            target_speed = 50.0
-            speed_diff = abs(speed - target_speed)
-            speed_reward = -0.001 * (speed_diff / 10.0)
-
-            player.prev_vx = getattr(player, 'vx', 0.0)
-            player.prev_vy = getattr(player, 'vy', 0.0)
-            player.prev_angle = getattr(player, 'angle', 0.0)
-
-            smooth_reward = angle_penalty + accel_penalty + speed_reward
-            total_reward += smooth_reward
-
-        self.reward += total_reward
-        return total_reward
-
-    def _reward_2the_ball(self):
-        if not hasattr(self.env, "players") or not hasattr(self.env, "ball"):
-            return 0.0
-
-        total_reward = 0.0
-        for player in self.env.players:
-            dx = self.env.ball.x - getattr(player, 'x', 0.0)
-            dy = self.env.ball.y - getattr(player, 'y', 0.0)
-            distance_to_ball = (dx**2 + dy**2)**0.5
-            max_distance = (getattr(self.env, 'width', 1)**2 + getattr(self.env, 'height', 1)**2)**0.5
-            distance_reward = 1.0 - min(distance_to_ball / max_distance, 1.0)
-
-            position_reward = 1.0 if dx > 0 else -1.0
-            position_reward += (1.0 - (distance_to_ball / max_distance)) * (2.0 if dx > 0 else -0.1)
-
-            if getattr(player, 'vx', 0.0) != 0 or getattr(player, 'vy', 0.0) != 0:
-                player_direction = np.arctan2(getattr(player, 'vy', 0.0), getattr(player, 'vx', 0.0))
-                to_ball_direction = np.arctan2(dy, dx)
-                angle_diff = abs(player_direction - to_ball_direction) % (2 * np.pi)
-                angle_diff = min(angle_diff, 2 * np.pi - angle_diff)
-                direction_reward = np.cos(angle_diff) * 0.5
-            else:
-                direction_reward = 0.0
-
-            speed = (getattr(player, 'vx', 0.0)**2 + getattr(player, 'vy', 0.0)**2)**0.5
-            speed_reward = min(speed / 100.0, 1.0) * 0.3
-
-            player_reward = (position_reward * 0.5 +
-                             direction_reward * 0.3 +
-                             speed_reward) * 0.1
-            total_reward += player_reward
-
-        self.reward += total_reward
-        return total_reward
+            rewards = _smooth_movement_reward(np, state["vx"], state["vy"], state["angle"], *prev, ticks)
+
+        # 记录本步状态供下一步比较
+        prev[...] = (state["vx"], state["vy"], state["angle"])
+        return rewards
+
+    def _term_to_ball(self, state):
+        env = state["env"]
+        ball = (state["ball_x"], state["ball_y"], (env.width ** 2 + env.height ** 2) ** 0.5, state["ticks"])
+        if self.scalar:
+            return [_to_ball_reward(_FloatOps, *values, *ball)
+                    for values in zip(state["x"], state["y"], state["vx"], state["vy"])]
+        return _to_ball_reward(np, state["x"], state["y"], state["vx"], state["vy"], *ball)
+
+
+# ------------------------ 球员奖励公式 ------------------------ #
+# ops 为 numpy（参数为数组）或 _FloatOps（参数为单个球员的 Python float）
+def _vision_reward(ops, can_see_ball, reward):
+    return can_see_ball * reward
+
+
+def _smooth_movement_reward(ops, vx, vy, angle, prev_vx, prev_vy, prev_angle, ticks):
+    dvx, dvy = vx - prev_vx, vy - prev_vy
+    accel = ops.sqrt(dvx * dvx + dvy * dvy)
+    angle_change = abs(angle - prev_angle)
+    angle_change = ops.minimum(angle_change, 360 - angle_change)
+    speed = ops.sqrt(vx * vx + vy * vy)
+
+    angle_penalty = -0.1 * (angle_change / 10.0)
+    accel_penalty = -0.0005 * (accel / 10.0)
+    target_speed = 50.0
+    speed_reward = -0.001 * (abs(speed - target_speed) / 10.0) * ticks
+    return angle_penalty + accel_penalty + speed_reward
+
+
+def _to_ball_reward(ops, x, y, vx, vy, ball_x, ball_y, max_distance, ticks):
+    dx, dy = ball_x - x, ball_y - y
+    distance_to_ball = ops.sqrt(dx * dx + dy * dy)
+
+    ahead = dx > 0
+    closeness = 1.0 - distance_to_ball / max_distance
+    position_reward = ops.where(ahead, 1.0, -1.0) + closeness * ops.where(ahead, 2.0, -0.1)
+
+    # 移动方向与指向球方向的夹角
+    moving = (vx != 0) | (vy != 0)
+    angle_diff = abs(ops.arctan2(vy, vx) - ops.arctan2(dy, dx)) % (2 * math.pi)
+    angle_diff = ops.minimum(angle_diff, 2 * math.pi - angle_diff)
+    direction_reward = ops.where(moving, ops.cos(angle_diff) * 0.5, 0.0)
+
+    speed = ops.sqrt(vx * vx + vy * vy)
+    speed_reward = ops.minimum(speed / 100.0, 1.0) * 0.3
+
+    return (position_reward * 0.5 +
+            direction_reward * 0.3 +
+            speed_reward) * 0.1 * ticks
@@ -0,0 +1,293 @@
+# 分类: 环境模块
+# 描述: 定义开局状态库（ScenarioBank）及其生成器（generate_bank）。生成器按桶（kickoff、scattered、
+#       moving_ball、attack）批量采样候选开局，用向量化的出界、重叠检测一次剔除无效候选，
+#       多进程并行生成后写入一个目录。SoccerEnv.reset 按编号直接取出开局（O(1)），不在 reset 中做拒绝采样；
+#       各桶的抽样权重保存在内存映射文件中，训练过程中可以随时调整（对所有打开同一目录的进程立即生效）。
+
+import json
+import multiprocessing as mp
+import os
+
+import numpy as np
+
+from envs.physics.utils import GOAL_DEPTH, GOAL_HEIGHT
+
+# 开局状态中每个实体保存的列，其余列（尺寸、速度参数等）取默认布局
+STATE_COLUMNS = ('x', 'y', 'angle', 'vx', 'vy')
+BUCKETS = ('kickoff', 'scattered', 'moving_ball', 'attack')
+
+META_FILE = 'meta.json'
+STATES_FILE = 'states.npy'
+OFFSETS_FILE = 'offsets.npy'
+WEIGHTS_FILE = 'weights.npy'
+
+
+def field_geometry(width=800, height=600, num_players=1, num_obstacles=0):
+    """
+    读取场地配置下的默认布局和各实体的外接圆半径（球为其半径），供生成器使用
+    """
+    from envs.environment.soccer_env import SoccerEnv
+    env = SoccerEnv(width=width, height=height, num_players=num_players, num_obstacles=num_obstacles)
+    table = env.entities
+    radius = np.hypot(table.width, table.height).astype(np.float64) / 2
+    radius[env.ball.id] = env.ball.radius
+    geometry = {
+        'width': width, 'height': height, 'num_players': num_players, 'num_obstacles': num_obstacles,
+        'layout': np.stack([table.column(name) for name in STATE_COLUMNS], axis=1).astype(np.float64),
+        'radius': radius,
+        'dt': env.dt,
+    }
+    env.close()
+    return geometry
+
+
+# ------------------------------ 各桶的候选采样 ------------------------------ #
+# 每个函数返回 (n, 实体数, len(STATE_COLUMNS)) 的候选开局，实体顺序为球、球员、障碍物；
+# 候选可能重叠或出界，由 valid_states 统一剔除
+
+def _kickoff(rng, n, g):
+    """
+    默认布局加小扰动
+    """
+    states = np.repeat(g['layout'][None], n, axis=0)
+    states[:, 1:, :2] += rng.normal(0.0, 15.0, size=(n, states.shape[1] - 1, 2))
+    states[:, 1:, 2] = (states[:, 1:, 2] + rng.uniform(-30.0, 30.0, size=(n, states.shape[1] - 1))) % 360
+    return states
+
+
+def _scattered(rng, n, g, ball_speed=0.0):
+    """
+    所有实体在场内均匀分布，球员朝向随机；ball_speed 大于 0 时球带有随机方向的初速度
+    """
+    r = g['radius']
+    states = np.zeros((n, len(r), len(STATE_COLUMNS)))
+    states[..., 0] = rng.uniform(r, g['width'] - r, size=(n, len(r)))
+    states[..., 1] = rng.uniform(r, g['height'] - r, size=(n, len(r)))
+    states[:, 1:1 + g['num_players'], 2] = rng.uniform(0.0, 360.0, size=(n, g['num_players']))
+    if ball_speed > 0:
+        speed = rng.uniform(0.25, 1.0, size=n) * ball_speed
+        direction = rng.uniform(0.0, 2 * np.pi, size=n)
+        states[:, 0, 3] = speed * np.cos(direction)
+        states[:, 0, 4] = speed * np.sin(direction)
+    return states
+
+
+def _moving_ball(rng, n, g):
+    """
+    均匀分布，球以最高 200 像素/秒的速度运动
+    """
+    return _scattered(rng, n, g, ball_speed=200.0)
+
+
+def _attack(rng, n, g):
+    """
+    进攻练习: 球在右侧球门前，球员在球后方并朝向球，障碍物在球和球门之间防守
+    """
+    width, height, p = g['width'], g['height'], g['num_players']
+    r = g['radius']
+    states = np.zeros((n, len(r), len(STATE_COLUMNS)))
+    bx = rng.uniform(0.65 * width, width - r[0] - 80.0, size=n)
+    by = height / 2 + rng.uniform(-(GOAL_HEIGHT / 2 + 50.0), GOAL_HEIGHT / 2 + 50.0, size=n)
+    states[:, 0, 0], states[:, 0, 1] = bx, by
+
+    players = slice(1, 1 + p)
+    states[:, players, 0] = bx[:, None] - rng.uniform(20.0, 160.0, size=(n, p))
+    states[:, players, 1] = by[:, None] + rng.uniform(-120.0, 120.0, size=(n, p))
+    states[:, players, 2] = np.degrees(np.arctan2(by[:, None] - states[:, players, 1],
+                                                  bx[:, None] - states[:, players, 0])) % 360
+
+    obstacles = slice(1 + p, None)
+    count = len(r) - 1 - p
+    states[:, obstacles, 0] = rng.uniform(bx[:, None] + 30.0, width - r[obstacles], size=(n, count))
+    states[:, obstacles, 1] = height / 2 + rng.uniform(-(GOAL_HEIGHT / 2 + 50.0), GOAL_HEIGHT / 2 + 50.0,
+                                                       size=(n, count))
+    return states
+
+
+_GENERATORS = {'kickoff': _kickoff, 'scattered': _scattered, 'moving_ball': _moving_ball, 'attack': _attack}
+
+
+def _clear_of_goals(ball_x, ball_y, radius, g):
+    """
+    球心在 (ball_x, ball_y)、半径为 radius 的球是否离开两侧球门的进球判定线
+    """
+    goal_y = (g['height'] - GOAL_HEIGHT) // 2
+    in_mouth = (ball_y >= goal_y) & (ball_y <= goal_y + GOAL_HEIGHT)
+    return ~in_mouth | ((ball_x - radius > 0) & (ball_x + radius < g['width'] - GOAL_DEPTH))
+
+
+def valid_states(states, g, margin=2.0):
+    """
+    逐个候选检查: 所有实体的外接圆都在场内；球在球门高度范围内时不触及两侧的进球判定线
+    （左侧为 x = 0，右侧为 x = width - GOAL_DEPTH，与 SoccerEnv 的进球判定相同），按初速度运动一个 tick 后也不触及；
+    且两两不重叠（留 margin 像素间隙）
+    """
+    x, y, r = states[..., 0], states[..., 1], g['radius']
+    inside = np.all((x >= r + margin) & (x <= g['width'] - r - margin) &
+                    (y >= r + margin) & (y <= g['height'] - r - margin), axis=1)
+    clear = _clear_of_goals(x[:, 0], y[:, 0], r[0] + margin, g)
+    clear &= _clear_of_goals(x[:, 0] + states[:, 0, 3] * g['dt'], y[:, 0] + states[:, 0, 4] * g['dt'],
+                             r[0] + margin, g)
+    i, j = np.triu_indices(len(r), 1)
+    dx = x[:, i] - x[:, j]
+    dy = y[:, i] - y[:, j]
+    apart = np.all(dx * dx + dy * dy >= (r[i] + r[j] + margin) ** 2, axis=1)
+    return inside & clear & apart
+
+
+def sample_bucket(bucket, n, g, seed, max_rounds=100):
+    """
+    用拒绝采样生成 bucket 桶的 n 个有效开局（float32），每轮批量采样、一次检测
+    """
+    rng = np.random.default_rng(seed)
+    generate = _GENERATORS[bucket]
+    parts, count = [], 0
+    for _ in range(max_rounds):
+        if count == n:
+            break
+        batch = generate(rng, max(2 * (n - count), 64), g)
+        batch = batch[valid_states(batch, g)][:n - count]
+        parts.append(batch)
+        count += len(batch)
+    if count < n:
+        raise RuntimeError("桶 %s 的有效开局太少（场地太小或实体太多）" % bucket)
+    return np.concatenate(parts).astype(np.float32) if parts else np.zeros((0,) + g['layout'].shape, np.float32)
+
+
+def generate_bank(directory, counts, width=800, height=600, num_players=1, num_obstacles=0,
+                  weights=None, workers=None, seed=0, chunk_size=4096):
+    """
+    生成开局状态库并写入 directory
+    counts: {桶名: 开局数}，或一个整数表示每个桶的数量；weights: 初始抽样权重，默认各非空桶相同
+    每个桶按 chunk_size 分块，由进程池并行采样；各块的种子由 seed 派生，结果与进程数无关
+    """
+    if isinstance(counts, int):
+        counts = {bucket: counts for bucket in BUCKETS}
+    unknown = set(counts) - set(BUCKETS)
+    if unknown:
+        raise ValueError("未知的桶: %s" % sorted(unknown))
+    g = field_geometry(width, height, num_players, num_obstacles)
+    if counts.get('kickoff', 0) and not valid_states(g['layout'][None], g)[0]:
+        # kickoff 只在默认布局上加小扰动，默认布局本身重叠时几乎采不到有效开局
+        raise ValueError("%d 名球员、%d 个障碍物的默认布局中实体互相重叠或出界，无法生成 kickoff 桶；"
+                         "请把 kickoff 的数量设为 0" % (num_players, num_obstacles))
+
+    tasks = []
+    for bucket in BUCKETS:
+        n = int(counts.get(bucket, 0))
+        tasks += [(bucket, min(chunk_size, n - start)) for start in range(0, n, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    args = [(bucket, n, g, s) for (bucket, n), s in zip(tasks, seeds)]
+    workers = min(workers or os.cpu_count() or 1, max(len(args), 1))
+    if workers > 1:
+        with mp.Pool(workers) as pool:
+            chunks = pool.starmap(sample_bucket, args)
+    else:
+        chunks = [sample_bucket(*a) for a in args]
+
+    # 各桶的开局连续存放，offsets[k]:offsets[k + 1] 为第 k 个桶
+    sizes = [int(counts.get(bucket, 0)) for bucket in BUCKETS]
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    states = (np.concatenate(chunks) if chunks
+              else np.zeros((0,) + g['layout'].shape, dtype=np.float32))
+
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, STATES_FILE), states)
+    np.save(os.path.join(directory, OFFSETS_FILE), offsets)
+    np.save(os.path.join(directory, WEIGHTS_FILE), (np.array(sizes) > 0).astype(np.float64))
+    meta = {'width': width, 'height': height, 'num_players': num_players, 'num_obstacles': num_obstacles,
+            'columns': list(STATE_COLUMNS), 'buckets': list(BUCKETS), 'counts': dict(zip(BUCKETS, sizes)),
+            'seed': seed}
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    bank = ScenarioBank(directory)
+    if weights is not None:
+        bank.set_weights(weights)
+    return bank
+
+
+class ScenarioBank:
+    """
+    开局状态库的只读视图: 开局以内存映射方式打开；抽样权重文件以读写方式映射，
+    set_weights 的修改对所有打开同一目录的进程（例如 SharedMemoryVecEnv 的工作进程）立即生效
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.buckets = tuple(self.meta['buckets'])
+        # 取普通 ndarray 视图（仍由映射文件支持），避免 np.memmap 子类在每次小操作上的额外开销
+        self.states = np.load(os.path.join(directory, STATES_FILE), mmap_mode='r').view(np.ndarray)
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILE))
+        path = os.path.join(directory, WEIGHTS_FILE)
+        try:
+            self._mapped_weights = np.load(path, mmap_mode='r+')
+            self._weights = self._mapped_weights.view(np.ndarray)
+        except OSError:
+            # 只读目录: 权重只在本进程内可调
+            self._mapped_weights = None
+            self._weights = np.load(path)
+
+    def __len__(self):
+        return len(self.states)
+
+    @property
+    def weights(self):
+        return dict(zip(self.buckets, np.asarray(self._weights, dtype=np.float64).tolist()))
+
+    def bucket_size(self, bucket):
+        k = self.buckets.index(bucket)
+        return int(self.offsets[k + 1] - self.offsets[k])
+
+    def set_weights(self, weights):
+        """
+        设置各桶的抽样权重: {桶名: 权重}（未列出的桶权重为 0）或按 buckets 顺序的序列
+        """
+        if isinstance(weights, dict):
+            unknown = set(weights) - set(self.buckets)
+            if unknown:
+                raise ValueError("未知的桶: %s" % sorted(unknown))
+            weights = [weights.get(bucket, 0.0) for bucket in self.buckets]
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != (len(self.buckets),) or np.any(weights < 0) or weights.sum() <= 0:
+            raise ValueError("权重必须是 %d 个非负数且不全为 0" % len(self.buckets))
+        empty = np.diff(self.offsets) == 0
+        if np.any(weights[empty] > 0):
+            raise ValueError("空桶的权重必须为 0: %s" % [b for b, e in zip(self.buckets, empty) if e])
+        self._weights[:] = weights
+        if self._mapped_weights is not None:
+            self._mapped_weights.flush()
+
+    def sample(self, rng, bucket=None):
+        """
+        抽取一个开局编号: 先按权重选桶（或使用指定的桶），再在桶内均匀选取
+        """
+        if bucket is None:
+            # 桶只有几个，逐个累减比 numpy 的 cumsum / searchsorted 快
+            weights = self._weights.tolist()
+            u = rng.random() * sum(weights)
+            k = len(weights) - 1
+            for i, weight in enumerate(weights):
+                if u < weight:
+                    k = i
+                    break
+                u -= weight
+            while weights[k] == 0:  # 舍入误差落到末尾的空桶时，退回最后一个非空桶
+                k -= 1
+        else:
+            k = self.buckets.index(bucket)
+        start, stop = int(self.offsets[k]), int(self.offsets[k + 1])
+        if stop == start:
+            raise ValueError("桶 %s 中没有开局" % self.buckets[k])
+        return start + min(int(rng.random() * (stop - start)), stop - start - 1)
+
+    def bucket_of(self, index):
+        return self.buckets[int(np.searchsorted(self.offsets, index, side='right')) - 1]
+
+    def check_env(self, env):
+        """
+        确认开局库与环境的场地配置一致
+        """
+        for key in ('width', 'height', 'num_players', 'num_obstacles'):
+            if self.meta[key] != getattr(env, key):
+                raise ValueError("开局库的 %s=%r 与环境的 %r 不一致" % (key, self.meta[key], getattr(env, key)))
@@ -0,0 +1,393 @@
+# 分类: 环境模块
+# 描述: 定义共享内存多进程向量环境（SharedMemoryVecEnv）。每个工作进程推进 K 个环境，
+#       观测、动作、奖励和结束标志都放在 multiprocessing.shared_memory 中，主进程和工作进程只用屏障同步，
+#       每一步不经过管道、不做 pickle；环境结束时在工作进程内自动重置。
+
+import os
+import queue
+import traceback
+import multiprocessing as mp
+from functools import partial
+from multiprocessing import shared_memory
+from threading import BrokenBarrierError
+
+import numpy as np
+from gymnasium.vector import VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from envs.environment.recorder import event_mask
+
+try:
+    from gymnasium.vector import AutoresetMode
+    _SAME_STEP = AutoresetMode.SAME_STEP
+except ImportError:  # gymnasium < 1.1
+    _SAME_STEP = "SameStep"
+
+# 命令编号
+_STEP, _RESET, _CLOSE, _PROFILE = 0, 1, 2, 3
+
+
+def make_soccer_env(reward_wrapper=True, profile=False, **kwargs):
+    """
+    创建 SoccerEnv（可选包一层 DefaultRewardWrapper）；配合 functools.partial 作为可 pickle 的 env_fn
+    profile 为 True 时启用按阶段计时
+    """
+    from envs.environment.soccer_env import SoccerEnv
+    env = SoccerEnv(**kwargs)
+    if reward_wrapper:
+        from envs.environment.reward_wrapper import DefaultRewardWrapper
+        env = DefaultRewardWrapper(env)
+    if profile:
+        env.enable_profiling()
+    return env
+
+
+def _layout(num_envs, obs_dim, act_dim, num_info):
+    """
+    共享内存布局: [(名称, 形状, 类型)]
+    """
+    return [
+        ('command', (1,), np.int32),
+        ('seeds', (num_envs,), np.int64),
+        ('scenarios', (num_envs,), np.int64),
+        ('actions', (num_envs, act_dim), np.float32),
+        ('obs', (num_envs, obs_dim), np.float32),
+        ('final_obs', (num_envs, obs_dim), np.float32),
+        ('rewards', (num_envs,), np.float64),
+        ('terminated', (num_envs,), np.bool_),
+        ('truncated', (num_envs,), np.bool_),
+        ('infos', (num_envs, num_info), np.float32),
+        ('events', (num_envs,), np.uint16),
+        ('active', (num_envs,), np.bool_),
+    ]
+
+
+def _scenarios(options, num_envs):
+    """
+    reset 的 options 转为各环境的开局编号（-1 表示不指定）；只支持 "scenario"，
+    为整数时所有环境使用同一开局，也可以为每个环境给出一个（None 表示不指定）
+    """
+    options = options or {}
+    unsupported = sorted(set(options) - {'scenario'})
+    if unsupported:
+        raise ValueError("reset 的 options 只支持 scenario: %s" % unsupported)
+    scenario = options.get('scenario')
+    if scenario is None:
+        return np.full(num_envs, -1, dtype=np.int64)
+    if isinstance(scenario, (int, np.integer)):
+        return np.full(num_envs, scenario, dtype=np.int64)
+    return np.array([-1 if s is None else s for s in scenario], dtype=np.int64)
+
+
+def _reset_options(scenario):
+    """
+    开局编号（-1 表示不指定）转为单个环境 reset 的 options
+    """
+    return None if scenario < 0 else {'scenario': int(scenario)}
+
+
+def _offsets(layout):
+    """
+    各数组在共享内存中的偏移（按 8 字节对齐）和总字节数
+    """
+    offsets, offset = [], 0
+    for _, shape, dtype in layout:
+        offsets.append(offset)
+        offset += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8
+    return offsets, offset
+
+
+def _views(buffer, layout):
+    """
+    按布局在一块共享内存上建立各数组视图
+    """
+    offsets, _ = _offsets(layout)
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            for (name, shape, dtype), offset in zip(layout, offsets)}
+
+
+def _attach(name):
+    """
+    工作进程连接已有的共享内存（由主进程负责释放）
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13: 子进程与主进程共用 resource_tracker，重复登记无影响
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker(rows, env_fn, shm_name, layout, barrier, errors, profiles, cpus, info_keys):
+    """
+    工作进程: 等待主进程的命令，推进自己负责的 rows 中的环境
+    """
+    shm = None
+    try:
+        if cpus is not None and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cpus)
+        shm = _attach(shm_name)
+        buf = _views(shm.buf, layout)
+        envs = [env_fn() for _ in rows]
+        # SoccerEnv 直接把观测写入共享内存中对应的一行
+        direct = []
+        for env, row in zip(envs, rows):
+            base = env.unwrapped
+            if hasattr(base, 'set_observation_buffer'):
+                base.set_observation_buffer(buf['obs'][row])
+                direct.append(True)
+            else:
+                direct.append(False)
+
+        while True:
+            barrier.wait()
+            command = buf['command'][0]
+            if command == _CLOSE:
+                break
+            if command == _PROFILE:
+                profiles.put([getattr(env.unwrapped, 'get_profile', dict)() for env in envs])
+                barrier.wait()
+                continue
+            for env, row, writes_obs in zip(envs, rows, direct):
+                if not buf['active'][row]:
+                    continue
+                if command == _RESET:
+                    seed = int(buf['seeds'][row])
+                    obs, _ = env.reset(seed=None if seed < 0 else seed,
+                                       options=_reset_options(buf['scenarios'][row]))
+                else:
+                    obs, reward, terminated, truncated, info = env.step(buf['actions'][row])
+                    buf['rewards'][row] = reward
+                    buf['terminated'][row] = terminated
+                    buf['truncated'][row] = truncated
+                    for k, key in enumerate(info_keys):
+                        value = info.get(key, 0.0)
+                        buf['infos'][row, k] = value if isinstance(value, (bool, int, float, np.number)) else 1.0
+                    buf['events'][row] = event_mask(info)
+                    if 'final_obs' in info:
+                        # 环境已在 step 内原地自动重置，obs 是新回合的初始观测
+                        buf['final_obs'][row] = info['final_obs']
+                    elif terminated or truncated:
+                        buf['final_obs'][row] = obs
+                        obs, _ = env.reset()
+                if not writes_obs:
+                    buf['obs'][row] = obs
+            barrier.wait()
+
+        for env in envs:
+            env.close()
+    except Exception:
+        errors.put(traceback.format_exc())
+        barrier.abort()
+    finally:
+        if shm is not None:
+            shm.close()
+
+
+class SharedMemoryVecEnv(VectorEnv):
+    """
+    共享内存多进程向量环境
+    num_workers 个工作进程各推进 num_envs / num_workers 个环境；采用 same-step 自动重置，
+    结束的环境在同一步内重置，返回的是新回合的初始观测，结束时的观测放在 infos["final_obs"] 中。
+    cpu_affinity: None 不绑定；'auto' 第 i 个工作进程绑定到第 i 个可用核心；或为每个工作进程给出核心列表。
+    info_keys: 需要从各环境 info 中取出的数值/布尔键，以 (num_envs,) 数组返回在 infos 中。
+    timeout: 主进程等待工作进程的最长秒数，超时视为工作进程出错。
+    reset 的 options 只支持 "scenario"（见 _scenarios），转发给各环境的 reset。
+    """
+    metadata = {'render_modes': [], 'autoreset_mode': _SAME_STEP}
+
+    def __init__(self, env_fn, num_envs, num_workers=None, cpu_affinity=None, info_keys=(), timeout=60.0,
+                 context=None):
+        if num_workers is None:
+            num_workers = min(num_envs, os.cpu_count() or 1)
+        num_workers = max(1, min(num_workers, num_envs))
+        self.num_envs = num_envs
+        self.num_workers = num_workers
+        self.info_keys = tuple(info_keys)
+        self.timeout = timeout
+
+        # 用一个临时环境读取空间定义
+        probe = env_fn()
+        self.single_observation_space = probe.observation_space
+        self.single_action_space = probe.action_space
+        probe.close()
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        obs_dim = int(np.prod(self.single_observation_space.shape))
+        act_dim = int(np.prod(self.single_action_space.shape))
+        self._layout = _layout(num_envs, obs_dim, act_dim, len(self.info_keys))
+        _, nbytes = _offsets(self._layout)
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._buf = _views(self._shm.buf, self._layout)
+        self._buf['seeds'][:] = -1
+        self._buf['scenarios'][:] = -1
+        self._buf['active'][:] = True
+
+        ctx = mp.get_context(context)
+        self._barrier = ctx.Barrier(num_workers + 1)
+        self._errors = ctx.Queue()
+        self._profiles = ctx.Queue()
+        affinity = self._resolve_affinity(cpu_affinity, num_workers)
+        chunks = np.array_split(np.arange(num_envs), num_workers)
+        self._workers = []
+        for w, rows in enumerate(chunks):
+            process = ctx.Process(
+                target=_worker,
+                args=(rows.tolist(), env_fn, self._shm.name, self._layout, self._barrier,
+                      self._errors, self._profiles, affinity[w], self.info_keys),
+                daemon=True,
+            )
+            process.start()
+            self._workers.append(process)
+        self.closed = False
+
+    @staticmethod
+    def _resolve_affinity(cpu_affinity, num_workers):
+        if cpu_affinity is None:
+            return [None] * num_workers
+        if cpu_affinity == 'auto':
+            if hasattr(os, 'sched_getaffinity'):
+                cores = sorted(os.sched_getaffinity(0))
+            else:
+                cores = list(range(os.cpu_count() or 1))
+            return [{cores[w % len(cores)]} for w in range(num_workers)]
+        if len(cpu_affinity) != num_workers:
+            raise ValueError("cpu_affinity 需要为每个工作进程给出一组核心")
+        return [set(cores) for cores in cpu_affinity]
+
+    def _run(self, command):
+        """
+        下发命令并等待所有工作进程完成
+        """
+        self._buf['command'][0] = command
+        try:
+            self._barrier.wait(self.timeout)
+            if command != _CLOSE:
+                self._barrier.wait(self.timeout)
+        except BrokenBarrierError:
+            try:
+                message = self._errors.get(timeout=1)
+            except queue.Empty:
+                message = "工作进程无响应或异常退出"
+            self.close(terminate=True)
+            raise RuntimeError("SharedMemoryVecEnv 工作进程出错:\n" + message)
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        scenarios = self._buf['scenarios']
+        scenarios[:] = _scenarios(options, self.num_envs)
+        seeds = self._buf['seeds']
+        if seed is None:
+            seeds[:] = -1
+        elif isinstance(seed, int):
+            seeds[:] = seed + np.arange(self.num_envs)
+        else:
+            seeds[:] = [-1 if s is None else s for s in seed]
+        try:
+            self._run(_RESET)
+        finally:
+            if self._buf is not None:
+                seeds[:] = -1
+                scenarios[:] = -1
+        return self._buf['obs'].copy(), {}
+
+    def step(self, actions):
+        buf = self._buf
+        buf['actions'][:] = np.asarray(actions, dtype=np.float32).reshape(buf['actions'].shape)
+        self._run(_STEP)
+
+        terminated = buf['terminated'].copy()
+        truncated = buf['truncated'].copy()
+        infos = {}
+        for k, key in enumerate(self.info_keys):
+            infos[key] = buf['infos'][:, k].copy()
+            infos['_' + key] = np.ones(self.num_envs, dtype=bool)
+        done = terminated | truncated
+        if done.any():
+            final_obs = np.full(self.num_envs, None, dtype=object)
+            for row in np.flatnonzero(done):
+                final_obs[row] = buf['final_obs'][row].copy()
+            infos['final_obs'] = final_obs
+            infos['_final_obs'] = done
+        return buf['obs'].copy(), buf['rewards'].copy(), terminated, truncated, infos
+
+    # ------------------------------ 部分环境 ------------------------------ #
+    def reset_rows(self, rows, seeds, scenarios=None):
+        """
+        只重置 rows 中的环境（seeds、scenarios 中 -1 表示不指定种子、开局），返回这些环境的观测
+        """
+        buf = self._buf
+        buf['seeds'][rows] = seeds
+        if scenarios is not None:
+            buf['scenarios'][rows] = scenarios
+        buf['active'][:] = False
+        buf['active'][rows] = True
+        try:
+            self._run(_RESET)
+        finally:
+            if self._buf is not None:
+                buf['active'][:] = True
+                buf['seeds'][:] = -1
+                buf['scenarios'][:] = -1
+        return buf['obs'][rows].copy()
+
+    def step_rows(self, rows, actions):
+        """
+        只推进 rows 中的环境（其余环境保持不动），一次同步所有工作进程
+        返回这些环境的 (观测, 奖励, terminated, truncated, 结束时的观测, 事件位掩码)；未结束的行的结束观测无意义
+        """
+        buf = self._buf
+        buf['actions'][rows] = actions
+        buf['active'][:] = False
+        buf['active'][rows] = True
+        try:
+            self._run(_STEP)
+        finally:
+            if self._buf is not None:
+                buf['active'][:] = True
+        return (buf['obs'][rows].copy(), buf['rewards'][rows].copy(), buf['terminated'][rows].copy(),
+                buf['truncated'][rows].copy(), buf['final_obs'][rows].copy(), buf['events'][rows].copy())
+
+    def get_profile(self):
+        """
+        收集所有工作进程中各环境的阶段耗时汇总并合并（环境需已启用分析，例如 make_soccer_env(profile=True)）
+        """
+        from envs.environment.profiler import merge_profiles
+        self._run(_PROFILE)
+        summaries = []
+        for _ in range(self.num_workers):
+            summaries.extend(self._profiles.get(timeout=self.timeout))
+        return merge_profiles(summaries)
+
+    def close_extras(self, terminate=False, **kwargs):
+        if getattr(self, '_shm', None) is None:
+            return
+        if not terminate:
+            try:
+                self._run(_CLOSE)
+            except RuntimeError:
+                terminate = True
+        for process in self._workers:
+            if terminate:
+                process.terminate()
+            process.join(timeout=5)
+        self._buf = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def close(self, **kwargs):
+        if self.closed:
+            return
+        self.close_extras(**kwargs)
+        self.closed = True
+
+
+def make_soccer_vec_env(num_envs, num_workers=None, cpu_affinity=None, reward_wrapper=True, profile=False,
+                        **env_kwargs):
+    """
+    便捷构造: num_envs 个 SoccerEnv（默认带 DefaultRewardWrapper）的共享内存向量环境
+    工作进程内的环境默认开启 autoreset，回合结束时在同一次 step 内重置
+    """
+    env_kwargs.setdefault('autoreset', True)
+    env_fn = partial(make_soccer_env, reward_wrapper=reward_wrapper, profile=profile, **env_kwargs)
+    return SharedMemoryVecEnv(env_fn, num_envs, num_workers=num_workers, cpu_affinity=cpu_affinity)
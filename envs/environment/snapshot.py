@@ -0,0 +1,62 @@
+# 分类: 环境模块
+# 描述: 定义环境状态快照的扁平布局。一个快照是一维 float64 数组:
+#       [current_step, steps_without_ball, 实体表（列数 x 行数，按列存放）, 随机数生成器状态]
+#       实体表行顺序与 SoccerEnv 相同: 球、球员、障碍物。SoccerEnv 与 BatchedSoccerEnv 共用这一布局，
+#       单个环境的快照可以直接载入批量环境的每个场地。
+
+import numpy as np
+
+from envs.entities.table import EntityTable
+
+HEADER_SIZE = 2  # current_step, steps_without_ball
+# PCG64 状态: state、inc 各拆成 4 个 32 位字，加 has_uint32、uinteger（float64 可精确表示）
+RNG_STATE_SIZE = 10
+_WORDS = 4
+_MASK = 0xFFFFFFFF
+
+
+def state_size(num_players, num_obstacles):
+    """
+    快照长度
+    """
+    return HEADER_SIZE + len(EntityTable.COLUMNS) * (1 + num_players + num_obstacles) + RNG_STATE_SIZE
+
+
+def table_slice(num_players, num_obstacles):
+    """
+    快照中实体表部分的位置
+    """
+    return slice(HEADER_SIZE, HEADER_SIZE + len(EntityTable.COLUMNS) * (1 + num_players + num_obstacles))
+
+
+def pack_rng_state(generator, out):
+    """
+    把 numpy Generator（PCG64）的状态写入长度为 RNG_STATE_SIZE 的 out
+    """
+    state = generator.bit_generator.state
+    if state['bit_generator'] != 'PCG64':
+        raise ValueError("只支持 PCG64 随机数生成器: %s" % state['bit_generator'])
+    for k, key in enumerate(('state', 'inc')):
+        value = state['state'][key]
+        for w in range(_WORDS):
+            out[k * _WORDS + w] = (value >> (32 * w)) & _MASK
+    out[2 * _WORDS] = state['has_uint32']
+    out[2 * _WORDS + 1] = state['uinteger']
+
+
+def unpack_rng_state(generator, data, state=None):
+    """
+    从 pack_rng_state 写出的数据恢复 Generator 的状态
+    state 为上一次调用返回的字典时原地改写后复用，不再每次构建；返回写入生成器的状态字典
+    """
+    if state is None:
+        state = {'bit_generator': 'PCG64', 'state': {'state': 0, 'inc': 0}, 'has_uint32': 0, 'uinteger': 0}
+    # 32 位字按小端拼成 128 位整数
+    raw = np.asarray(data[:2 * _WORDS]).astype('<u4').tobytes()
+    size = 4 * _WORDS
+    state['state']['state'] = int.from_bytes(raw[:size], 'little')
+    state['state']['inc'] = int.from_bytes(raw[size:], 'little')
+    state['has_uint32'] = int(data[2 * _WORDS])
+    state['uinteger'] = int(data[2 * _WORDS + 1])
+    generator.bit_generator.state = state
+    return state
@@ -1,27 +1,41 @@
 # 分类: 环境模块
 # 描述: 定义强化学习环境（SoccerEnv），包括状态空间、动作空间
 
-import sys
 import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-
-import random
-import pygame
+import time
 import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
 from envs.entities.ball import Ball
 from envs.entities.player import Player
 from envs.entities.obstacle import Obstacle
-from envs.physics.collision import collide_rect_rect, collide_rect_circle
-from envs.physics.response import handle_collision
-from envs.physics.utils import draw_field, is_goal
+from envs.entities.table import EntityTable
+from envs.physics.collision import collide_rects, collide_rects_circle, sweep_circle_rects
+from envs.physics.pose import PoseCache
+from envs.physics.broadphase import SpatialHash, aabb_arrays, brute_force_pairs
+from envs.physics.backends import make_backend
+from envs.physics.utils import GOAL_DEPTH, GOAL_HEIGHT, is_goal, goal_crossing
+from envs.environment import snapshot
+from envs.environment.scenarios import STATE_COLUMNS, ScenarioBank
+from envs.environment.behaviours import ObstacleBehaviours
+
+
+def _circles_overlap(dx, dy, reach):
+    """
+    中心距离 (dx, dy) 是否不超过 reach（两者外接圆半径之和）加 1 像素余量: 为 False 的配对不可能相撞，
+    不必做精确检测
+    """
+    reach = reach + 1.0
+    return dx * dx + dy * dy <= reach * reach
 
 
 class SoccerEnv(gym.Env):
     metadata = {'render.modes': ['human', 'rgb_array']}
 
-    def __init__(self, width=800, height=600, num_players=1, num_obstacles=0, max_steps=10000):
+    def __init__(self, width=800, height=600, num_players=1, num_obstacles=0, max_steps=10000,
+                 broad_phase='auto', check_broad_phase=False, render_scale=1.0,
+                 dt=0.1, frame_skip=1, substeps=1, ccd=False, ccd_iterations=4, physics_backend='numpy',
+                 autoreset=False, scenario_bank=None, obstacle_behaviours=None):
         super(SoccerEnv, self).__init__()
 
         # 训练参数
@@ -30,11 +44,31 @@ class SoccerEnv(gym.Env):
         self.steps_without_ball = 0  # 未触球步数计数器
         self.max_steps_without_ball = 5  # 最大允许未触球步数
 
+        # 时间步长: 每个动作持续 frame_skip 个物理 tick（每个 tick 时长 dt），
+        # 每个 tick 再分成 substeps 个积分子步；观测、info 和奖励每个动作只计算一次
+        if frame_skip < 1 or substeps < 1:
+            raise ValueError("frame_skip 和 substeps 必须为正整数")
+        self.dt = dt
+        self.frame_skip = int(frame_skip)
+        self.substeps = int(substeps)
+        # 球的连续碰撞检测: 开启后每个子步沿球的位移扫掠，避免大步长时球穿过球员、障碍物或越过球门线而未被检测到
+        self.ccd = ccd
+        self.ccd_iterations = ccd_iterations
+        # 物理后端: 'numpy' 参考实现，'numba' 编译内核（numba 不可用时退回 numpy），'auto' 有 numba 时使用
+        self.physics = make_backend(physics_backend)
+
         self.width = width
         self.height = height
         self.num_players = num_players
         self.num_obstacles = num_obstacles
 
+        # 碰撞粗检测: True 使用空间哈希，False 暴力检测，'auto' 在矩形数量较多时启用
+        # check_broad_phase 为 True 时每步与暴力检测结果对比
+        self.broad_phase = broad_phase
+        self.broad_phase_threshold = 64
+        self.check_broad_phase = check_broad_phase
+        self._spatial_hash = SpatialHash(cell_size=64.0)
+
         # 球门位置
         self.left_goal = (0, self.height // 2)
         self.right_goal = (self.width, self.height // 2)
@@ -62,13 +96,47 @@ class SoccerEnv(gym.Env):
             shape=(player_obs + ball_obs + obstacle_obs,),
             dtype=np.float32
         )
+        # 观测缓冲区和归一化尺度只计算一次
+        self._obs_buffer = np.zeros(self.observation_space.shape, dtype=np.float32)
+        self._obs_out = None
+        self._obs_views = self._observation_views(self._obs_buffer)  # 当前输出缓冲区各部分的视图
+        self._position_scale = np.array([self.width, self.height], dtype=np.float64)
 
         # 初始化Pygame
         self.screen = None
         self.clock = None
         self.isopen = True
-
-        # 初始化实体
+        self.render_scale = render_scale  # rgb_array 渲染分辨率相对球场尺寸的比例
+        self._window = None
+        self._offscreen = None
+
+        # 性能分析器，enable_profiling 启用
+        self.profiler = None
+        # set_state 恢复随机数生成器时复用的状态字典
+        self._rng_state = None
+
+        # 自动重置: 回合结束时在同一次 step 内原地重置，结束时的观测放在 info["final_obs"]，返回新回合的初始观测；
+        # defer_autoreset 为 True 时由外层包装器在读取结束状态后调用 apply_autoreset
+        self.autoreset = autoreset
+        self.defer_autoreset = False
+
+        # 障碍物行为表（见 behaviours.parse_spec），例如 ["keeper", "zone", "zone", "mark"]；
+        # None 时所有障碍物使用原有的 block 规则
+        self.obstacle_behaviours = obstacle_behaviours
+
+        # 开局状态库（目录路径或 ScenarioBank）: 设置后每次 reset 按权重从库中抽取开局，
+        # reset(options=...) 可指定 "scenario"（开局编号）、"bucket"（桶名）或 "bucket_weights"（重新设置权重）
+        if isinstance(scenario_bank, (str, os.PathLike)):
+            scenario_bank = ScenarioBank(scenario_bank)
+        if scenario_bank is not None:
+            scenario_bank.check_env(self)
+        self.scenario_bank = scenario_bank
+        # 开局保存的列在实体表中是连续的几行
+        first = EntityTable.INDEX[STATE_COLUMNS[0]]
+        self._scenario_columns = slice(first, first + len(STATE_COLUMNS))
+
+        # 初始化实体（第一次 reset 时创建，之后原地重置）
+        self.entities = None
         self.reset()
 
     def reset(self, seed=None, options=None):
@@ -76,22 +144,104 @@ class SoccerEnv(gym.Env):
         self.current_step = 0
         self.steps_without_ball = 0
 
-        # 创建足球
-        self.ball = Ball(self.width // 2, self.height // 2)
+        if self.entities is None:
+            self._build_entities()
+        else:
+            # 原地重置: 实体表恢复为初始布局，实体对象、位姿缓存和各种预先算好的数组都复用
+            np.copyto(self.entities.data[:, :self.entities.size], self._initial_table)
 
-        # 创建球员
-        self.players = [Player(100 + i * 100, self.height // 2) for i in range(self.num_players)]
+        info = {}
+        scenario = self._select_scenario(options)
+        if scenario is not None:
+            self._apply_scenario(scenario)
+            info = {"scenario": scenario, "bucket": self.scenario_bank.bucket_of(scenario)}
+        # 位姿缓存在下次读取时再整体更新
+        self.pose.mark_stale()
+
+        self._record_step_results(0, False, {})
+        return self._get_observation(), info
+
+    def _select_scenario(self, options):
+        """
+        按 reset 的 options 选出开局编号；没有开局库时返回 None（使用默认布局）
+        """
+        options = options or {}
+        bank = self.scenario_bank
+        if bank is None:
+            if options and any(key in options for key in ("scenario", "bucket", "bucket_weights")):
+                raise ValueError("未设置开局状态库（scenario_bank）")
+            return None
+        if options.get("bucket_weights") is not None:
+            bank.set_weights(options["bucket_weights"])
+        if options.get("scenario") is not None:
+            scenario = int(options["scenario"])
+            if not 0 <= scenario < len(bank):
+                raise IndexError("开局编号 %d 超出范围 [0, %d)" % (scenario, len(bank)))
+            return scenario
+        return bank.sample(self.np_random, options.get("bucket"))
+
+    def _apply_scenario(self, scenario):
+        """
+        把开局写入实体表（默认布局之上覆盖位置、朝向和速度），球员的上一步速度、朝向与开局相同；
+        之后由 reset 更新位姿缓存
+        """
+        d = self.entities.data
+        n = self.entities.size
+        d[self._scenario_columns, :n] = self.scenario_bank.states[scenario].T
+        rows = self._player_rows
+        index = EntityTable.INDEX
+        d[index['prev_vx'], rows] = d[index['vx'], rows]
+        d[index['prev_vy'], rows] = d[index['vy'], rows]
+        d[index['prev_angle'], rows] = d[index['angle'], rows]
+
+    def _build_entities(self):
+        """
+        创建实体表和实体对象，并保存初始布局供之后的 reset 原地恢复
+        """
+        # 实体表: 第0行为球，随后依次为球员和障碍物
+        self.entities = EntityTable(1 + self.num_players + self.num_obstacles)
+        self._ball_rows = slice(0, 1)
+        self._player_rows = slice(1, 1 + self.num_players)
+        self._moving_rows = slice(0, 1 + self.num_players)
+        self._obstacle_rows = slice(1 + self.num_players, 1 + self.num_players + self.num_obstacles)
 
-        # 创建障碍物
-        self.obstacles = [Obstacle(500 + i * 50, self.height // 2) for i in range(self.num_obstacles)]
+        # 创建足球
+        self.ball = Ball(self.width // 2, self.height // 2, table=self.entities)
 
-        # 状态初始化
+        # 创建球员
+        self.players = [Player(100 + i * 100, self.height // 2, table=self.entities)
+                        for i in range(self.num_players)]
+
+        # 创建障碍物（使用行为表时开局放在各自行为的锚点上）
+        self.obstacles = [Obstacle(500 + i * 50, self.height // 2, table=self.entities)
+                          for i in range(self.num_obstacles)]
+        self.behaviours = None
+        if self.obstacle_behaviours is not None:
+            self.behaviours = ObstacleBehaviours(self.obstacle_behaviours, self.width, self.height,
+                                                 self.num_players, self._obstacle_rows, self.entities)
+            self.behaviours.apply_speeds(self.entities, self._obstacle_rows)
+            self.behaviours.place(self.entities, self.ball.x, self.ball.y, *self.right_goal)
+
+        # 状态初始化（prev_vx / prev_vy 在实体表中已为0）
         for player in self.players:
-            player.prev_vx = 0
-            player.prev_vy = 0
             player.prev_angle = player.angle
+        self._max_speed = np.array([player.max_speed for player in self.players], dtype=np.float32)
+        self._perception_range = np.array([player.perception_range for player in self.players], dtype=np.float64)
+
+        # 位姿缓存: 每步积分后更新一次
+        self.pose = PoseCache(self.entities)
 
-        return self._get_observation(), {}
+        # 球员观测的归一化尺度: [宽, 高, 360, 最大速度, 最大速度, 180, 1]
+        self._player_obs_scale = np.array(
+            [[self.width, self.height, 360.0, player.max_speed, player.max_speed, 180.0, 1.0]
+             for player in self.players], dtype=np.float64).reshape(self.num_players, 7)
+
+        # 不使用粗检测时的候选配对只与实体数有关: 预先去掉障碍物之间的配对
+        i, j = brute_force_pairs(self.num_players + self.num_obstacles)
+        keep = i < self.num_players
+        self._static_pairs = (i[keep], j[keep])
+
+        self._initial_table = self.entities.data[:, :self.entities.size].copy()
 
     def step(self, action):
         self.current_step += 1
@@ -99,48 +249,21 @@ class SoccerEnv(gym.Env):
         truncated = False
         info = {}
 
-        # 检查是否达到最大步数
+        # 检查是否达到最大步数（截断的一步不推进物理，记为 0 个 tick）
         if self.current_step >= self.max_steps:
             truncated = True
-            return self._get_observation(), 0, terminated, truncated, info
-
-        # 解析动作
-        for i, player in enumerate(self.players):
-            start_idx = i * self.action_num
-            end_idx = start_idx + self.action_num
-            player_action = action[start_idx:end_idx]
-            forward_speed = player_action[0] * player.max_speed
-            lateral_speed = player_action[1] * player.max_speed
-            angular_vel = player_action[2] * 180  # 最大180度/秒
-
-            # 计算球员的速度向量
-            angle_rad = np.radians(player.angle)
-            player.vx = np.cos(angle_rad) * forward_speed - np.sin(angle_rad) * lateral_speed
-            player.vy = np.sin(angle_rad) * forward_speed + np.cos(angle_rad) * lateral_speed
-            player.angular_velocity = angular_vel
-
-            # 更新球员是否能看到球
-            player.can_perceive_ball(self.ball)
-
-        # 更新障碍物
-        for obstacle in self.obstacles:
-            obstacle.move_towards_ball(self.ball, self.right_goal)
-
-        dt = 0.1 # 时间步长，没什么好调的
-        # 更新所有实体位置
-        for player in self.players:
-            player.update(dt)
-        for obstacle in self.obstacles:
-            obstacle.update(dt)
-        self.ball.update(dt)
-
-        # 碰撞处理
-        collisions = self._handle_collisions()
+            self._record_step_results(0, False, {}, 0)
+            return self._finish_step(self._get_observation(), 0, terminated, truncated, info)
+
+        # 同一个动作推进 frame_skip * substeps 个子步；碰撞、出界事件在各子步间累积，
+        # 进球或球出界时立即停止
+        dt = self.dt / self.substeps
+        num_substeps = self.frame_skip * self.substeps
+        collisions, boundary_info, goal, game_reset, substep = self._advance(action, dt, num_substeps)
+        ticks = -(-(substep + 1) // self.substeps)
         if collisions:
             info.update(collisions)
 
-        # 检查进球
-        goal = is_goal(self.ball, self.width-50+self.ball.radius, self.height)
         if goal == -1:
             terminated = True
             info["goal"] = "left"
@@ -149,71 +272,390 @@ class SoccerEnv(gym.Env):
             info["goal"] = "right"
 
         # 边界检查
-        boundary_reward, game_reset, boundary_info = self._check_boundaries()
-        info = {}
-        info.update(boundary_info)  
+        info.update(boundary_info)
         if game_reset:
             terminated = True
 
-        return self._get_observation(), 0.0, terminated, truncated, info
+        self._record_step_results(goal, game_reset, collisions, ticks)
+        return self._finish_step(self._get_observation(), 0.0, terminated, truncated, info)
+
+    def _advance(self, action, dt, num_substeps):
+        """
+        用同一个动作推进 num_substeps 个子步
+        返回 (碰撞 info, 出界 info, 进球结果, 是否球出界, 最后一个子步的编号)
+        """
+        collisions, boundary_info = {}, {}
+        goal, game_reset = 0, False
+        for substep in range(num_substeps):
+            # 解析动作，更新球员是否能看到球
+            self._apply_actions(action)
+            self._perceive_ball()
+
+            # 更新障碍物
+            self._steer_obstacles()
+            if self.ccd:
+                ball_start = (self.ball.x, self.ball.y)
+            self._integrate(dt)
+            if self.ccd:
+                collisions.update(self._sweep_ball(dt, *ball_start))
+
+            # 碰撞处理
+            collisions.update(self._handle_collisions())
+
+            # 检查进球和边界
+            goal = self._check_goal()
+            _, game_reset, substep_info = self._check_boundaries()
+            boundary_info.update(substep_info)
+            if goal != 0 or game_reset:
+                break
+        return collisions, boundary_info, goal, game_reset, substep
+
+    def _finish_step(self, obs, reward, terminated, truncated, info):
+        if self.autoreset and (terminated or truncated) and not self.defer_autoreset:
+            obs, info = self.apply_autoreset(obs, info)
+        return obs, reward, terminated, truncated, info
+
+    def apply_autoreset(self, obs, info):
+        """
+        同一步内自动重置: 结束时的观测放入 info["final_obs"]（info 其余内容仍是结束这一步的），
+        原地重置后返回 (新回合的初始观测, info)
+        """
+        info = dict(info)
+        info["final_obs"] = obs.copy() if obs is self._obs_out else obs
+        obs, _ = self.reset()
+        return obs, info
+
+    def _apply_actions(self, action):
+        """
+        把动作解析为球员的速度和角速度（所有球员一次计算，朝向取自位姿缓存）
+        """
+        p = self.num_players
+        # 每列一个球员: [前后速度, 左右速度, 自转速度]
+        player_action = np.asarray(action)[:p * self.action_num].reshape(p, self.action_num).T
+        speed = player_action[:2] * self._max_speed
+
+        # 计算球员的速度向量，实体表第3-5列为 vx, vy, angular_velocity:
+        # (vx, vy) = (cos, sin) * 前后速度 + (-sin, cos) * 左右速度
+        rows = self._player_rows
+        frame = self.pose.frames(rows)
+        d = self.entities.data
+        d[3:5, rows] = frame[1:3] * speed[0] + frame[0:2] * speed[1]
+        d[5, rows] = player_action[2] * 180  # 最大180度/秒
+
+    def _perceive_ball(self):
+        """
+        更新球员是否能看到球（与 Player.can_perceive_ball 相同，所有球员一次计算）
+        """
+        rows = self._player_rows
+        d = self.entities.data
+        # 球员指向球的向量，形状 (2, 球员数)；球的位置直接取实体表第0行
+        to_ball = d[0:2, 0:1] - self.pose.positions(rows)
+        frame = self.pose.frames(rows)
+        square = to_ball * to_ball
+        dist = np.sqrt(square[0] + square[1])
+        heading = frame[1:3] * to_ball
+        # 实体表第6列为 can_see_ball
+        d[6, rows] = (heading[0] + heading[1] > 0) & (dist < self._perception_range)
+
+    def _steer_obstacles(self):
+        if not self.num_obstacles:
+            return
+        if self.behaviours is not None:
+            self.behaviours.set_targets(self.entities, self.ball.x, self.ball.y, *self.right_goal)
+            return
+        self.physics.set_obstacle_targets(self.entities, self._obstacle_rows, self.ball.x, self.ball.y,
+                                          *self.right_goal)
+
+    def _integrate(self, dt):
+        """
+        更新所有实体位置: 球和球员一次积分，球施加摩擦，障碍物向目标点移动
+        """
+        # 摩擦按 tick 定义，分子步时每个子步取其 substeps 次方根
+        friction = self.ball.friction if self.substeps == 1 else self.ball.friction ** (1.0 / self.substeps)
+        self.physics.advance(self.entities, dt, friction, self._moving_rows, self._ball_rows, self._obstacle_rows)
+        self.pose.update_motion()
+
+    def _sweep_ball(self, dt, x0, y0):
+        """
+        连续碰撞检测: 沿球在本子步内从 (x0, y0) 起的位移扫掠，找到最早接触的球员/障碍物或球门线；
+        碰到矩形时把球移到接触点做碰撞响应，再按新速度用剩余时间继续扫掠（最多 ccd_iterations 次）；
+        越过球门线时把球停在球门线上，由 _check_goal 判定进球
+        矩形按积分后的位置视为静止；起始时已经接触的矩形留给离散检测处理
+        """
+        info = {}
+        ball = self.ball
+        num_boxes = self.num_players + self.num_obstacles
+        rows = slice(1, 1 + num_boxes)
+        all_boxes = self.players + self.obstacles
+        goal_width = self.width - GOAL_DEPTH + ball.radius  # 与 _check_goal 相同的判定线
+        x0, y0 = float(x0), float(y0)
+        dx, dy = float(ball.x) - x0, float(ball.y) - y0
+        remaining = 1.0
+        for _ in range(self.ccd_iterations):
+            if dx == 0 and dy == 0:
+                break
+            toi, _ = sweep_circle_rects(*self.pose.boxes(rows), x0, y0, dx, dy, ball.radius,
+                                        heading=self.pose.heading(rows))
+            k = int(np.argmin(toi)) if num_boxes else -1
+            t = toi[k] if num_boxes else np.inf
+            goal_t, line, _ = goal_crossing(x0, y0, dx, dy, ball.radius, goal_width, self.height)
+            if goal_t <= t:
+                if np.isfinite(goal_t):
+                    goal_y = (self.height - GOAL_HEIGHT) // 2
+                    ball.x, ball.y = line, min(max(y0 + goal_t * dy, goal_y), goal_y + GOAL_HEIGHT)
+                    self.pose.invalidate(ball.id)
+                break
+            if not np.isfinite(t):
+                break
+            ball.x, ball.y = x0 + t * dx, y0 + t * dy
+            self.pose.invalidate(ball.id)
+            self.physics.ball_response(ball, all_boxes[k], self.pose)
+            info["ball_touch" if k < self.num_players else "ball_hit_obstacle"] = True
+            # 剩余时间沿碰撞后的速度继续运动
+            x0, y0 = float(ball.x), float(ball.y)
+            remaining *= 1.0 - t
+            dx, dy = ball.vx * dt * remaining, ball.vy * dt * remaining
+            ball.x, ball.y = x0 + dx, y0 + dy
+        return info
 
-    def _get_observation(self):
-        obs = []
-        for player in self.players:
-            obs.extend([
-                player.x / self.width,
-                player.y / self.height,
-                player.angle / 360.0,
-                player.vx / player.max_speed,
-                player.vy / player.max_speed,
-                player.angular_velocity / 180.0,
-                float(player.can_see_ball)
-            ])
-        obs.extend([
-            self.ball.x / self.width,
-            self.ball.y / self.height,
-            self.ball.vx / 300.0,
-            self.ball.vy / 300.0
-        ])
-        for obstacle in self.obstacles:
-            obs.extend([
-                obstacle.x / self.width,
-                obstacle.y / self.height
-            ])
-        return np.array(obs, dtype=np.float32)
+    def _check_goal(self):
+        return is_goal(self.ball, self.width - GOAL_DEPTH + self.ball.radius, self.height)
+
+    # ------------------------------ 状态快照 ------------------------------ #
+    @property
+    def state_size(self):
+        return snapshot.state_size(self.num_players, self.num_obstacles)
+
+    def get_state(self, out=None):
+        """
+        把球、球员、障碍物的全部状态、步数计数器和随机数生成器状态打包成一维 float64 数组
+        out 不为 None 时直接写入 out（长度为 state_size），不分配内存
+        """
+        if out is None:
+            out = np.empty(self.state_size)
+        table = snapshot.table_slice(self.num_players, self.num_obstacles)
+        out[0] = self.current_step
+        out[1] = self.steps_without_ball
+        n = self.entities.size
+        np.copyto(out[table].reshape(-1, n), self.entities.data[:, :n])
+        snapshot.pack_rng_state(self.np_random, out[table.stop:])
+        return out
+
+    def set_state(self, state, out=None):
+        """
+        原地恢复 get_state 得到的快照（环境配置需相同），返回恢复后的观测
+        实体表、随机数状态和位姿缓存都写回已有的缓冲区；out 不为 None 时观测直接写入 out（与 _get_observation 相同），不复制
+        """
+        if len(state) != self.state_size:
+            raise ValueError("快照长度不匹配: %d != %d" % (len(state), self.state_size))
+        table = snapshot.table_slice(self.num_players, self.num_obstacles)
+        self.current_step = int(state[0])
+        self.steps_without_ball = int(state[1])
+        n = self.entities.size
+        np.copyto(self.entities.data[:, :n], np.reshape(state[table], (-1, n)), casting='same_kind')
+        self._rng_state = snapshot.unpack_rng_state(self.np_random, state[table.stop:], self._rng_state)
+        # 位姿缓存在下次读取时再整体更新
+        self.pose.mark_stale()
+        self._record_step_results(0, False, {})
+        return self._get_observation(out)
+
+    # ------------------------------ 性能分析 ------------------------------ #
+    # (阶段名, 方法名): 启用分析时这些方法被替换为计时版本
+    PROFILE_PHASES = (
+        ('actions', '_apply_actions'),
+        ('perception', '_perceive_ball'),
+        ('obstacles', '_steer_obstacles'),
+        ('integrate', '_integrate'),
+        ('ccd', '_sweep_ball'),
+        ('collisions', '_handle_collisions'),
+        ('goal', '_check_goal'),
+        ('boundaries', '_check_boundaries'),
+        ('observation', '_get_observation'),
+    )
+
+    def enable_profiling(self, report_every=None):
+        """
+        启用按阶段计时，返回分析器；report_every 不为 None 时每隔这么多步在 info["profile"] 中给出汇总并清零
+        计时代码只在启用时挂到实例上，未启用时 step 没有任何额外开销
+        """
+        from envs.environment.profiler import StepProfiler
+        if self.profiler is None:
+            self.profiler = StepProfiler(report_every)
+            for phase, method in self.PROFILE_PHASES:
+                setattr(self, method, self.profiler.wrap(phase, getattr(self, method)))
+            self.step = self._profiled_step
+        return self.profiler
+
+    def disable_profiling(self):
+        if self.profiler is None:
+            return
+        for _, method in self.PROFILE_PHASES:
+            del self.__dict__[method]
+        del self.__dict__['step']
+        self.profiler = None
+
+    def get_profile(self):
+        """
+        返回当前的阶段耗时汇总（未启用时为空字典），可用 merge_profiles 跨环境合并
+        """
+        return self.profiler.summary() if self.profiler is not None else {}
+
+    def _profiled_step(self, action):
+        profiler = self.profiler
+        start = time.perf_counter_ns()
+        obs, reward, terminated, truncated, info = type(self).step(self, action)
+        profiler.totals['step'] += time.perf_counter_ns() - start
+        profiler.calls['step'] += 1
+        if not profiler.outer_tick:
+            summary = profiler.tick()
+            if summary is not None:
+                info["profile"] = summary
+        return obs, reward, terminated, truncated, info
+
+    def _record_step_results(self, goal, ball_out, contacts, ticks=1):
+        """
+        记录本步的进球、出界和碰撞结果，以及本步实际推进的物理 tick 数，供奖励包装器直接读取，不必重新计算
+        """
+        self.last_goal = goal
+        self.last_ball_out = ball_out
+        self.last_contacts = contacts
+        self.last_ticks = ticks
+
+    def _get_observation(self, out=None):
+        """
+        把观测写入预分配的缓冲区（或调用方提供的 C 连续的 out）并返回
+        各部分直接从实体表的连续列切片按预先算好的尺度向量归一化，不构建中间列表
+        """
+        if out is None:
+            out = self._obs_out if self._obs_out is not None else self._obs_buffer
+            players, ball_xy, ball_v, obstacles = self._obs_views
+        else:
+            players, ball_xy, ball_v, obstacles = self._observation_views(out)
+        d = self.entities.data
+        # 球员: [x, y, angle, vx, vy, angular_velocity, can_see_ball]
+        np.divide(d[0:7, self._player_rows].T, self._player_obs_scale, out=players)
+        # 球: [x, y, vx, vy]
+        np.divide(d[0:2, 0], self._position_scale, out=ball_xy)
+        np.divide(d[3:5, 0], 300.0, out=ball_v)
+        # 障碍物: [x, y]
+        if self.num_obstacles:
+            np.divide(d[0:2, self._obstacle_rows].T, self._position_scale, out=obstacles)
+        if out is self._obs_buffer:
+            return out.copy()
+        return out
+
+    def _observation_views(self, out):
+        """
+        观测向量中球员 (球员数, 7)、球位置、球速度、障碍物 (障碍物数, 2) 四部分的视图
+        """
+        ball = 7 * self.num_players
+        return (out[:ball].reshape(self.num_players, 7), out[ball:ball + 2], out[ball + 2:ball + 4],
+                out[ball + 4:].reshape(self.num_obstacles, 2))
+
+    def set_observation_buffer(self, out):
+        """
+        让之后的观测直接写入 out（例如向量环境共享缓冲区的一行）并原样返回，不再复制；
+        传入 None 恢复默认: 写入内部缓冲区并返回副本
+        out 必须是 C 连续的（各部分按 reshape 得到的视图写入，不连续时 reshape 会静默复制，写入丢失）
+        """
+        if out is not None:
+            if out.shape != self.observation_space.shape or out.dtype != np.float32:
+                raise ValueError("观测缓冲区形状或类型不匹配: %s %s" % (out.shape, out.dtype))
+            if not out.flags.c_contiguous:
+                raise ValueError("观测缓冲区必须是 C 连续的数组")
+        self._obs_out = out
+        self._obs_views = self._observation_views(out if out is not None else self._obs_buffer)
 
     def _handle_collisions(self):
         info = {}
-        # 球员与障碍物
-        for i, player1 in enumerate(self.players):
-            for obstacle in self.obstacles:
-                if collide_rect_rect(player1, obstacle):
-                    r = random.random()
-                    if r < 0.5:
-                        player1.vx *= 0.5
-                        player1.vy *= 0.5
-                    else:
-                        player1.vx *= -0.05
-                        player1.vy *= -0.05
-                    info["collision_obstacle"] = True
-            # 球员与球员
-            for j, player2 in enumerate(self.players[i + 1:], i + 1):
-                if collide_rect_rect(player1, player2):
-                    player1.vx = 0
-                    player1.vy = 0
-                    info["collision_teammate"] = True
-        # 球与球员
-        for player in self.players:
-            if collide_rect_circle(player, self.ball):
-                handle_collision(self.ball, player)
-                info["ball_touch"] = True
-        # 球与障碍物
-        for obstacle in self.obstacles:
-            if collide_rect_circle(obstacle, self.ball):
-                handle_collision(self.ball, obstacle)
-                info["ball_hit_obstacle"] = True
+        num_boxes = self.num_players + self.num_obstacles
+        # 球员和障碍物在实体表中相邻（第1行起），统一作为矩形处理: 编号 < num_players 的是球员
+        rows = slice(1, 1 + num_boxes)
+        boxes = self.pose.boxes(rows)
+        cos, sin = self.pose.heading(rows)
+        use_broad_phase = (self.broad_phase is True or
+                           (self.broad_phase == 'auto' and num_boxes >= self.broad_phase_threshold))
+
+        # 粗检测: 候选配对（去掉障碍物之间的配对）；不用空间哈希时按外接圆筛掉离得远的配对
+        x, y = boxes[0], boxes[1]
+        radius = self.pose.radius[rows]
+        if use_broad_phase:
+            self._spatial_hash.build(*aabb_arrays(*boxes))
+            i, j = self._spatial_hash.pairs()
+            keep = i < self.num_players
+            i, j = i[keep], j[keep]
+        else:
+            i, j = self._static_pairs
+            if len(i):
+                near = _circles_overlap(x[i] - x[j], y[i] - y[j], radius[i] + radius[j])
+                i, j = i[near], j[near]
+
+        # 精确检测: 一次求出所有候选配对（没有候选配对时跳过）
+        if len(i):
+            hit, _, _ = collide_rects(*(b[i] for b in boxes), *(b[j] for b in boxes), with_contact=False,
+                                      heading1=(cos[i], sin[i]), heading2=(cos[j], sin[j]))
+            i, j = i[hit], j[hit]
+        if self.check_broad_phase:
+            self._check_broad_phase(boxes, i, j)
+
+        # 球员与障碍物: 按球员、障碍物的顺序依次处理
+        for k in i[j >= self.num_players]:
+            player1 = self.players[k]
+            r = self.np_random.random()
+            if r < 0.5:
+                player1.vx *= 0.5
+                player1.vy *= 0.5
+            else:
+                player1.vx *= -0.05
+                player1.vy *= -0.05
+            info["collision_obstacle"] = True
+        # 球员与球员: 与编号更大的球员相撞时停下
+        stopped = i[j < self.num_players]
+        if len(stopped):
+            self.entities.vx[1 + stopped] = 0
+            self.entities.vy[1 + stopped] = 0
+            info["collision_teammate"] = True
+
+        # 球与球员、障碍物: 每次碰撞响应会移动球，因此只对其后的矩形重新检测
+        all_boxes = self.players + self.obstacles
+        reach = radius + self.ball.radius
+        start = 0
+        while start < num_boxes:
+            if use_broad_phase:
+                r = self.ball.radius
+                candidates = self._spatial_hash.query(self.ball.x - r, self.ball.y - r,
+                                                      self.ball.x + r, self.ball.y + r)
+                candidates = candidates[candidates >= start]
+            else:
+                near = _circles_overlap(x[start:] - self.ball.x, y[start:] - self.ball.y, reach[start:])
+                candidates = start + near.nonzero()[0]
+                if len(candidates) == 0:
+                    break
+            hit, _, _ = collide_rects_circle(*(b[candidates] for b in boxes),
+                                             self.ball.x, self.ball.y, self.ball.radius, with_contact=False,
+                                             heading=(cos[candidates], sin[candidates]))
+            hits = candidates[hit]
+            if len(hits) == 0:
+                break
+            k = hits[0]
+            self.physics.ball_response(self.ball, all_boxes[k], self.pose)
+            info["ball_touch" if k < self.num_players else "ball_hit_obstacle"] = True
+            start = k + 1
         return info
 
+    def _check_broad_phase(self, boxes, i, j):
+        """
+        与暴力检测对比碰撞配对，不一致时报错（调试用）
+        """
+        bi, bj = brute_force_pairs(self.num_players + self.num_obstacles)
+        keep = bi < self.num_players
+        bi, bj = bi[keep], bj[keep]
+        hit, _, _ = collide_rects(*(b[bi] for b in boxes), *(b[bj] for b in boxes),
+                                  with_contact=False)
+        if not (np.array_equal(bi[hit], i) and np.array_equal(bj[hit], j)):
+            raise AssertionError("粗检测结果与暴力检测不一致: %s vs %s" %
+                                 (list(zip(i, j)), list(zip(bi[hit], bj[hit]))))
+
 # soccer_env.py 中
 
     def _check_boundaries(self):
@@ -222,66 +664,57 @@ class SoccerEnv(gym.Env):
         game_reset = False
         info = {}
 
+        ball_out, player_out = self.physics.boundaries(self.entities, self.ball.id, self.ball.radius,
+                                                       self._player_rows, self.width, self.height)
         # 球出界
-        if (self.ball.x - self.ball.radius < 0 or
-            self.ball.x + self.ball.radius > self.width or
-            self.ball.y - self.ball.radius < 0 or
-            self.ball.y + self.ball.radius > self.height):
+        if ball_out:
             reward = -5.0
             game_reset = True
             info["ball_out"] = True
 
-        # 球员出界
-        boundary_margin = 30
-        for player in self.players:
-            half_w = player.width / 2
-            half_h = player.height / 2
-            if (player.x - half_w < -boundary_margin or 
-                player.x + half_w > self.width + boundary_margin or
-                player.y - half_h < -boundary_margin or 
-                player.y + half_h > self.height + boundary_margin):
-                info["player_out"] = True
+        # 球员出界（超出边界 30 像素）
+        if player_out:
+            info["player_out"] = True
 
         return reward, game_reset, info
 
     def render(self, mode='human'):
         """渲染环境"""
+        # pygame 和渲染器只在第一次渲染时加载，不渲染的训练进程不需要它们
+        import pygame
+        from envs.environment.rendering import SceneRenderer
+
+        if mode == 'rgb_array':
+            # 离屏渲染: 不创建窗口，可按 render_scale 缩小分辨率
+            if self._offscreen is None:
+                self._offscreen = SceneRenderer(self.width, self.height, scale=self.render_scale)
+            self._offscreen.draw(self)
+            return self._offscreen.rgb_array()
+
         if self.screen is None:
             pygame.init()
             pygame.display.init()
             self.screen = pygame.display.set_mode((self.width, self.height))
             pygame.display.set_caption('Soccer RL Environment')
+            self._window = SceneRenderer(self.width, self.height, surface=self.screen)
 
         if self.clock is None:
             self.clock = pygame.time.Clock()
 
-        # 绘制足球场
-        draw_field(self.screen, self.width, self.height)
-
-        # 绘制球
-        self.ball.draw(self.screen)
-
-        # 绘制障碍物
-        for obstacle in self.obstacles:
-            obstacle.draw(self.screen)
-
-        # 绘制球员
-        for player in self.players:
-            player.draw(self.screen)
+        # 绘制足球场（预渲染图层）、球、障碍物和球员
+        self._window.draw(self)
 
         if mode == 'human':
             pygame.display.flip()
             self.clock.tick(30)
             return None
-        elif mode == 'rgb_array':
-            return np.transpose(
-                np.array(pygame.surfarray.pixels3d(self.screen)),
-                axes=(1, 0, 2)
-            )
 
     def close(self):
         """关闭环境"""
         if self.screen is not None:
+            import pygame
             pygame.display.quit()
             pygame.quit()
+            self.screen = None
+            self._window = None
             self.isopen = False
\ No newline at end of file
@@ -0,0 +1,256 @@
+# 分类: 环境模块
+# 描述: 定义与模拟解耦的实时查看器。模拟进程每步（按 max_rate 限频）把紧凑的状态快照（各实体的 x、y、angle、
+#       时间戳和回合编号）写入共享内存中的环形缓冲区（StateRing），写入不加锁、从不等待查看器；
+#       查看器在独立进程中按自己的帧率读取最新的快照，在相邻两个快照之间插值后绘制，跟不上时直接丢帧。
+#       环形缓冲区的每个槽位带一个序号（seqlock）: 写入前后各加一，读取前后序号不同或为奇数即说明读到了
+#       正在写入的槽位，丢弃该快照即可。观看训练不会拖慢模拟。
+
+import collections
+import multiprocessing as mp
+import time
+
+import gymnasium as gym
+import numpy as np
+from multiprocessing import shared_memory
+
+from envs.environment.replay import env_config
+from envs.environment.shm_vec_env import _attach, _offsets, _views
+
+# 快照保存的实体表列: x, y, angle（实体表前三列）
+SNAPSHOT_COLUMNS = 3
+
+
+def _ring_layout(num_entities, capacity):
+    """
+    环形缓冲区布局: [(名称, 形状, 类型)]
+    head 为已写入的快照总数，最新的快照在 (head - 1) % capacity 槽位
+    """
+    return [
+        ('head', (1,), np.int64),
+        ('closed', (1,), np.int64),
+        ('seq', (capacity,), np.int64),
+        ('time', (capacity,), np.float64),
+        ('episode', (capacity,), np.int64),
+        ('step', (capacity,), np.int64),
+        ('state', (capacity, SNAPSHOT_COLUMNS, num_entities), np.float32),
+    ]
+
+
+class StateRing:
+    """
+    单写单读的共享内存快照环形缓冲区
+    写入方用 create 创建并负责 unlink；读取方（其他进程）用 attach 连接
+    """
+    def __init__(self, shm, layout, owner):
+        self._shm = shm
+        self.layout = layout
+        self.owner = owner
+        self._buf = _views(shm.buf, layout)
+        self.capacity = layout[2][1][0]
+        self.name = shm.name
+
+    @classmethod
+    def create(cls, num_entities, capacity=64):
+        layout = _ring_layout(num_entities, capacity)
+        _, nbytes = _offsets(layout)
+        ring = cls(shared_memory.SharedMemory(create=True, size=nbytes), layout, owner=True)
+        ring._buf['head'][0] = 0
+        ring._buf['closed'][0] = 0
+        ring._buf['seq'][:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, layout):
+        return cls(_attach(name), layout, owner=False)
+
+    @property
+    def head(self):
+        return int(self._buf['head'][0])
+
+    @property
+    def closed(self):
+        return bool(self._buf['closed'][0])
+
+    def write(self, rows, episode, step):
+        """
+        写入一个快照（rows 为实体表前三列，形状 (3, 实体数)），不加锁、不等待读取方
+        """
+        buf = self._buf
+        head = int(buf['head'][0])
+        k = head % self.capacity
+        seq = buf['seq']
+        seq[k] += 1  # 奇数: 正在写入
+        buf['state'][k] = rows
+        buf['time'][k] = time.perf_counter()
+        buf['episode'][k] = episode
+        buf['step'][k] = step
+        seq[k] += 1  # 偶数: 写入完成
+        buf['head'][0] = head + 1
+
+    def read(self, index):
+        """
+        读取第 index 个快照，返回 (时间, 回合编号, 步数, 状态)；该槽位已被覆盖或正在写入时返回 None
+        """
+        buf = self._buf
+        k = index % self.capacity
+        before = int(buf['seq'][k])
+        if before & 1:
+            return None
+        snapshot = (float(buf['time'][k]), int(buf['episode'][k]), int(buf['step'][k]), buf['state'][k].copy())
+        if int(buf['seq'][k]) != before or self.head - index > self.capacity:
+            return None
+        return snapshot
+
+    def mark_closed(self):
+        """
+        通知读取方写入已结束
+        """
+        self._buf['closed'][0] = 1
+
+    def close(self):
+        if self._shm is None:
+            return
+        if self.owner:
+            self.mark_closed()
+        self._buf = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+        self._shm = None
+
+
+def interpolate(a, b, t):
+    """
+    在快照 a、b 的状态之间按比例 t 插值；角度沿较短的方向插值
+    """
+    out = a + (b - a) * t
+    delta = (b[2] - a[2] + 180.0) % 360.0 - 180.0
+    out[2] = (a[2] + delta * t) % 360.0
+    return out
+
+
+def _viewer_main(ring_name, layout, config, fps, scale, delay):
+    """
+    查看器进程: 读取快照、插值并绘制，直到窗口关闭或写入方关闭环形缓冲区
+    """
+    import pygame
+    from envs.environment.soccer_env import SoccerEnv
+    from envs.environment.rendering import SceneRenderer
+
+    ring = StateRing.attach(ring_name, layout)
+    # 本进程内的 SoccerEnv 只用来保存实体尺寸、颜色并复用绘制代码，从不推进
+    env = SoccerEnv(**config)
+    n = env.entities.size
+    pygame.init()
+    size = (max(1, int(round(env.width * scale))), max(1, int(round(env.height * scale))))
+    screen = pygame.display.set_mode(size)
+    renderer = SceneRenderer(env.width, env.height, scale=scale, surface=screen)
+    clock = pygame.time.Clock()
+    history = collections.deque(maxlen=ring.capacity)  # 已读取的快照，按时间排列
+    seen = 0
+    drawn = None
+    try:
+        while not ring.closed:
+            if any(event.type == pygame.QUIT for event in pygame.event.get()):
+                break
+            # 读取上一帧之后写入的快照（落后太多时只取最近的 capacity 个）
+            head = ring.head
+            for index in range(max(seen, head - ring.capacity + 1), head):
+                snapshot = ring.read(index)
+                if snapshot is not None:
+                    history.append(snapshot)
+            seen = head
+            state = _display_state(history, time.perf_counter() - delay) if history else None
+            # 画面没有变化（模拟暂停或已显示到最新快照）时不重绘
+            if state is not None and state is not drawn:
+                drawn = state
+                env.entities.data[:SNAPSHOT_COLUMNS, :n] = state
+                env.pose.update()
+                renderer.draw(env)
+                last = history[-1]
+                pygame.display.set_caption('Soccer RL Viewer  episode %d  step %d' % (last[1], last[2]))
+                pygame.display.flip()
+            clock.tick(fps)
+    finally:
+        pygame.quit()
+        ring.close()
+
+
+def _display_state(history, display_time):
+    """
+    显示时刻 display_time 的状态: 在其前后两个快照之间插值；跨回合或超出范围时取最近的快照
+    """
+    while len(history) > 2 and history[1][0] <= display_time:
+        history.popleft()
+    a = history[0]
+    if len(history) == 1 or display_time <= a[0]:
+        return a[3]
+    b = history[1]
+    if display_time >= b[0] or a[1] != b[1]:
+        return b[3] if display_time >= b[0] else a[3]
+    return interpolate(a[3], b[3], (display_time - a[0]) / (b[0] - a[0]))
+
+
+class LiveViewer(gym.Wrapper):
+    """
+    实时查看包装器: 在独立进程中打开窗口显示被包装环境的状态，模拟照常全速运行
+    fps: 查看器帧率；scale: 窗口相对球场尺寸的比例；max_rate: 每秒最多写入的快照数（0 表示每步都写）；
+    delay: 显示相对最新快照的延迟（秒），用于在两个快照之间插值，默认为两个写入间隔
+    查看器窗口被关闭后模拟不受影响；close() 时关闭查看器进程
+    """
+    def __init__(self, env, fps=60, scale=1.0, max_rate=120.0, delay=None, capacity=64, context=None):
+        super().__init__(env)
+        base = env.unwrapped
+        self._table = base.entities
+        self._num_entities = base.entities.size
+        self._min_interval = 1.0 / max_rate if max_rate else 0.0
+        self._last_publish = -float('inf')
+        self.episode = 0
+        if delay is None:
+            delay = 2 * max(self._min_interval, 1.0 / fps)
+        self.ring = StateRing.create(self._num_entities, capacity)
+        ctx = mp.get_context(context)
+        self._process = ctx.Process(target=_viewer_main, daemon=True,
+                                    args=(self.ring.name, self.ring.layout, env_config(base), fps, scale, delay))
+        self._process.start()
+
+    def publish(self, force=False):
+        """
+        写入当前状态的快照；距上次写入不足 1 / max_rate 秒时跳过（force 为 True 时总是写入）
+        """
+        now = time.perf_counter()
+        if not force and now - self._last_publish < self._min_interval:
+            return
+        self._last_publish = now
+        self.ring.write(self._table.data[:SNAPSHOT_COLUMNS, :self._num_entities], self.episode,
+                        self.env.unwrapped.current_step)
+
+    def reset(self, *, seed=None, options=None):
+        result = self.env.reset(seed=seed, options=options)
+        self.episode += 1
+        self.publish(force=True)
+        return result
+
+    def step(self, action):
+        result = self.env.step(action)
+        if 'final_obs' in result[4]:
+            # 环境已在 step 内自动重置
+            self.episode += 1
+            self.publish(force=True)
+        else:
+            self.publish()
+        return result
+
+    @property
+    def viewer_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def close(self):
+        if self._process is not None:
+            self.ring.mark_closed()
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+            self.ring.close()
+        super().close()
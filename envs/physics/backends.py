@@ -0,0 +1,249 @@
+# 分类: 物理模块
+# 描述: 定义可替换的物理后端。每个 tick 中逐实体的计算集中在后端里: 积分、球的摩擦和停止阈值、
+#       障碍物的追踪目标与移动、球与矩形的碰撞冲量、出界判断。
+#       NumpyBackend 是参考实现（NumPy 向量化，与实体方法、handle_collision 的结果完全一致）；
+#       KernelBackend 把同样的计算写成逐实体循环的内核，NumbaBackend 用 numba nopython 模式编译这些内核。
+#       内核在 float32 实体表上按与参考实现相同的运算顺序和精度计算，两个后端的轨迹逐位一致
+#       （用 benchmarks/physics_parity.py 核对）。numba 不可用时 make_backend 自动退回 NumpyBackend。
+
+import warnings
+from functools import lru_cache
+
+import numpy as np
+
+from envs.entities.table import EntityTable
+from envs.physics.response import handle_collision
+
+BACKENDS = ('numpy', 'numba', 'auto')
+
+# 与 EntityTable.apply_friction / steer、handle_collision、SoccerEnv 出界判断相同的常数
+STOP_SPEED = 0.1
+ARRIVE_RADIUS = 5
+TARGET_OFFSET = 50
+RESTITUTION = 0.4
+BOUNDARY_MARGIN = 30
+
+_X, _Y, _A, _VX, _VY, _W = (EntityTable.INDEX[name] for name in ('x', 'y', 'angle', 'vx', 'vy', 'angular_velocity'))
+_WIDTH, _HEIGHT = EntityTable.INDEX['width'], EntityTable.INDEX['height']
+_TX, _TY, _SPEED = EntityTable.INDEX['target_x'], EntityTable.INDEX['target_y'], EntityTable.INDEX['speed']
+
+
+class NumpyBackend:
+    """
+    参考实现: 直接调用实体表的批量方法和 handle_collision
+    """
+    name = 'numpy'
+
+    def advance(self, table, dt, friction, moving_rows, ball_rows, obstacle_rows):
+        """
+        推进一个子步: 球和球员积分，球施加摩擦，障碍物向目标点移动
+        """
+        table.integrate(dt, moving_rows)
+        table.apply_friction(ball_rows, friction, STOP_SPEED)
+        if obstacle_rows.stop > obstacle_rows.start:
+            table.steer(dt, obstacle_rows, ARRIVE_RADIUS)
+
+    def set_obstacle_targets(self, table, rows, ball_x, ball_y, goal_x, goal_y):
+        """
+        障碍物的目标点: 球到球门方向上距球 TARGET_OFFSET 处（与 Obstacle.move_towards_ball 相同）
+        """
+        to_goal_x = goal_x - ball_x
+        to_goal_y = goal_y - ball_y
+        length = np.sqrt(to_goal_x ** 2 + to_goal_y ** 2)
+        if length > 0:
+            to_goal_x /= length
+            to_goal_y /= length
+        table.data[_TX, rows] = ball_x + to_goal_x * TARGET_OFFSET
+        table.data[_TY, rows] = ball_y + to_goal_y * TARGET_OFFSET
+
+    def ball_response(self, ball, box, pose):
+        """
+        球与矩形 box 的碰撞响应（冲量和推出重叠）
+        """
+        handle_collision(ball, box, pose=pose)
+
+    def boundaries(self, table, ball_id, radius, player_rows, width, height):
+        """
+        返回 (球是否出界, 是否有球员出界)
+        """
+        d = table.data
+        bx, by = float(d[_X, ball_id]), float(d[_Y, ball_id])
+        ball_out = bx - radius < 0 or bx + radius > width or by - radius < 0 or by + radius > height
+        # x - half_w < -margin 或 x + half_w > width + margin 即 |x - width / 2| > width / 2 + margin - half_w，
+        # x、y 两行一次比较（各量都是 float32 值，在 float64 中的加减是精确的，与逐项比较结果相同）
+        center, extent = _field_extent(width, height)
+        half = d[_WIDTH:_HEIGHT + 1, player_rows].astype(np.float64)
+        half /= 2
+        player_out = (np.abs(d[_X:_Y + 1, player_rows] - center) > extent - half).any()
+        return ball_out, bool(player_out)
+
+
+@lru_cache(maxsize=16)
+def _field_extent(width, height):
+    """
+    球场中心和加上出界余量后的半宽高，形状均为 (2, 1)（结果会被缓存，调用方不要原地修改）
+    """
+    center = np.array([[width / 2], [height / 2]], dtype=np.float64)
+    extent = center + BOUNDARY_MARGIN
+    center.flags.writeable = False
+    extent.flags.writeable = False
+    return center, extent
+
+
+# ------------------------------ 逐实体内核 ------------------------------ #
+# 内核只使用 numba nopython 模式支持的运算；float32 的列与 float32 标量运算，结果仍为 float32，
+# 与 NumPy 对 float32 数组和 Python 标量（弱类型）的运算一致。
+
+def _advance_kernel(data, dt, friction, stop_speed, arrive_radius, full_turn,
+                    moving_start, moving_stop, ball_start, ball_stop, obstacle_start, obstacle_stop):
+    for i in range(moving_start, moving_stop):
+        data[_X, i] += data[_VX, i] * dt
+        data[_Y, i] += data[_VY, i] * dt
+        data[_A, i] += data[_W, i] * dt
+        data[_A, i] %= full_turn
+    for i in range(ball_start, ball_stop):
+        for column in (_VX, _VY):
+            v = data[column, i] * friction
+            if abs(v) < stop_speed:
+                data[column, i] = 0
+            else:
+                data[column, i] = v
+    for i in range(obstacle_start, obstacle_stop):
+        dx = data[_TX, i] - data[_X, i]
+        dy = data[_TY, i] - data[_Y, i]
+        length = np.sqrt(dx * dx + dy * dy)
+        if length > arrive_radius:
+            data[_X, i] += dx / length * data[_SPEED, i] * dt
+            data[_Y, i] += dy / length * data[_SPEED, i] * dt
+
+
+def _targets_kernel(data, start, stop, ball_x, ball_y, goal_x, goal_y, offset):
+    to_goal_x = goal_x - ball_x
+    to_goal_y = goal_y - ball_y
+    length = np.sqrt(to_goal_x ** 2 + to_goal_y ** 2)
+    if length > 0:
+        to_goal_x /= length
+        to_goal_y /= length
+    for i in range(start, stop):
+        data[_TX, i] = ball_x + to_goal_x * offset
+        data[_TY, i] = ball_y + to_goal_y * offset
+
+
+def _ball_response_kernel(data, ball, box, radius, restitution, bx, by, hw, hh, c, s):
+    """
+    与 handle_collision(ball, box, pose) 相同的计算；球被推出时返回 True
+    """
+    px, py = float(data[_X, ball]), float(data[_Y, ball])
+    dx, dy = px - bx, py - by
+    local_x, local_y = dx * c + dy * s, dy * c - dx * s
+    nearest_x = min(max(local_x, -hw), hw)
+    nearest_y = min(max(local_y, -hh), hh)
+    world_x = nearest_x * c - nearest_y * s + bx
+    world_y = nearest_x * s + nearest_y * c + by
+    nx, ny = px - world_x, py - world_y
+    norm = np.hypot(nx, ny)
+    if norm == 0:
+        nx, ny = 1.0, 0.0
+    else:
+        nx, ny = nx / norm, ny / norm
+    rvx = float(data[_VX, ball]) - float(data[_VX, box])
+    rvy = float(data[_VY, ball]) - float(data[_VY, box])
+    v_dot_n = rvx * nx + rvy * ny
+    if v_dot_n < 0:
+        impulse = -(1 + restitution) * v_dot_n
+        data[_VX, ball] = float(data[_VX, ball]) + impulse * nx
+        data[_VY, ball] = float(data[_VY, ball]) + impulse * ny
+    overlap = radius - norm
+    if overlap > 0:
+        data[_X, ball] = px + nx * overlap
+        data[_Y, ball] = py + ny * overlap
+        return True
+    return False
+
+
+def _boundaries_kernel(data, ball_id, radius, player_start, player_stop, width, height, margin):
+    bx, by = float(data[_X, ball_id]), float(data[_Y, ball_id])
+    ball_out = bx - radius < 0 or bx + radius > width or by - radius < 0 or by + radius > height
+    player_out = False
+    for i in range(player_start, player_stop):
+        x, y = float(data[_X, i]), float(data[_Y, i])
+        half_w, half_h = float(data[_WIDTH, i]) / 2, float(data[_HEIGHT, i]) / 2
+        if (x - half_w < -margin or x + half_w > width + margin or
+                y - half_h < -margin or y + half_h > height + margin):
+            player_out = True
+            break
+    return ball_out, player_out
+
+
+class KernelBackend:
+    """
+    逐实体循环的内核实现
+    jit 为编译函数的装饰器（例如 numba.njit）；为 None 时内核以 Python 解释执行，很慢，只用于核对内核逻辑
+    行范围要求是步长为 1 的切片
+    """
+    name = 'kernel'
+
+    def __init__(self, jit=None):
+        compile_fn = jit if jit is not None else (lambda fn: fn)
+        self._advance = compile_fn(_advance_kernel)
+        self._targets = compile_fn(_targets_kernel)
+        self._ball_response = compile_fn(_ball_response_kernel)
+        self._boundaries = compile_fn(_boundaries_kernel)
+
+    @staticmethod
+    def _bounds(rows, table):
+        start, stop, _ = rows.indices(table.size)
+        return start, max(start, stop)
+
+    def advance(self, table, dt, friction, moving_rows, ball_rows, obstacle_rows):
+        f32 = table.dtype.type
+        self._advance(table.data, f32(dt), f32(friction), f32(STOP_SPEED), f32(ARRIVE_RADIUS), f32(360),
+                      *self._bounds(moving_rows, table), *self._bounds(ball_rows, table),
+                      *self._bounds(obstacle_rows, table))
+
+    def set_obstacle_targets(self, table, rows, ball_x, ball_y, goal_x, goal_y):
+        self._targets(table.data, *self._bounds(rows, table), float(ball_x), float(ball_y),
+                      float(goal_x), float(goal_y), float(TARGET_OFFSET))
+
+    def ball_response(self, ball, box, pose):
+        bx, by, hw, hh, _ = pose.boxes(box.id)
+        c, s = pose.heading(box.id)
+        moved = self._ball_response(ball.table.data, ball.id, box.id, float(ball.radius), RESTITUTION,
+                                    float(bx), float(by), float(hw), float(hh), float(c), float(s))
+        if moved:
+            pose.invalidate(ball.id)
+
+    def boundaries(self, table, ball_id, radius, player_rows, width, height):
+        ball_out, player_out = self._boundaries(table.data, ball_id, float(radius), *self._bounds(player_rows, table),
+                                                float(width), float(height), float(BOUNDARY_MARGIN))
+        return bool(ball_out), bool(player_out)
+
+
+class NumbaBackend(KernelBackend):
+    """
+    numba 编译的内核；第一次调用时编译（cache=True 时编译结果缓存在 __pycache__ 中）
+    """
+    name = 'numba'
+
+    def __init__(self, cache=True):
+        import numba
+        super().__init__(numba.njit(cache=cache, nogil=True))
+
+
+def make_backend(backend='numpy'):
+    """
+    按名称创建物理后端: 'numpy' 参考实现，'numba' 编译内核（不可用时警告并退回 numpy），
+    'auto' 有 numba 时使用 numba；也可以直接传入后端实例
+    """
+    if not isinstance(backend, str):
+        return backend
+    if backend == 'numpy':
+        return NumpyBackend()
+    if backend in ('numba', 'auto'):
+        try:
+            return NumbaBackend()
+        except ImportError:
+            if backend == 'numba':
+                warnings.warn("numba 不可用，物理后端退回 NumPy 参考实现", RuntimeWarning, stacklevel=3)
+            return NumpyBackend()
+    raise ValueError("未知的物理后端: %r，可选 %s" % (backend, ', '.join(BACKENDS)))
@@ -0,0 +1,100 @@
+# 分类: 物理模块
+# 描述: 碰撞检测的粗检测阶段（broad phase），用均匀网格空间哈希找出包围盒（AABB）相交的候选配对，
+#       只把候选配对交给 collision.py 中的精确检测。
+
+from functools import lru_cache
+
+import numpy as np
+
+# AABB 向外扩张的容差，避免浮点误差漏掉恰好接触的配对
+AABB_EPSILON = 1e-6
+
+
+def aabb_arrays(x, y, hw, hh, angle):
+    """
+    旋转矩形的轴对齐包围盒，返回 (xmin, ymin, xmax, ymax)
+    """
+    angle_rad = np.radians(np.asarray(angle, dtype=np.float64))
+    c, s = np.abs(np.cos(angle_rad)), np.abs(np.sin(angle_rad))
+    ex = hw * c + hh * s + AABB_EPSILON
+    ey = hw * s + hh * c + AABB_EPSILON
+    return x - ex, y - ey, x + ex, y + ey
+
+
+class SpatialHash:
+    """
+    均匀网格空间哈希
+    每个 tick 用 build 重建一次，pairs 返回所有包围盒相交的配对 (i, j)，i < j，按 (i, j) 字典序排列
+    """
+    def __init__(self, cell_size=64.0):
+        self.cell_size = float(cell_size)
+        self.xmin = self.ymin = self.xmax = self.ymax = np.zeros(0)
+        self._pairs = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    def build(self, xmin, ymin, xmax, ymax):
+        """
+        把所有包围盒写入网格，并求出共享网格单元且包围盒相交的配对
+        """
+        self.xmin, self.ymin, self.xmax, self.ymax = xmin, ymin, xmax, ymax
+        n = len(xmin)
+        if n < 2:
+            self._pairs = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+            return
+
+        # 每个包围盒覆盖的网格范围
+        cx0 = np.floor(xmin / self.cell_size).astype(np.int64)
+        cy0 = np.floor(ymin / self.cell_size).astype(np.int64)
+        nx = np.floor(xmax / self.cell_size).astype(np.int64) - cx0 + 1
+        ny = np.floor(ymax / self.cell_size).astype(np.int64) - cy0 + 1
+        counts = nx * ny
+
+        # 展开为 (网格键, 实体编号) 列表
+        ids = np.repeat(np.arange(n), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        width = np.repeat(nx, counts)
+        cell_x = np.repeat(cx0, counts) + local % width
+        cell_y = np.repeat(cy0, counts) + local // width
+        keys = (cell_x + (1 << 20)) * (1 << 21) + (cell_y + (1 << 20))
+
+        # 按网格键排序后，同一单元内的实体两两成为候选
+        order = np.argsort(keys, kind='stable')
+        keys, ids = keys[order], ids[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        group_end = np.repeat(ends, ends - starts)
+        partners = group_end - np.arange(len(keys)) - 1
+        first = np.repeat(np.arange(len(keys)), partners)
+        second = first + 1 + np.arange(partners.sum()) - np.repeat(np.cumsum(partners) - partners, partners)
+        a, b = ids[first], ids[second]
+        i, j = np.minimum(a, b), np.maximum(a, b)
+
+        # 去重（两个实体可能共享多个单元），再做包围盒相交检测
+        pair_keys = np.unique(i * n + j)
+        i, j = pair_keys // n, pair_keys % n
+        overlap = ((xmin[i] <= xmax[j]) & (xmin[j] <= xmax[i]) &
+                   (ymin[i] <= ymax[j]) & (ymin[j] <= ymax[i]))
+        self._pairs = (i[overlap], j[overlap])
+
+    def pairs(self):
+        """
+        返回候选配对 (i, j)
+        """
+        return self._pairs
+
+    def query(self, xmin, ymin, xmax, ymax):
+        """
+        返回与给定包围盒相交的实体编号（升序）
+        """
+        return np.flatnonzero((self.xmin <= xmax) & (xmin <= self.xmax) &
+                              (self.ymin <= ymax) & (ymin <= self.ymax))
+
+
+@lru_cache(maxsize=16)
+def brute_force_pairs(n):
+    """
+    不做粗检测时的全部配对 (i, j)，i < j（结果会被缓存，调用方不要原地修改）
+    """
+    i, j = np.triu_indices(n, k=1)
+    i.flags.writeable = False
+    j.flags.writeable = False
+    return i, j
@@ -1,25 +1,160 @@
 # 分类: 物理模块
 # 描述: 包含碰撞检测相关函数，例如矩形与矩形、矩形与圆形的碰撞检测。
 import numpy as np
-import sys
-import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from envs.physics.utils import rotate_point, get_rect_corners, point_in_rotated_rect
+
+def box_arrays(table, rows):
+    """
+    从实体表中取出 rows 对应实体的包围盒: 中心、半宽、半高、角度（均为 float64 数组）
+    """
+    get = lambda name: table.data[table.INDEX[name], rows].astype(np.float64)
+    return get('x'), get('y'), get('width') / 2, get('height') / 2, get('angle')
+
+
+def _cos_sin(angle):
+    """
+    角度（度）的余弦和正弦
+    """
+    angle_rad = np.radians(np.asarray(angle, dtype=np.float64))
+    return np.cos(angle_rad), np.sin(angle_rad)
+
+
+def collide_rects(x1, y1, hw1, hh1, angle1, x2, y2, hw2, hh2, angle2, with_contact=True,
+                  heading1=None, heading2=None):
+    """
+    批量旋转矩形-旋转矩形碰撞检测（分离轴定理）
+    参数均为可广播的数组，例如 (P, 1) 与 (1, O) 即得到所有配对的 (P, O) 结果
+    heading1 / heading2 为位姿缓存中的朝向 (cos, sin)，给出时不再由角度计算
+    返回 (hit, depth, (nx, ny)): 是否相交、穿透深度、从矩形1指向矩形2的最小穿透方向；
+    with_contact 为 False 时只返回 hit，depth 和法线为 None
+    """
+    c1, s1 = heading1 if heading1 is not None else _cos_sin(angle1)
+    c2, s2 = heading2 if heading2 is not None else _cos_sin(angle2)
+    # 四条分离轴: 矩形1的 u、v 轴和矩形2的 u、v 轴，堆叠在第0维一次计算
+    shape = np.broadcast_shapes(np.shape(c1), np.shape(c2))
+    ax, ay = np.empty((4,) + shape), np.empty((4,) + shape)
+    ax[0], ax[1], ax[2], ax[3] = c1, -s1, c2, -s2
+    ay[0], ay[1], ay[2], ay[3] = s1, c1, s2, c2
+    r1 = hw1 * np.abs(c1 * ax + s1 * ay) + hh1 * np.abs(c1 * ay - s1 * ax)
+    r2 = hw2 * np.abs(c2 * ax + s2 * ay) + hh2 * np.abs(c2 * ay - s2 * ax)
+    dist = np.subtract(x2, x1) * ax + np.subtract(y2, y1) * ay
+    overlap = r1 + r2 - np.abs(dist)
+    if not with_contact:
+        return np.all(overlap >= 0, axis=0), None, None
+
+    best = np.argmin(overlap, axis=0)[None]
+    depth = np.take_along_axis(overlap, best, 0)[0]
+    sign = np.where(np.take_along_axis(dist, best, 0)[0] < 0, -1.0, 1.0)
+    nx = np.take_along_axis(ax, best, 0)[0] * sign
+    ny = np.take_along_axis(ay, best, 0)[0] * sign
+    return depth >= 0, depth, (nx, ny)
+
+
+def collide_rects_circle(x, y, hw, hh, angle, cx, cy, radius, with_contact=True, heading=None):
+    """
+    批量旋转矩形-圆形碰撞检测，一次检测一个（或一批）圆与所有矩形
+    heading 为位姿缓存中矩形的朝向 (cos, sin)，给出时不再由角度计算
+    返回 (hit, depth, (nx, ny)): 是否相交、穿透深度、从矩形指向圆心的方向；
+    with_contact 为 False 时只返回 hit
+    """
+    dx, dy = np.subtract(cx, x), np.subtract(cy, y)
+    if heading is not None:
+        # 旋转到局部坐标用的是 -angle: cos 不变，sin 取反
+        c, s = heading[0], -heading[1]
+    else:
+        c, s = _cos_sin(-np.asarray(angle, dtype=np.float64))
+    local_x = dx * c - dy * s
+    local_y = dx * s + dy * c
+    nearest_x = np.clip(local_x, -hw, hw)
+    nearest_y = np.clip(local_y, -hh, hh)
+    dist_sq = (local_x - nearest_x) ** 2 + (local_y - nearest_y) ** 2
+    hit = dist_sq <= radius ** 2
+    if not with_contact:
+        return hit, None, None
+
+    # 圆心在矩形外: 沿最近点方向；圆心在矩形内: 沿最近的边向外
+    dist = np.sqrt(dist_sq)
+    inside = dist == 0
+    gap_x = hw - np.abs(local_x)
+    gap_y = hh - np.abs(local_y)
+    along_x = gap_x <= gap_y
+    safe = np.where(inside, 1.0, dist)
+    lnx = np.where(inside, np.where(along_x, np.where(local_x < 0, -1.0, 1.0), 0.0),
+                   (local_x - nearest_x) / safe)
+    lny = np.where(inside, np.where(along_x, 0.0, np.where(local_y < 0, -1.0, 1.0)),
+                   (local_y - nearest_y) / safe)
+    depth = np.where(inside, radius + np.minimum(gap_x, gap_y), radius - dist)
+    # 局部方向转回世界坐标
+    nx = lnx * c + lny * s
+    ny = -lnx * s + lny * c
+    return hit, depth, (nx, ny)
+
+
+def sweep_circle_rects(x, y, hw, hh, angle, px, py, dx, dy, radius, heading=None):
+    """
+    批量扫掠圆与旋转矩形的连续碰撞检测: 圆心在一步内从 (px, py) 匀速移动 (dx, dy)，矩形视为静止
+    即射线与"圆角矩形"（矩形按半径外扩）求交: 先与外扩的矩形做 slab 测试，交点落在角上时再与角上的圆求交
+    返回 (toi, (nx, ny)): 首次接触时刻（0-1，不接触为 inf）和接触法线（从矩形指向圆心，世界坐标）；
+    起始时已经接触或相交的矩形返回 inf，交给离散检测处理
+    """
+    c, s = heading if heading is not None else _cos_sin(angle)
+    # 转到矩形局部坐标（旋转 -angle）
+    rx, ry = np.subtract(px, x), np.subtract(py, y)
+    lx, ly = rx * c + ry * s, ry * c - rx * s
+    ldx, ldy = dx * c + dy * s, dy * c - dx * s
+    ex, ey = hw + radius, hh + radius
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # slab 测试: 每个轴上进入、离开外扩矩形的时刻；方向分量为 0 时按是否在 slab 内取 ±inf
+        def slab(l, d, e):
+            t1, t2 = (-e - l) / d, (e - l) / d
+            near, far = np.minimum(t1, t2), np.maximum(t1, t2)
+            inside = np.abs(l) <= e
+            near = np.where(d == 0, np.where(inside, -np.inf, np.inf), near)
+            far = np.where(d == 0, np.where(inside, np.inf, -np.inf), far)
+            return near, far
+        near_x, far_x = slab(lx, ldx, ex)
+        near_y, far_y = slab(ly, ldy, ey)
+    t = np.maximum(near_x, near_y)
+    crosses = t <= np.minimum(far_x, far_y)
+    hit = crosses & (t > 0) & (t <= 1)
+    along_x = near_x >= near_y
+    nx = np.where(along_x, -np.sign(ldx), 0.0)
+    ny = np.where(along_x, 0.0, -np.sign(ldy))
+
+    # 交点落在角区域（或起点已在外扩矩形的角区域内）: 改为与角上半径为 radius 的圆求交
+    tq = np.maximum(t, 0)
+    with np.errstate(invalid='ignore'):
+        qx, qy = lx + tq * ldx, ly + tq * ldy
+    corner = crosses & (t <= 1) & (np.abs(qx) > hw) & (np.abs(qy) > hh)
+    if np.any(corner):
+        cx, cy = np.copysign(hw, qx), np.copysign(hh, qy)
+        ox, oy = lx - cx, ly - cy
+        a = ldx * ldx + ldy * ldy
+        b = ox * ldx + oy * ldy
+        disc = b * b - a * (ox * ox + oy * oy - radius * radius)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tc = (-b - np.sqrt(np.maximum(disc, 0))) / a
+        corner_hit = (disc >= 0) & (tc > 0) & (tc <= 1)
+        t = np.where(corner, tc, t)
+        hit = np.where(corner, corner_hit, hit)
+        with np.errstate(invalid='ignore'):
+            nx = np.where(corner, (ox + tc * ldx) / radius, nx)
+            ny = np.where(corner, (oy + tc * ldy) / radius, ny)
+
+    toi = np.where(hit, t, np.inf)
+    # 法线转回世界坐标
+    return toi, (nx * c - ny * s, nx * s + ny * c)
+
 
 def collide_rect_rect(rect1, rect2):
     """
     检测两个矩形是否碰撞
     """
-    corners1 = get_rect_corners(rect1)
-    corners2 = get_rect_corners(rect2)
-    for p1 in corners1:
-        if point_in_rotated_rect(p1[0], p1[1], corners2):
-            return True
-    for p2 in corners2:
-        if point_in_rotated_rect(p2[0], p2[1], corners1):
-            return True
-    return False
+    hit, _, _ = collide_rects(rect1.x, rect1.y, rect1.width / 2, rect1.height / 2, rect1.angle,
+                              rect2.x, rect2.y, rect2.width / 2, rect2.height / 2, rect2.angle,
+                              with_contact=False)
+    return bool(hit)
 
 def collide_rect_circle(rect, circle):
     """
@@ -0,0 +1,166 @@
+# 分类: 物理模块
+# 描述: 定义每个 tick 的位姿缓存（PoseCache）。积分后对实体表中的所有实体一次算出
+#       中心、半宽高、朝向单位向量 (cos, sin) 和旋转矩形的四个角点，
+#       动作解析、感知、碰撞检测、碰撞响应和渲染都从这里读取，不再各自把角度换算成弧度和三角函数。
+#       碰撞响应只会移动球（不改变任何朝向），移动后用 invalidate 标记，位置相关的量在下次读取时重新计算。
+#       reset 等整体改写实体表后用 mark_stale 标记整张缓存过期，下次读取时再整体更新；
+#       update 和每个 tick 的 update_motion 都写回预先分配的数组（实体数不变时），不产生新数组。
+
+import numpy as np
+
+# 矩形四个角点在局部坐标中的符号: (-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh)
+_CORNER_SIGNS = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float64)
+
+
+class PoseCache:
+    """
+    位姿缓存
+    x, y, hw, hh, radius, angle, cos, sin 均为长度等于实体数的 float64 数组，按实体编号索引（radius 为外接圆半径）；
+    x, y 是 xy（形状 (2, n)）的两行，cos, sin 是 frame（形状 (3, n)，依次为 -sin, cos, sin）的两行，
+    frame[1:3] 为朝向 (cos, sin)，frame[0:2] 为朝向左侧的法向 (-sin, cos)，供按列批量计算的调用方直接使用
+    """
+    def __init__(self, table):
+        self.table = table
+        self.angle = None
+        self.update()
+
+    def update(self):
+        """
+        从实体表重新计算所有实体的位姿（创建时以及实体表被整体改写之后）；实体数不变时写入已有的数组
+        """
+        table = self.table
+        n = table.size
+        if self.angle is None or len(self.angle) != n:
+            self._allocate(n)
+        # 实体表前3列为 x, y, angle；width, height 两列相邻
+        d = table.data
+        self.xy[...] = d[0:2, :n]
+        self.angle[...] = d[2, :n]
+        w = table.INDEX['width']
+        self._half[...] = d[w:w + 2, :n]
+        self._half /= 2
+        np.hypot(self.hw, self.hh, out=self.radius)
+        self._stale = False
+        self._update_heading()
+
+    def _allocate(self, n):
+        self.xy = np.empty((2, n))
+        self.x, self.y = self.xy
+        self.angle = np.empty(n)
+        self._half = np.empty((2, n))
+        self.hw, self.hh = self._half
+        self.radius = np.empty(n)
+        self.frame = np.empty((3, n))
+        self.cos, self.sin = self.frame[1], self.frame[2]
+        self._radians = np.empty(n)
+
+    def update_motion(self):
+        """
+        每个 tick 积分后调用: 重新读取位置和角度并计算朝向，写入已有的数组
+        """
+        d = self.table.data
+        n = len(self.angle)
+        if self._stale or n != self.table.size:
+            self.update()
+            return
+        self.xy[...] = d[0:2, :n]
+        self.angle[...] = d[2, :n]
+        self._update_heading()
+
+    def _update_heading(self):
+        np.radians(self.angle, out=self._radians)
+        np.cos(self._radians, out=self.cos)
+        np.sin(self._radians, out=self.sin)
+        np.negative(self.sin, out=self.frame[0])
+        self._corners = None
+        self._dirty = set()
+
+    def invalidate(self, entity_id):
+        """
+        实体被移动后调用: 下次读取时重新取该实体的位置
+        """
+        self._dirty.add(int(entity_id))
+
+    def mark_stale(self):
+        """
+        实体表被整体改写后调用（reset、set_state 之后）: 下次读取时重新计算所有实体的位姿
+        """
+        self._stale = True
+
+    def _refresh(self):
+        if self._stale:
+            self.update()
+            return
+        if not self._dirty:
+            return
+        d = self.table.data
+        dirty = np.fromiter(self._dirty, dtype=np.intp)
+        self.x[dirty] = d[self.table.INDEX['x'], dirty]
+        self.y[dirty] = d[self.table.INDEX['y'], dirty]
+        if self._corners is not None:
+            self._corners[dirty] = self._compute_corners(dirty)
+        self._dirty.clear()
+
+    # ------------------------------ 读取 ------------------------------ #
+    def heading(self, rows):
+        """
+        朝向单位向量 (cos, sin)；碰撞响应不改变朝向，只在整张缓存过期时刷新
+        """
+        if self._stale:
+            self.update()
+        return self.cos[rows], self.sin[rows]
+
+    def frames(self, rows):
+        """
+        rows 对应实体的 frame 列（形状 (3, ...)，见类说明）；只在整张缓存过期时刷新
+        """
+        if self._stale:
+            self.update()
+        return self.frame[:, rows]
+
+    def positions(self, rows):
+        """
+        rows 对应实体的中心，形状 (2, ...)
+        """
+        self._refresh()
+        return self.xy[:, rows]
+
+    def boxes(self, rows):
+        """
+        rows 对应实体的包围盒 (x, y, hw, hh, angle)，与 collision.box_arrays 相同
+        """
+        self._refresh()
+        return self.x[rows], self.y[rows], self.hw[rows], self.hh[rows], self.angle[rows]
+
+    def to_local(self, entity_id, px, py):
+        """
+        世界坐标 -> 实体 entity_id 的局部坐标（以中心为原点、随朝向旋转）
+        """
+        self._refresh()
+        c, s = self.cos[entity_id], self.sin[entity_id]
+        dx, dy = px - self.x[entity_id], py - self.y[entity_id]
+        return dx * c + dy * s, dy * c - dx * s
+
+    def to_world(self, entity_id, lx, ly):
+        """
+        实体 entity_id 的局部坐标 -> 世界坐标
+        """
+        self._refresh()
+        c, s = self.cos[entity_id], self.sin[entity_id]
+        return lx * c - ly * s + self.x[entity_id], lx * s + ly * c + self.y[entity_id]
+
+    def corners(self, rows):
+        """
+        旋转矩形的四个角点，形状为 (..., 4, 2)；第一次读取时才对所有实体计算
+        """
+        self._refresh()
+        if self._corners is None:
+            self._corners = self._compute_corners(slice(None))
+        return self._corners[rows]
+
+    def _compute_corners(self, rows):
+        local = _CORNER_SIGNS * np.stack([self.hw[rows], self.hh[rows]], axis=-1)[..., None, :]
+        c, s = self.cos[rows][..., None], self.sin[rows][..., None]
+        wx = local[..., 0] * c - local[..., 1] * s + self.x[rows][..., None]
+        wy = local[..., 0] * s + local[..., 1] * c + self.y[rows][..., None]
+        return np.stack([wx, wy], axis=-1)
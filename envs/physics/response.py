@@ -3,23 +3,30 @@
 
 import numpy as np
 
-def handle_collision(entity1, entity2):
+def handle_collision(entity1, entity2, pose=None):
     """
     处理两个实体之间的碰撞
+    pose 为位姿缓存时从中读取 entity2 的坐标变换，并在移动 entity1 后使其缓存失效
     """
-    angle = -entity2.angle
-    cx, cy = entity2.x, entity2.y
-    dx, dy = entity1.x - cx, entity1.y - cy
-    angle_rad = np.radians(angle)
-    local_x = dx * np.cos(angle_rad) - dy * np.sin(angle_rad)
-    local_y = dx * np.sin(angle_rad) + dy * np.cos(angle_rad)
     hw, hh = entity2.width / 2, entity2.height / 2
-    nearest_x = np.clip(local_x, -hw, hw)
-    nearest_y = np.clip(local_y, -hh, hh)
-    s = np.sin(-angle_rad)
-    c = np.cos(-angle_rad)
-    world_x = nearest_x * c - nearest_y * s + cx
-    world_y = nearest_x * s + nearest_y * c + cy
+    if pose is not None:
+        local_x, local_y = pose.to_local(entity2.id, entity1.x, entity1.y)
+        nearest_x = np.clip(local_x, -hw, hw)
+        nearest_y = np.clip(local_y, -hh, hh)
+        world_x, world_y = pose.to_world(entity2.id, nearest_x, nearest_y)
+    else:
+        angle = -entity2.angle
+        cx, cy = entity2.x, entity2.y
+        dx, dy = entity1.x - cx, entity1.y - cy
+        angle_rad = np.radians(angle)
+        local_x = dx * np.cos(angle_rad) - dy * np.sin(angle_rad)
+        local_y = dx * np.sin(angle_rad) + dy * np.cos(angle_rad)
+        nearest_x = np.clip(local_x, -hw, hw)
+        nearest_y = np.clip(local_y, -hh, hh)
+        s = np.sin(-angle_rad)
+        c = np.cos(-angle_rad)
+        world_x = nearest_x * c - nearest_y * s + cx
+        world_y = nearest_x * s + nearest_y * c + cy
     nx = entity1.x - world_x
     ny = entity1.y - world_y
     norm = np.hypot(nx, ny)
@@ -39,3 +46,5 @@ def handle_collision(entity1, entity2):
     if overlap > 0:
         entity1.x += nx * overlap
         entity1.y += ny * overlap
+        if pose is not None:
+            pose.invalidate(entity1.id)
@@ -2,11 +2,15 @@
 # 描述: 提供物理计算的工具函数，例如点旋转、矩形顶点计算等。
 
 import numpy as np
-import pygame
+
+GOAL_HEIGHT = 200
+# 球门深度: SoccerEnv 以 width - GOAL_DEPTH 为右侧球门的判定线（球心越过即进球）
+GOAL_DEPTH = 50
+
 
 def is_goal(ball, width, height):
     """检测是否进球"""
-    goal_height = 200
+    goal_height = GOAL_HEIGHT
     goal_y = (height - goal_height) // 2
 
     # 左侧球门
@@ -19,10 +23,27 @@ def is_goal(ball, width, height):
 
     return 0  # 没有进球
 
+def goal_crossing(x0, y0, dx, dy, radius, width, height):
+    """
+    球心从 (x0, y0) 移动 (dx, dy) 的过程中越过球门线、且越线处在球门范围内的最早时刻（与 is_goal 相同的判定线）
+    返回 (t, 球门线 x 坐标, is_goal 的返回值)；不越线时 t 为 inf
+    """
+    goal_y = (height - GOAL_HEIGHT) // 2
+    best = (float('inf'), None, 0)
+    # 左侧球门线: x - radius <= 0；右侧球门线: x + radius >= width
+    for line, direction, result in ((radius, -1, 1), (width - radius, 1, -1)):
+        if dx * direction <= 0 or (x0 - line) * direction >= 0:
+            continue
+        t = (line - x0) / dx
+        if 0 <= t <= 1 and t < best[0] and goal_y <= y0 + t * dy <= goal_y + GOAL_HEIGHT:
+            best = (t, line, result)
+    return best
+
 def draw_field(screen, width, height):
     """
     绘制足球场
     """
+    import pygame  # 只有渲染时才加载 pygame
     screen.fill((40, 180, 40))
 
     # 白色边线
@@ -71,10 +92,12 @@ def rotate_point(px, py, cx, cy, angle_deg):
     dy = (px - cx) * s + (py - cy) * c
     return dx + cx, dy + cy
 
-def get_rect_corners(entity):
+def get_rect_corners(entity, pose=None):
     """
-    获取任意实体旋转后的四个顶点坐标
+    获取任意实体旋转后的四个顶点坐标，pose 为位姿缓存时直接读取缓存的角点
     """
+    if pose is not None:
+        return [tuple(corner) for corner in pose.corners(entity.id)]
     hw, hh = entity.width / 2, entity.height / 2
     cx, cy = entity.x, entity.y
     angle = entity.angle
@@ -0,0 +1,260 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: 无渲染并行评估训练好的检查点。把带种子的 SoccerEnv 回合分给进程池，每个工作进程只加载一次策略，
+#            对自己的多个环境批量推理；汇总进球率、出界率、回合长度和回报的分布及置信区间。
+#            每个回合的结果按 (检查点哈希, 环境配置) 缓存到磁盘，重新评估或扩大种子范围时只计算缺少的回合。
+#            只缓存确定性策略的结果: 随机策略基线和 --stochastic 的动作采样在整个批次间共用随机数，
+#            同一种子的回合结果取决于同批的其他回合，不可复现，这两种情况每次都重新计算。
+# 用法: python evaluate.py --checkpoint soccer_ppo_model.zip --episodes 2000 --workers 8
+#       python evaluate.py --checkpoint random --episodes 200 --players 3 --obstacles 4
+
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing as mp
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+# 单个回合的结果字段
+FIELDS = ('length', 'return', 'goal', 'ball_out', 'truncated')
+# 95% 置信区间的正态分位数
+Z = 1.959963984540054
+
+_worker = {}
+
+
+def file_hash(path):
+    """
+    检查点内容的 SHA-256（前 16 位）；'random' 表示随机策略基线
+    """
+    if path == 'random':
+        return 'random'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def config_hash(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_policy(checkpoint, algorithm, deterministic):
+    from envs.environment.controllers import RandomPolicy, SB3Policy
+    if checkpoint == 'random':
+        return RandomPolicy()
+    try:
+        return SB3Policy.load(checkpoint, algorithm=algorithm, deterministic=deterministic, device='cpu')
+    except ImportError:
+        raise SystemExit("加载检查点需要安装 stable-baselines3（或使用 --checkpoint random）")
+
+
+# ------------------------------ 工作进程 ------------------------------ #
+def _init_worker(checkpoint, algorithm, deterministic, env_config, envs_per_worker):
+    """
+    每个工作进程只加载一次策略，创建 envs_per_worker 个环境
+    """
+    from envs.environment.soccer_env import SoccerEnv
+    from envs.environment.reward_wrapper import DefaultRewardWrapper
+    from envs.environment.controllers import MultiAgentController
+
+    policy = load_policy(checkpoint, algorithm, deterministic)
+    if 'torch' in sys.modules:
+        # 多个工作进程并行时每个进程只用一个线程推理
+        sys.modules['torch'].set_num_threads(1)
+    envs = [DefaultRewardWrapper(SoccerEnv(**env_config)) for _ in range(envs_per_worker)]
+    # 控制器按向量环境的形式对所有环境的所有球员一次推理
+    batch = SimpleNamespace(num_envs=len(envs), single_action_space=envs[0].action_space,
+                            single_observation_space=envs[0].observation_space)
+    _worker.update(envs=envs, controller=MultiAgentController(batch, policy))
+
+
+def _run_seeds(seeds):
+    """
+    在本进程的环境上跑完 seeds 中的回合，返回 {种子: 结果}
+    """
+    envs, controller = _worker['envs'], _worker['controller']
+    pending = list(seeds)[::-1]
+    obs = np.zeros((len(envs),) + envs[0].observation_space.shape, dtype=np.float32)
+    slots = [None] * len(envs)  # 每个环境当前回合: [种子, 长度, 回报]
+    results = {}
+
+    def start(k):
+        if not pending:
+            slots[k] = None
+            return
+        seed = pending.pop()
+        obs[k], _ = envs[k].reset(seed=seed)
+        slots[k] = [seed, 0, 0.0]
+
+    for k in range(len(envs)):
+        start(k)
+    while any(slot is not None for slot in slots):
+        actions = controller.act(obs)
+        for k, slot in enumerate(slots):
+            if slot is None:
+                continue
+            obs[k], reward, terminated, truncated, info = envs[k].step(actions[k])
+            slot[1] += 1
+            slot[2] += float(reward)
+            if terminated or truncated:
+                goal = {'right': 1, 'left': -1}.get(info.get('goal'), 0)
+                results[slot[0]] = [slot[1], slot[2], goal, bool(info.get('ball_out')), bool(truncated)]
+                start(k)
+    return results
+
+
+# ------------------------------ 缓存 ------------------------------ #
+def cache_path(cache_dir, checkpoint_hash, env_hash):
+    return os.path.join(cache_dir, '%s_%s.json' % (checkpoint_hash, env_hash))
+
+
+def load_cache(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {int(seed): record for seed, record in json.load(f)['episodes'].items()}
+
+
+def save_cache(path, header, episodes):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    data = dict(header, fields=list(FIELDS), episodes={str(seed): episodes[seed] for seed in sorted(episodes)})
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+
+# ------------------------------ 统计 ------------------------------ #
+def wilson_interval(successes, n, z=Z):
+    """
+    比例的 Wilson 置信区间
+    """
+    if n == 0:
+        return 0.0, 0.0
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def mean_interval(values, z=Z):
+    """
+    均值的正态近似置信区间
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mean = float(values.mean())
+    half = z * float(values.std(ddof=1)) / math.sqrt(len(values)) if len(values) > 1 else 0.0
+    return mean, mean - half, mean + half
+
+
+def summarize(records):
+    """
+    汇总回合结果: 各比例及其 Wilson 区间，回合长度、回报的均值区间和分位数
+    """
+    data = np.array(records, dtype=np.float64).reshape(-1, len(FIELDS))
+    n = len(data)
+    length, ret, goal, ball_out, truncated = data.T
+    summary = {'episodes': n}
+    for name, mask in (('goal_rate', goal != 0), ('goal_right_rate', goal == 1), ('goal_left_rate', goal == -1),
+                       ('ball_out_rate', ball_out != 0), ('truncation_rate', truncated != 0)):
+        count = int(mask.sum())
+        low, high = wilson_interval(count, n)
+        summary[name] = {'value': count / n if n else 0.0, 'ci95': [low, high]}
+    for name, values in (('length', length), ('return', ret)):
+        if n == 0:
+            continue
+        mean, low, high = mean_interval(values)
+        summary[name] = {'mean': mean, 'ci95': [low, high], 'std': float(values.std()),
+                         'percentiles': {str(q): float(np.percentile(values, q)) for q in (5, 25, 50, 75, 95)}}
+    return summary
+
+
+def format_summary(summary):
+    lines = ['episodes: %d' % summary['episodes']]
+    for name in ('goal_rate', 'goal_right_rate', 'goal_left_rate', 'ball_out_rate', 'truncation_rate'):
+        entry = summary[name]
+        lines.append('%-16s %7.3f  [%.3f, %.3f]' % (name, entry['value'], *entry['ci95']))
+    for name in ('length', 'return'):
+        if name not in summary:
+            continue
+        entry = summary[name]
+        p = entry['percentiles']
+        lines.append('%-16s %9.2f  [%.2f, %.2f]  p5 %.2f  p50 %.2f  p95 %.2f' % (
+            name, entry['mean'], *entry['ci95'], p['5'], p['50'], p['95']))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并行评估训练好的检查点')
+    parser.add_argument('--checkpoint', default='soccer_ppo_model.zip', help="检查点文件，'random' 为随机策略基线")
+    parser.add_argument('--algorithm', default='PPO', help='stable-baselines3 的算法类名')
+    parser.add_argument('--stochastic', action='store_true', help='按策略分布采样动作（默认取确定性动作）')
+    parser.add_argument('--episodes', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help='第一个回合的种子，回合 i 使用 seed + i')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--envs-per-worker', type=int, default=8, help='每个工作进程同时推进、批量推理的环境数')
+    parser.add_argument('--players', type=int, default=1)
+    parser.add_argument('--obstacles', type=int, default=0)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--max-steps', type=int, default=1000)
+    parser.add_argument('--frame-skip', type=int, default=1)
+    parser.add_argument('--cache-dir', default='.eval_cache')
+    parser.add_argument('--no-cache', action='store_true', help='不读取也不写入缓存')
+    parser.add_argument('--output', help='汇总结果写入的 JSON 文件')
+    args = parser.parse_args()
+
+    env_config = {'num_players': args.players, 'num_obstacles': args.obstacles, 'width': args.width,
+                  'height': args.height, 'max_steps': args.max_steps, 'frame_skip': args.frame_skip}
+    header = {'checkpoint': args.checkpoint, 'checkpoint_hash': file_hash(args.checkpoint),
+              'algorithm': args.algorithm, 'deterministic': not args.stochastic, 'env_config': env_config}
+    # 策略的确定性设置也影响结果，一并计入配置哈希
+    path = cache_path(args.cache_dir, header['checkpoint_hash'],
+                      config_hash(dict(env_config, algorithm=args.algorithm, deterministic=not args.stochastic)))
+    # 动作采样不随回合种子复现的策略不读写缓存
+    use_cache = not args.no_cache and not args.stochastic and args.checkpoint != 'random'
+    if not use_cache and not args.no_cache:
+        print('随机策略或 --stochastic 的结果不可复现，不使用缓存')
+    episodes = load_cache(path) if use_cache else {}
+
+    seeds = range(args.seed, args.seed + args.episodes)
+    missing = [seed for seed in seeds if seed not in episodes]
+    print('%d 个回合，缓存中已有 %d 个，需要计算 %d 个' % (len(seeds), len(seeds) - len(missing), len(missing)))
+
+    if missing:
+        workers = max(1, min(args.workers, -(-len(missing) // args.envs_per_worker)))
+        # 每个任务是一段种子，大小为几批环境，既让各进程负载均衡又减少通信
+        chunk = args.envs_per_worker * 4
+        tasks = [missing[i:i + chunk] for i in range(0, len(missing), chunk)]
+        start = time.perf_counter()
+        done = 0
+        with mp.Pool(workers, initializer=_init_worker,
+                     initargs=(args.checkpoint, args.algorithm, not args.stochastic, env_config,
+                               args.envs_per_worker)) as pool:
+            for results in pool.imap_unordered(_run_seeds, tasks):
+                episodes.update(results)
+                done += len(results)
+                if use_cache:
+                    save_cache(path, header, episodes)
+                print('\r%d / %d 个回合  %.1f 回合/秒' % (done, len(missing), done / (time.perf_counter() - start)),
+                      end='', flush=True)
+        print()
+
+    summary = summarize([episodes[seed] for seed in seeds])
+    print(format_summary(summary))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(dict(header, seeds=[seeds.start, seeds.stop], summary=summary), f, indent=2)
+        print('结果已写入 %s' % args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: 预先生成开局状态库。按桶（kickoff、scattered、moving_ball、attack）并行采样互不重叠的开局并写入目录，
+#            训练时用 SoccerEnv(scenario_bank=目录) 在 reset 中按编号直接抽取；--weights 设置各桶的初始抽样权重。
+# 用法: python make_scenarios.py --output scenarios --count 100000 --players 3 --obstacles 4
+#       python make_scenarios.py --output scenarios --buckets kickoff=20000,attack=80000 --weights kickoff=1,attack=3
+
+import argparse
+import sys
+import time
+
+from envs.environment.scenarios import BUCKETS, generate_bank
+
+
+def parse_pairs(text, cast):
+    """
+    解析 "名称=值,名称=值"
+    """
+    pairs = {}
+    for item in filter(None, text.split(',')):
+        name, value = item.split('=')
+        pairs[name.strip()] = cast(value)
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成开局状态库')
+    parser.add_argument('--output', default='scenarios', help='输出目录')
+    parser.add_argument('--count', type=int, default=10000, help='每个桶的开局数（未指定 --buckets 时）')
+    parser.add_argument('--buckets', help='各桶的开局数，例如 kickoff=20000,attack=80000；可选桶: ' + ','.join(BUCKETS))
+    parser.add_argument('--weights', help='各桶的初始抽样权重，例如 kickoff=1,attack=3（默认各非空桶相同）')
+    parser.add_argument('--players', type=int, default=1)
+    parser.add_argument('--obstacles', type=int, default=0)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--workers', type=int, default=None, help='生成进程数，默认为 CPU 核数')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    counts = parse_pairs(args.buckets, int) if args.buckets else args.count
+    weights = parse_pairs(args.weights, float) if args.weights else None
+    start = time.perf_counter()
+    bank = generate_bank(args.output, counts, width=args.width, height=args.height, num_players=args.players,
+                         num_obstacles=args.obstacles, weights=weights, workers=args.workers, seed=args.seed)
+    print('%d 个开局写入 %s，用时 %.1f 秒' % (len(bank), args.output, time.perf_counter() - start))
+    for bucket, weight in bank.weights.items():
+        print('%-12s %8d 个  权重 %g' % (bucket, bank.bucket_size(bucket), weight))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
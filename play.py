@@ -1,16 +1,17 @@
-from stable_baselines3 import PPO
 from envs.environment.soccer_env import SoccerEnv
+from envs.environment.controllers import MultiAgentController, SB3Policy
 
 # 创建环境
 env = SoccerEnv()
 
-model = PPO.load("soccer_ppo_model.zip")
+# 所有球员共用训练好的策略，每步对所有球员做一次批量推理
+controller = MultiAgentController(env, SB3Policy.load("soccer_ppo_model.zip"))
 
 # 测试训练好的模型
-obs = env.reset()
+obs, _ = env.reset()
 for _ in range(1000):
-    action, _states = model.predict(obs, deterministic=True)
-    obs, reward, done, info = env.step(action)
+    action = controller.act(obs)
+    obs, reward, done, truncated, info = env.step(action)
     env.render()
-    if done:
-        obs = env.reset()
\ No newline at end of file
+    if done or truncated:
+        obs, _ = env.reset()
@@ -0,0 +1,44 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+# @function: 启动本机环境服务。在 Unix 域套接字或回环 TCP 上托管一池 SoccerEnv（默认带 DefaultRewardWrapper），
+#            多个训练、评估进程用 RemoteVecEnv 连接并共用这些环境，同一时刻的请求合并成一次向量化推进。
+# 用法: python serve_envs.py --address unix:/tmp/soccer.sock --num-envs 64 --workers 4 --players 3 --obstacles 4
+#       python serve_envs.py --address tcp:127.0.0.1:5555 --num-envs 16
+#       客户端: RemoteVecEnv("unix:/tmp/soccer.sock", num_envs=8)
+
+import argparse
+import sys
+
+from envs.environment.env_server import EnvServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本机环境服务')
+    parser.add_argument('--address', default='unix:/tmp/soccer_env.sock', help='unix:路径 或 tcp:主机:端口')
+    parser.add_argument('--num-envs', type=int, default=16, help='池中环境总数')
+    parser.add_argument('--workers', type=int, default=0, help='推进环境的工作进程数，0 表示在服务进程内推进')
+    parser.add_argument('--coalesce-ms', type=float, default=0.0, help='收到请求后再等待的毫秒数，让更多请求进入同一批')
+    parser.add_argument('--players', type=int, default=1)
+    parser.add_argument('--obstacles', type=int, default=0)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--max-steps', type=int, default=1000)
+    parser.add_argument('--frame-skip', type=int, default=1)
+    parser.add_argument('--no-reward-wrapper', action='store_true', help='不包 DefaultRewardWrapper（奖励恒为 0）')
+    args = parser.parse_args()
+
+    server = EnvServer(num_envs=args.num_envs, num_workers=args.workers, coalesce_window=args.coalesce_ms / 1000,
+                       reward_wrapper=not args.no_reward_wrapper, num_players=args.players,
+                       num_obstacles=args.obstacles, width=args.width, height=args.height,
+                       max_steps=args.max_steps, frame_skip=args.frame_skip)
+    print('环境服务: %s，%d 个环境' % (args.address, args.num_envs))
+    try:
+        server.run(args.address)
+    except KeyboardInterrupt:
+        pass
+    print('已处理 %(requests)d 个请求，合并为 %(batches)d 批，共推进 %(env_steps)d 个环境步' % server.stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,9 +8,9 @@
 # 注意！！！！！！！！！，使用英文输入法，否则控制不了
 
 import pygame
-import numpy as np
 from envs.environment.soccer_env import SoccerEnv
 from envs.environment.reward_wrapper import DefaultRewardWrapper
+from envs.environment.controllers import MultiAgentController, RandomPolicy
 
 def main():
     # 创建环境
@@ -18,6 +18,9 @@ def main():
     action_n = env.env.action_num
     obs, _ = env.reset()
 
+    # 第一个球员手动控制，其他球员由随机策略控制，每步一次批量生成
+    controller = MultiAgentController(env, RandomPolicy(), agents=range(1, env.num_players))
+
     # 手动控制参数
     key_actions = {
         pygame.K_w: [1, 0, 0],  # 前进
@@ -34,8 +37,9 @@ def main():
         # 渲染环境
         env.render()
 
-        # 输入动作初始化
-        action = np.zeros(env.action_space.shape)
+        # 其他球员的动作由控制器写入动作缓冲区，第一个球员的动作清零后由键盘输入
+        action = controller.act(obs)
+        action[:action_n] = 0
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -45,11 +49,6 @@ def main():
             if keys[key]:
                 action[:action_n] += act
 
-        # 对第一个球员应用动作，其他球员随机行动
-        for i in range(1, env.num_players):
-            idx = i * action_n
-            action[idx:idx + action_n] = env.action_space.sample()[idx:idx + action_n]
-
         # 执行动作
         obs, reward, done, truncated, info = env.step(action)
 
@@ -1,9 +1,15 @@
 from stable_baselines3 import PPO
 from envs.environment.soccer_env import SoccerEnv
 from envs.environment.reward_wrapper import DefaultRewardWrapper
+from envs.environment.viewer import LiveViewer
+
+# 设为 True 时在独立进程中实时显示训练过程，训练照常全速运行
+WATCH_TRAINING = False
 
 # 创建环境
 env = DefaultRewardWrapper(SoccerEnv())
+if WATCH_TRAINING:
+    env = LiveViewer(env)
 
 # 创建并训练模型
 model = PPO("MlpPolicy", env, verbose=1, device='cuda',
@@ -25,3 +31,4 @@ for _ in range(1000):
     env.render()
     if done:
         obs, _ = env.reset()
+env.close()